@@ -26,6 +26,7 @@ from src.api.routers import (
     burn_subtitle,
     documentation,
     digital_human, # 导入合并后的数字人路由
+    metrics,
 )
 from src.api.routers.yt import process_video as yt_process_video, status, rewrite_manuscript
 
@@ -45,6 +46,16 @@ app = FastAPI(
 #     port = config.get("api_server", {}).get("port", 8000)
 #     log.info(f"✅ [Service Status] Auto-crop API started and listening on port {port}")
 
+# 启动时在后台预热模型（可选），避免第一个请求承担模型加载时间
+@app.on_event("startup")
+async def warm_up_models():
+    if not config.get('model_loader.warmup_on_startup', False):
+        return
+    from src.core.model_loader import ModelLoader
+    models = config.get('model_loader.warmup_models', None)
+    log.info(f"Warming up models in background: {models or 'all'}")
+    ModelLoader(config).warm_up(models, background=True)
+
 
 # 挂载 'tasks' 目录为一个静态文件路径，以避免与API路由冲突
 # 这样就可以通过 /static/tasks/... 的URL访问任务文件夹中的文件
@@ -74,6 +85,8 @@ app.include_router(rewrite_manuscript.router, prefix="/yt", tags=["YouTube Subti
 
 app.include_router(documentation.router) # 文档路由
 
+app.include_router(metrics.router) # 运行指标路由
+
 
 # 根路径，用于简单的服务健康检查
 @app.get("/", tags=["Root"], include_in_schema=False)
@@ -13,7 +13,6 @@ import sys
 import json
 import time
 import asyncio
-import requests
 from fastapi import APIRouter, Depends, HTTPException, Form, Request, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Optional, Union
@@ -27,6 +26,7 @@ if project_root not in sys.path:
 
 # --- 内部模块导入 ---
 from src.config_loader import config
+from src import http_client
 from src.core.task_manager import TaskManager
 from src.providers.digital_human import get_digital_human_provider, DigitalHumanProvider
 from src.core.service_controller import ServiceController
@@ -74,14 +74,10 @@ class CompositeDigitalHumanRequest(BaseModel):
     output_filename: str = "final_video_composited.mp4"  # 输出文件名
 
 # --- 任务一：生成数字人视频 ---
-def _download_and_save_file(url: str, save_path: str):
+async def _download_and_save_file(url: str, save_path: str):
     """一个辅助函数，用于从URL下载文件并保存到本地。"""
-    proxies = {"http": None, "https": None}  # 禁用代理，确保能访问本地或局域网服务
-    with requests.get(url, stream=True, proxies=proxies) as r:
-        r.raise_for_status()  # 如果HTTP请求返回错误状态码，则抛出异常
-        with open(save_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):  # 分块写入，避免消耗过多内存
-                f.write(chunk)
+    # 异步流式下载；trust_env=False 禁用代理，确保能访问本地或局域网服务
+    await http_client.adownload(url, save_path, trust_env=False, retries=2)
     log.info(f"File downloaded from {url} to {save_path}")
 
 async def _wait_for_file_stable(file_path: str, timeout: int = 60, check_interval: int = 1, stable_checks: int = 3):
@@ -167,7 +163,7 @@ async def _generate_digital_human_task(task_id: str, character_name: str, segmen
         # 下载主视频和所有切片视频
         main_video_filename = os.path.basename(urlparse(main_video_url).path)
         main_video_local_path = os.path.join(dh_video_dir, main_video_filename)
-        await run_in_threadpool(_download_and_save_file, main_video_url, main_video_local_path)
+        downloads = [_download_and_save_file(main_video_url, main_video_local_path)]
         
         main_video_relative_url = get_relative_url(main_video_local_path, http_request)
         
@@ -179,9 +175,11 @@ async def _generate_digital_human_task(task_id: str, character_name: str, segmen
             for seg_url in segment_urls:
                 seg_filename = os.path.basename(urlparse(seg_url).path)
                 seg_local_path = os.path.join(dh_segment_dir, seg_filename)
-                await run_in_threadpool(_download_and_save_file, seg_url, seg_local_path)
+                downloads.append(_download_and_save_file(seg_url, seg_local_path))
                 local_segment_urls.append(get_relative_url(seg_local_path, http_request))
                 local_segment_paths.append(seg_local_path)
+        # 主视频和切片视频并发下载
+        await asyncio.gather(*downloads)
 
         # 6. 解析时间片段JSON
         parsed_segments = json.loads(segments_json) if segments_json else []
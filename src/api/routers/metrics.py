@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+
+from src.api.security import verify_token
+from src import metrics
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["运行指标 - Metrics"],
+    dependencies=[Depends(verify_token)]
+)
+
+
+@router.get("", summary="获取进程内运行指标（缓存命中率、连接复用等）")
+async def get_metrics():
+    return metrics.snapshot()
@@ -3,7 +3,6 @@ from typing import Dict, Any, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
-from starlette.concurrency import run_in_threadpool
 
 from src.config_loader import config
 from src.api.security import verify_token
@@ -70,7 +69,7 @@ async def _rewrite_manuscript_task(task_id: str):
         log.info(f"Rewriting manuscript for task {task_id} using LLM...")
         log.info(f"prompt:\n{prompt}")
         # prompt= "地球上真的有外星人吗？"
-        rewritten_text = await run_in_threadpool(llm_provider.generate, prompt)
+        rewritten_text = await llm_provider.agenerate(prompt)
         
         if not rewritten_text:
             raise Exception("LLM failed to generate rewritten text.")
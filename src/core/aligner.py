@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import logging
+import numpy as np
+from thefuzz import fuzz
+from .text import TextProcessor
+from .text_buffer import NormalizedTextBuffer
+
+
+class BandedAligner:
+    """
+    基于动态规划的文稿-转录全局对齐器（Needleman-Wunsch 变体）。
+
+    文稿句子和 Whisper 词各自只做一次字符级规范化，拼接成两条字符序列后，
+    在对角线附近的带宽内做一次全局对齐，复杂度与转录长度成线性关系，
+    取代 linear_align 中对每个窗口子序列反复 join + normalize + fuzz 的穷举。
+    转录开头和结尾的多余内容不计罚分（半全局对齐）。
+    """
+
+    MATCH_SCORE = 2
+    MISMATCH_SCORE = -1
+    GAP_SCORE = -1
+
+    # 字符序列较短时直接使用全宽 DP，不必受带宽限制
+    FULL_WIDTH_CELLS = 4_000_000
+
+    # 回溯指针
+    _DIAG, _UP, _LEFT = 0, 1, 2
+
+    def __init__(self, text_processor: TextProcessor, band_width: int = 300, match_threshold: int = 75):
+        self.text_processor = text_processor
+        self.band_width = band_width
+        self.match_threshold = match_threshold
+
+    def align(self, target_lines, whisper_words, word_buffer: NormalizedTextBuffer = None):
+        """
+        对齐文稿句子与 Whisper 词。
+
+        Args:
+            word_buffer: 已为 whisper_words 构建好的缓冲区，未提供时在此构建。
+
+        Returns:
+            list[dict]: 每个成功对齐的句子一项，包含 line_index、start_word、end_word（不含）。
+        """
+        line_buffer = NormalizedTextBuffer(target_lines, self.text_processor)
+        if word_buffer is None:
+            word_buffer = NormalizedTextBuffer.from_words(whisper_words, self.text_processor)
+
+        transcript = word_buffer.text
+        if not line_buffer.text or not transcript:
+            return []
+
+        char_map = self._align_chars(line_buffer.chars, word_buffer.chars)
+
+        matches = []
+        prev_end_word = 0
+        for line_index in range(len(line_buffer)):
+            line_text = line_buffer.item_text(line_index)
+            if not line_text:
+                continue
+            start, end = line_buffer.offsets[line_index], line_buffer.offsets[line_index + 1]
+
+            mapped = char_map[start:end]
+            mapped = mapped[mapped >= 0]
+            if mapped.size == 0:
+                continue
+
+            first_char, last_char = int(mapped[0]), int(mapped[-1])
+            # 对齐区间只做一次模糊比对，阈值语义与 linear_align 保持一致
+            score = fuzz.token_set_ratio(line_text, transcript[first_char:last_char + 1])
+            if score < self.match_threshold:
+                logging.debug(f"Alignment score {score} below threshold for line: '{target_lines[line_index]}'")
+                continue
+
+            start_word = word_buffer.item_at(first_char)
+            end_word = word_buffer.item_at(last_char) + 1
+            # 跨两句的边界词只归属前一句，保证与 linear_align 一样时间轴不重叠
+            if prev_end_word < end_word:
+                start_word = max(start_word, prev_end_word)
+            prev_end_word = end_word
+
+            matches.append({
+                "line_index": line_index,
+                "start_word": start_word,
+                "end_word": end_word,
+            })
+        return matches
+
+    def _band(self, i: int, n: int, m: int, width: int):
+        """第 i 行（已消耗 i 个文稿字符）在转录维度上的计算区间 [lo, hi]。"""
+        center = round(i * m / n)
+        return max(0, center - width), min(m, center + width)
+
+    def _align_chars(self, s: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """
+        输入文稿和转录的码点数组，返回长度为 len(s) 的数组，
+        记录每个文稿字符对齐到的转录字符下标，未对齐为 -1。
+        """
+        n, m = len(s), len(t)
+
+        if n * m <= self.FULL_WIDTH_CELLS:
+            width = m
+        else:
+            # 带宽至少要覆盖两条序列的长度差，否则终点落不进带内
+            width = self.band_width + abs(m - n)
+
+        neg_inf = np.iinfo(np.int32).min // 2
+        gap = -self.GAP_SCORE
+        prev = np.zeros(m + 1, dtype=np.int32)  # 第 0 行：跳过任意长度的转录开头不计罚分
+        prev_lo, prev_hi = 0, m
+        pointers = []
+        bands = []
+
+        for i in range(1, n + 1):
+            lo, hi = self._band(i, n, m, width)
+            js = np.arange(lo, hi + 1)
+
+            # 上一行在带外的单元视为负无穷
+            def prev_at(cols):
+                valid = (cols >= prev_lo) & (cols <= prev_hi)
+                values = np.full(cols.shape, neg_inf, dtype=np.int32)
+                values[valid] = prev[cols[valid]]
+                return values
+
+            sub = np.where(t[np.maximum(js - 1, 0)] == s[i - 1], self.MATCH_SCORE, self.MISMATCH_SCORE)
+            diag = prev_at(js - 1) + sub
+            diag[js == 0] = neg_inf
+            up = prev_at(js) - gap
+
+            best = np.maximum(diag, up)
+            ptr = np.where(diag >= up, self._DIAG, self._UP).astype(np.int8)
+
+            # 行内的水平移动（跳过转录字符）：D[j] = max_k<=j (best[k] - gap*(j-k))，用前缀最大值一次算完
+            k_gap = gap * np.arange(best.size, dtype=np.int64)
+            row = (np.maximum.accumulate(best + k_gap) - k_gap).astype(np.int32)
+            ptr[row > best] = self._LEFT
+
+            cur = np.full(m + 1, neg_inf, dtype=np.int32)
+            cur[lo:hi + 1] = row
+            prev, prev_lo, prev_hi = cur, lo, hi
+            pointers.append(ptr)
+            bands.append(lo)
+
+        # 转录结尾的多余内容同样不计罚分：从最后一行得分最高的列开始回溯
+        j = prev_lo + int(np.argmax(prev[prev_lo:prev_hi + 1]))
+        i = n
+        char_map = np.full(n, -1, dtype=np.int64)
+        while i > 0:
+            ptr = pointers[i - 1][j - bands[i - 1]]
+            if ptr == self._DIAG:
+                char_map[i - 1] = j - 1
+                i, j = i - 1, j - 1
+            elif ptr == self._UP:
+                i -= 1
+            else:
+                j -= 1
+        return char_map
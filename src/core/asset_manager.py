@@ -6,9 +6,16 @@ import time
 import re
 import uuid
 import sys
+import json
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
 from src.providers.llm import LlmManager
 from typing import List, Set, Dict, Any
 from .database_manager import DatabaseManager
+from .candidate_ranker import CandidateRanker
+from .search_cache import get_search_cache
+from .task_manager import TaskManager
 from src.logger import log
 from src.utils import get_video_duration
 # --- 新增导入 ---
@@ -55,7 +62,41 @@ def dedupe_and_fill(keywords, target=3, threshold=0.6, fallback=None):
 
     return unique[:target]
 
+_task_asset_managers: Dict[str, "AssetManager"] = {}
+_task_asset_managers_lock = threading.Lock()
+
+
+def get_asset_manager(config: dict, task_id: str) -> "AssetManager":
+    """
+    返回任务级共享的 AssetManager。
+    同一阶段内的多次素材查找/替换共用同一实例，从而共享已初始化的提供者、
+    去重集合、请求间隔计时和预取结果；首次创建时从 final_scenes_assets.json 恢复去重集合。
+    阶段结束后应调用 release_asset_manager 释放。
+    """
+    with _task_asset_managers_lock:
+        manager = _task_asset_managers.get(task_id)
+        if manager is None:
+            manager = AssetManager(config, task_id)
+            manager.load_used_assets()
+            _task_asset_managers[task_id] = manager
+        return manager
+
+
+def release_asset_manager(task_id: str):
+    """
+    素材查找或合成阶段结束后释放任务的 AssetManager，避免注册表随任务数无限增长。
+    之后再调用 get_asset_manager 会重新创建实例，并从 final_scenes_assets.json 恢复去重集合。
+    """
+    with _task_asset_managers_lock:
+        manager = _task_asset_managers.pop(task_id, None)
+    if manager is not None:
+        manager.close()
+
+
 class AssetManager:
+    # 同时进行的后台预取数量上限
+    PREFETCH_MAX_IN_FLIGHT = 1
+
     def __init__(self, config: dict, task_id: str):
         self.config = config
         self.task_id = task_id
@@ -72,6 +113,15 @@ class AssetManager:
         self.used_ai_video_names: Set[str] = set()
         self.used_local_paths: Set[str] = set()
 
+        # --- 下载前的候选素材评分与预取 ---
+        self.ranker = CandidateRanker(config)
+        self.prefetch_runner_up = self.asset_search_config.get('prefetch_runner_up', False)
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self._prefetched: Dict[str, Future] = {}
+
+        # --- 搜索结果缓存 (跨任务持久化，命中时无需等待请求间隔) ---
+        self.search_cache = get_search_cache(config)
+
         # --- 初始化所有可用的视频提供者 ---
         self.video_providers: List[BaseVideoProvider] = self._load_providers()
 
@@ -81,6 +131,15 @@ class AssetManager:
         self.asset_user_prompt_template = None
         log.info("AssetManager 已初始化，LLM关键词生成功能已禁用。")
 
+    def close(self):
+        """落盘搜索结果缓存，丢弃未使用的预取结果并关闭后台预取线程。"""
+        if self.search_cache is not None:
+            self.search_cache.flush()
+        self._discard_prefetched()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self._prefetch_executor = None
+
     def _load_providers(self) -> List[BaseVideoProvider]:
         """根据配置文件加载并排序视频提供者。"""
         providers = []
@@ -117,6 +176,60 @@ class AssetManager:
         
         return providers
 
+    @staticmethod
+    def describe_asset(video_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提取素材的来源和码流信息，随分镜数据一起保存。
+        合成器据此判断素材是否已经符合输出规格，从而跳过缩放。
+        """
+        return {
+            'id': video_info.get('id'),
+            'source': video_info.get('source'),
+            'video_name': video_info.get('video_name'),
+            'width': video_info.get('width'),
+            'height': video_info.get('height'),
+            'fps': video_info.get('fps'),
+        }
+
+    def mark_asset_used(self, sub_scene: Dict[str, Any]):
+        """
+        将一个已分配素材的子镜头登记为已使用，避免后续查找或替换时再次选中同一素材。
+        优先使用 asset_meta 中的来源ID；旧数据没有 asset_meta 时，以文件名（即来源ID）作为后备。
+        """
+        asset_path = sub_scene.get('asset_path')
+        asset_meta = sub_scene.get('asset_meta') or {}
+
+        unique_id = asset_meta.get('id')
+        if not unique_id and asset_path:
+            unique_id = Path(asset_path).stem
+        if unique_id:
+            self.used_source_ids.add(unique_id)
+        if asset_meta.get('source') == 'ai_search' and asset_meta.get('video_name'):
+            self.used_ai_video_names.add(asset_meta['video_name'])
+        if asset_path:
+            self.used_local_paths.add(asset_path)
+
+    def load_used_assets(self) -> int:
+        """从任务的 final_scenes_assets.json 中恢复已使用素材集合，返回登记的子镜头数量。"""
+        assets_scenes_path = TaskManager(self.task_id).get_file_path('final_scenes_with_assets')
+        if not os.path.exists(assets_scenes_path):
+            return 0
+        try:
+            with open(assets_scenes_path, 'r', encoding='utf-8') as f:
+                main_scenes = json.load(f)
+        except Exception as e:
+            log.warning(f"读取 {assets_scenes_path} 失败，无法恢复已使用素材集合: {e}")
+            return 0
+
+        count = 0
+        for main_scene in main_scenes:
+            for sub_scene in main_scene.get('scenes', []):
+                if sub_scene.get('asset_path'):
+                    self.mark_asset_used(sub_scene)
+                    count += 1
+        log.info(f"已从 {assets_scenes_path} 恢复 {count} 个已使用素材。")
+        return count
+
     def _generate_new_keywords(
         self,
         scene_text: str,
@@ -142,7 +255,11 @@ class AssetManager:
         log.info(f"\n正在为场景查找素材，关键词: {keywords}")
         
         # 此方法现在查找、下载、验证并返回一个可用的素材，或返回空列表
-        found_video_info = self._find_and_validate_asset(keywords, online_search_count, scene_duration)
+        try:
+            found_video_info = self._find_and_validate_asset(keywords, online_search_count, scene_duration)
+        finally:
+            # 镜头已有结果，未被使用的预取素材不再需要
+            self._discard_prefetched()
     
         if found_video_info:
             log.success(f"成功为场景找到并验证了素材。")
@@ -166,41 +283,24 @@ class AssetManager:
             log.info(f"  -> 尝试 Provider: {provider_name}")
 
             for keyword in keywords:
-                # --- API 请求延迟 ---
-                if self.last_online_search_time:
-                    elapsed = time.time() - self.last_online_search_time
-                    if elapsed < self.request_delay:
-                        sleep_duration = self.request_delay - elapsed
-                        log.info(f"    -> API请求间隔为 {self.request_delay}s，等待 {sleep_duration:.2f}s...")
-                        time.sleep(sleep_duration)
-                self.last_online_search_time = time.time()
-
                 log.info(f"    -> 尝试关键词: '{keyword}'")
                 
-                # 从Provider获取一批候选视频
-                candidate_videos = provider.search([keyword], count=search_count_per_call, min_duration=min_duration)
+                # 从Provider获取一批候选视频（优先使用缓存）
+                candidate_videos = self._search_provider(provider, keyword, search_count_per_call, min_duration)
 
                 if not candidate_videos:
                     log.warning(f"    -> 在 {provider_name} 中未找到关于 '{keyword}' 的视频。")
                     continue # 尝试下一个关键词
 
-                # 遍历这批候选视频，找到第一个完全可用的
-                for video_info in candidate_videos:
+                # 先去重，再仅凭元数据为候选打分，按得分从高到低依次下载验证
+                fresh_candidates = [v for v in candidate_videos if self._is_candidate_available(v)]
+                ranked_candidates = self.ranker.rank(fresh_candidates, keyword, min_duration)
+
+                for rank, video_info in enumerate(ranked_candidates):
                     unique_id = video_info.get('id')
                     video_name = video_info.get('video_name')
                     source = video_info.get('source')
 
-                    # --- 去重逻辑 ---
-                    if unique_id and unique_id in self.used_source_ids:
-                        log.warning(f"    -> 跳过已使用的素材 (按 unique_id): {unique_id}")
-                        continue
-                    if source != 'ai_search' and video_name and video_name in self.used_ai_video_names:
-                        log.warning(f"    -> 跳过已被 AI Search 使用的同名素材 (按 video_name): {video_name}")
-                        continue
-                    if not unique_id:
-                        log.warning(f"    -> 跳过一个没有唯一ID的素材: {video_info}")
-                        continue
-
                     # --- 特殊处理 Envato Provider (它已经自行下载) ---
                     if source == 'envato':
                         local_path = video_info.get('local_path')
@@ -215,8 +315,13 @@ class AssetManager:
                     else:
                         # --- 其他 Provider 的标准下载流程 ---
                         log.success(
-                            f"    -> 在 {provider_name} 中找到新候选素材: {unique_id} (关键词: '{keyword}')。正在尝试下载和验证...")
-                        path = self._download_asset(video_info)
+                            f"    -> 在 {provider_name} 中找到新候选素材: {unique_id} (关键词: '{keyword}', 得分: {video_info.get('rank_score')})。正在尝试下载和验证...")
+                        runner_up = ranked_candidates[rank + 1] if rank + 1 < len(ranked_candidates) else None
+                        self._prefetch(runner_up)
+                        if unique_id in self._prefetched:
+                            path = self._claim_prefetched(unique_id)
+                        else:
+                            path = self._download_asset(video_info)
                         if not path:
                             log.warning(f"    -> 下载失败，尝试下一个候选素材。")
                             continue
@@ -236,10 +341,109 @@ class AssetManager:
         return None
 
     
-    def _download_asset(self, video_info: Dict[str, Any]) -> str | None:
+    def _search_provider(self, provider: BaseVideoProvider, keyword: str, count: int, min_duration: float) -> List[Dict[str, Any]]:
+        """
+        调用提供者搜索。命中搜索结果缓存时直接返回，不受 API 请求间隔限制；
+        未命中时才等待请求间隔并发起真正的请求。
+        """
+        use_cache = self.search_cache is not None and provider.cacheable
+        if use_cache:
+            cache_key = self.search_cache.make_key(
+                provider.__class__.__name__, [keyword], count, min_duration, provider.cache_filters())
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                log.info(f"    -> 命中搜索结果缓存: '{keyword}' ({len(cached)} 个候选)")
+                return cached
+
+        # --- API 请求延迟 ---
+        if self.last_online_search_time:
+            elapsed = time.time() - self.last_online_search_time
+            if elapsed < self.request_delay:
+                sleep_duration = self.request_delay - elapsed
+                log.info(f"    -> API请求间隔为 {self.request_delay}s，等待 {sleep_duration:.2f}s...")
+                time.sleep(sleep_duration)
+        self.last_online_search_time = time.time()
+
+        results = provider.search([keyword], count=count, min_duration=min_duration)
+
+        # 请求失败时提供者会自行禁用并返回空列表，这种结果不能写入缓存
+        if use_cache and provider.enabled:
+            self.search_cache.put(cache_key, results)
+        return results
+
+    def _is_candidate_available(self, video_info: Dict[str, Any]) -> bool:
+        """去重检查：跳过已使用或缺少唯一ID的候选素材。"""
+        unique_id = video_info.get('id')
+        video_name = video_info.get('video_name')
+        source = video_info.get('source')
+
+        if unique_id and unique_id in self.used_source_ids:
+            log.warning(f"    -> 跳过已使用的素材 (按 unique_id): {unique_id}")
+            return False
+        if source != 'ai_search' and video_name and video_name in self.used_ai_video_names:
+            log.warning(f"    -> 跳过已被 AI Search 使用的同名素材 (按 video_name): {video_name}")
+            return False
+        if not unique_id:
+            log.warning(f"    -> 跳过一个没有唯一ID的素材: {video_info}")
+            return False
+        return True
+
+    def _prefetch(self, video_info: Dict[str, Any] | None):
+        """
+        在下载最佳候选的同时，于后台预取排名第二的候选，最佳候选验证失败时可直接使用。
+        同一时间最多只有 PREFETCH_MAX_IN_FLIGHT 个预取在进行；镜头查找结束后未被使用的预取会被丢弃。
+        """
+        if not self.prefetch_runner_up or not video_info:
+            return
+        unique_id = video_info.get('id')
+        if video_info.get('source') == 'envato' or unique_id in self._prefetched:
+            return
+        in_flight = sum(1 for future in self._prefetched.values() if not future.done())
+        if in_flight >= self.PREFETCH_MAX_IN_FLIGHT:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asset-prefetch")
+        log.info(f"      -> 后台预取次优候选素材: {unique_id}")
+        self._prefetched[unique_id] = self._prefetch_executor.submit(self._download_asset, video_info, show_progress=False)
+
+    def _discard_prefetched(self):
+        """取消尚未开始的预取，已开始或已完成的预取在结束后删除其下载的文件，然后清空预取表。"""
+        for unique_id, future in self._prefetched.items():
+            if future.cancel():
+                continue
+            log.debug(f"      -> 丢弃未使用的预取素材: {unique_id}")
+            future.add_done_callback(self._remove_prefetched_file)
+        self._prefetched.clear()
+
+    @staticmethod
+    def _remove_prefetched_file(future: Future):
+        try:
+            path = future.result()
+        except Exception:
+            return
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                log.warning(f"删除未使用的预取素材 {path} 失败: {e}")
+
+    def _claim_prefetched(self, unique_id: str) -> str | None:
+        """取出预取结果（必要时等待其完成），返回已验证的本地路径或 None。"""
+        future = self._prefetched.pop(unique_id)
+        try:
+            path = future.result()
+        except Exception as e:
+            log.warning(f"      -> 预取素材 {unique_id} 失败: {e}")
+            return None
+        if path and os.path.exists(path):
+            log.info(f"      -> 使用已预取的素材: {path}")
+            return path
+        return None
+
+    def _download_asset(self, video_info: Dict[str, Any], show_progress: bool = True) -> str | None:
         """
         下载单个视频，验证其有效性，然后返回其本地路径。
-        如果下载或验证失败，则返回 None。
+        如果下载或验证失败，则返回 None。后台预取时 show_progress 为 False，不显示进度条。
         """
         source = video_info['source']
         source_id = video_info['id']
@@ -266,7 +470,8 @@ class AssetManager:
                     unit='iB',
                     unit_scale=True,
                     unit_divisor=1024,
-                    leave=False
+                    leave=False,
+                    disable=not show_progress
                 ) as bar:
                     for chunk in video_res.iter_content(chunk_size=8192):
                         size = f.write(chunk)
@@ -321,7 +526,8 @@ class AssetManager:
                 unit='iB',
                 unit_scale=True,
                 unit_divisor=1024,
-                leave=False # 下载完成后进度条消失
+                leave=False, # 下载完成后进度条消失
+                disable=not show_progress
             ) as bar:
                 for chunk in video_res.iter_content(chunk_size=8192):
                     size = f.write(chunk)
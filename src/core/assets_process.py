@@ -9,7 +9,7 @@ from pathlib import Path
 from src.config_loader import config
 from src.logger import log
 from src.core.task_manager import TaskManager
-from src.core.asset_manager import AssetManager
+from src.core.asset_manager import AssetManager, get_asset_manager, release_asset_manager
 from src.utils import get_video_duration
 
 class AssetsProcess:
@@ -47,8 +47,12 @@ class AssetsProcess:
             raise ValueError("Failed to load or parse 'final_scenes.json'.")
 
         # 核心逻辑：为每个子镜头查找素材资源
-        scenes_with_assets, all_found = self._find_assets_for_sub_scenes(main_scenes)
-        
+        try:
+            scenes_with_assets, all_found = self._find_assets_for_sub_scenes(main_scenes)
+        finally:
+            # 释放任务级的素材管理器（同时落盘批量写入的搜索结果缓存）
+            release_asset_manager(self.task_manager.task_id)
+
         # 若未能完成素材查找流程，则中断抛出异常
         if not all_found:
             raise RuntimeError("Failed to find assets for all sub-scenes.")
@@ -90,8 +94,8 @@ class AssetsProcess:
         Returns:
             tuple[list, bool]: 返回更新后的主场景列表和一个表示操作是否成功的布尔值。
         """
-        # 初始化素材管理器
-        asset_manager = AssetManager(config, self.task_manager.task_id)
+        # 获取任务级共享的素材管理器（素材查找结束后由 run() 释放）
+        asset_manager = get_asset_manager(config, self.task_manager.task_id)
         
         # 从主场景列表中提取所有子场景，构建一个扁平化的列表
         all_sub_scenes = [
@@ -121,8 +125,9 @@ class AssetsProcess:
 
             # 检查子场景是否已经有关联的素材路径，并且该文件存在
             if sub_scene.get('asset_path') and os.path.exists(sub_scene.get('asset_path')):
-                # 如果存在缓存的素材，则记录调试信息并跳过当前循环
+                # 如果存在缓存的素材，登记为已使用后跳过当前循环
                 log.debug(f"Found cached asset for sub-scene {i+1}")
+                asset_manager.mark_asset_used(sub_scene)
                 continue
 
             # 如果没有缓存素材，则调用素材管理器的 find_assets_for_scene 方法为当前子场景查找素材
@@ -137,6 +142,8 @@ class AssetsProcess:
             
             # 更新子场景信息
             sub_scene['asset_path'] = video_info['local_path'].replace(os.sep, '/')
+            # 保存素材的来源和码流信息，合成时可据此跳过不必要的缩放
+            sub_scene['asset_meta'] = AssetManager.describe_asset(video_info)
             # AssetManager 现在不返回时长，我们需要自己获取
             sub_scene['actual_duration'] = get_video_duration(video_info['local_path'])
         
@@ -5,6 +5,9 @@ audio_transcriber.py
 该模块依赖 Whisper 模型，封装为 AudioTranscriber 类，提供结构化转录输出，
 可用于字幕生成、语音分析等任务，是 SubtitleProcessor 的辅助组件。
 
+长音频会先按静音（VAD）切分为若干块，多个工作线程并行转录后，
+再把各块的时间戳加上块起点偏移拼接回完整结果，输出格式与整段转录完全一致。
+
 依赖组件：
 - ModelLoader：用于加载 Whisper 模型实例
 - tqdm：用于展示转录进度条
@@ -12,8 +15,12 @@ audio_transcriber.py
 """
 
 import os  # 操作系统模块，用于路径处理、文件检查等功能
+import dataclasses  # 合并各块的转录元数据
+from concurrent.futures import ThreadPoolExecutor  # 线程池，用于并行转录音频块
 from tqdm import tqdm  # 用于显示进度条，提升用户体验
 from typing import List, Dict  # 类型注解，提升代码可读性和可维护性
+from faster_whisper import decode_audio  # 解码音频为 16kHz 单声道波形
+from faster_whisper.vad import VadOptions, get_speech_timestamps  # Silero VAD 语音区间检测
 
 from src.logger import log  # 引入日志工具，方便记录运行信息与错误
 from src.core.model_loader import ModelLoader  # 引入模型加载器，用于获取 Whisper 模型
@@ -23,28 +30,133 @@ class AudioTranscriber:
     音频处理器类，主要负责音频转录
     是 SubtitleProcessor 的辅助类
     """
+    SAMPLING_RATE = 16000  # Whisper 输入采样率
+
     def __init__(self, model_loader: ModelLoader):
-        self.whisper_model = model_loader.get_whisper_model()  # 加载 Whisper 模型并保存为实例变量
+        # 不长期持有模型：转录期间通过 lease 借用，空闲卸载不会在转录中途释放模型
+        self.model_loader = model_loader
+        # 分块并行转录配置
+        transcription_config = model_loader.config.get('whisper.transcription', {}) or {}
+        self.beam_size = transcription_config.get('beam_size', 5)
+        self.chunked = transcription_config.get('chunked', True)
+        self.chunk_seconds = transcription_config.get('chunk_seconds', 120)
+        self.workers = max(1, int(transcription_config.get('workers', 2)))
+        self.min_silence_ms = transcription_config.get('min_silence_ms', 500)
+        # 转录语言，未配置时自动检测
+        self.language = model_loader.config.get('whisper.language') or None
 
     def transcribe(self, audio_file: str):
-        if not self.whisper_model:  # 如果模型没有成功加载
-            log.error("Whisper model not available for transcription.")  # 记录错误日志
-            return None, None, None  # 返回空结果
-        log.info(f"Transcribing audio file: {audio_file} (this may take a while)...")  # 日志提示开始处理音频文件
-        # 调用模型进行转录，启用 beam search 和词级时间戳
-        segments, info = self.whisper_model.transcribe(audio_file, beam_size=5, word_timestamps=True)
-        full_text = ""  # 初始化全文字符串
+        with self.model_loader.lease("whisper") as whisper_model:
+            if not whisper_model:  # 如果模型没有成功加载
+                log.error("Whisper model not available for transcription.")  # 记录错误日志
+                return None, None, None  # 返回空结果
+            log.info(f"Transcribing audio file: {audio_file} (this may take a while)...")  # 日志提示开始处理音频文件
+
+            chunks, duration = self._split_on_silence(audio_file) if self.chunked else (None, None)
+            if not chunks or len(chunks) == 1:
+                # 音频较短或未启用分块：整段转录（已解码过的波形直接复用，不再重复解码）
+                audio = chunks[0][1] if chunks else audio_file
+                segments, info = whisper_model.transcribe(
+                    audio, beam_size=self.beam_size, word_timestamps=True, language=self.language
+                )
+                segments_info = self._collect_segments(segments, 0.0, desc="Processing transcription segments")
+            else:
+                segments_info, info = self._transcribe_chunks(whisper_model, chunks, duration)
+
+        full_text = "".join(segment["text"] for segment in segments_info)  # 拼接全文
+        log.info("Audio transcription complete.")  # 日志提示转录完成
+        # 返回：全文文本、结构化片段信息、附加转录元数据
+        return full_text, segments_info, info
+
+    def _split_on_silence(self, audio_file: str):
+        """
+        用 VAD 检测语音区间，并在静音处把音频切分为不超过 chunk_seconds 的块。
+        返回 ([(块起点秒数, 波形数组), ...], 整段音频秒数)。
+        """
+        audio = decode_audio(audio_file, sampling_rate=self.SAMPLING_RATE)
+        duration = len(audio) / self.SAMPLING_RATE
+        if len(audio) <= self.chunk_seconds * self.SAMPLING_RATE:
+            return [(0.0, audio)], duration
+
+        speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=self.min_silence_ms))
+        if not speech:
+            return [(0.0, audio)], duration
+
+        max_samples = int(self.chunk_seconds * self.SAMPLING_RATE)
+        pad = int(0.2 * self.SAMPLING_RATE)  # 块两端保留少量静音，避免截断首尾音节
+        chunks = []
+        chunk_start, chunk_end = speech[0]['start'], speech[0]['end']
+        for region in speech[1:]:
+            if region['end'] - chunk_start > max_samples:
+                chunks.append((chunk_start, chunk_end))
+                chunk_start = region['start']
+            chunk_end = region['end']
+        chunks.append((chunk_start, chunk_end))
+
+        result = []
+        for start, end in chunks:
+            start = max(0, start - pad)
+            end = min(len(audio), end + pad)
+            result.append((start / self.SAMPLING_RATE, audio[start:end]))
+        log.info(f"Split audio into {len(result)} chunks on silence for parallel transcription ({self.workers} workers).")
+        return result, duration
+
+    def _transcribe_chunks(self, whisper_model, chunks, duration: float):
+        """
+        并行转录各音频块，并按块顺序拼接结果。
+        未配置语言时先转录第一块并以其检测结果作为整段音频的语言，避免各块分别检测出不同的语言。
+        返回的 info 以第一块的元数据为基础（语言及其概率来自第一块），
+        duration 为整段音频时长，duration_after_vad 为各块之和。
+        """
+        def transcribe_chunk(chunk, language):
+            offset, audio = chunk
+            segments, info = whisper_model.transcribe(
+                audio, beam_size=self.beam_size, word_timestamps=True, language=language
+            )
+            return self._collect_segments(segments, offset), info
+
+        with tqdm(total=len(chunks), desc="Transcribing audio chunks") as bar:
+            language = self.language
+            results = []
+            if language is None:
+                results.append(transcribe_chunk(chunks[0], None))
+                language = results[0][1].language
+                log.info(f"Detected language '{language}' on the first chunk, using it for all chunks.")
+                bar.update(1)
+
+            def transcribe_remaining(chunk):
+                result = transcribe_chunk(chunk, language)
+                bar.update(1)
+                return result
+
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="whisper") as executor:
+                results.extend(executor.map(transcribe_remaining, chunks[len(results):]))
+
+        segments_info = [segment for chunk_segments, _ in results for segment in chunk_segments]
+        return segments_info, self._merge_info([info for _, info in results], duration)
+
+    @staticmethod
+    def _merge_info(infos, duration: float):
+        """把各块的 TranscriptionInfo 合并为整段音频的元数据（新版 faster-whisper 为 dataclass，旧版为 NamedTuple）。"""
+        fields = {
+            "duration": duration,
+            "duration_after_vad": sum(info.duration_after_vad for info in infos),
+        }
+        if dataclasses.is_dataclass(infos[0]):
+            return dataclasses.replace(infos[0], **fields)
+        return infos[0]._replace(**fields)
+
+    @staticmethod
+    def _collect_segments(segments, offset: float, desc: str = None) -> List[Dict]:
+        """把 Whisper 片段转为结构化字典，所有时间戳加上块起点偏移。"""
         segments_info = []  # 初始化片段信息列表
-        # 遍历所有转录片段，显示进度条
-        for segment in tqdm(segments, desc="Processing transcription segments"):
-            full_text += segment.text  # 拼接每段文本到全文
+        iterable = tqdm(segments, desc=desc) if desc else segments
+        for segment in iterable:
             words_info = []  # 当前片段的词信息列表
             if segment.words:  # 如果该片段包含词级信息
                 for word in segment.words:  # 遍历所有词
                     # 添加词的文本及起止时间到词信息列表
-                    words_info.append({"word": word.word, "start": word.start, "end": word.end})
+                    words_info.append({"word": word.word, "start": word.start + offset, "end": word.end + offset})
             # 组装当前片段的结构化信息并添加到片段列表中
-            segments_info.append({"start": segment.start, "end": segment.end, "text": segment.text, "words": words_info})
-        log.info("Audio transcription complete.")  # 日志提示转录完成
-        # 返回：全文文本、结构化片段信息、附加转录元数据
-        return full_text, segments_info, info
+            segments_info.append({"start": segment.start + offset, "end": segment.end + offset, "text": segment.text, "words": words_info})
+        return segments_info
@@ -0,0 +1,103 @@
+import re
+from typing import List, Dict, Any, Optional
+
+from src.logger import log
+
+
+class CandidateRanker:
+    """
+    在下载之前，仅根据提供者返回的元数据为候选素材打分排序。
+    评分维度：时长是否覆盖镜头、方向、分辨率、帧率、文件大小、关键词匹配度。
+    元数据缺失的维度给中性分，不会因为提供者信息不全而被直接淘汰。
+    """
+
+    DEFAULT_WEIGHTS = {
+        'duration': 0.40,
+        'keyword': 0.20,
+        'resolution': 0.15,
+        'orientation': 0.10,
+        'fps': 0.10,
+        'file_size': 0.05,
+    }
+    NEUTRAL_SCORE = 0.5
+
+    def __init__(self, config: dict):
+        composition_config = config.get('video_composition', {}) or {}
+        width, height = composition_config.get('resolution', [1920, 1080])
+        self.target_width = int(width)
+        self.target_height = int(height)
+        self.target_fps = float(composition_config.get('fps', 30))
+
+        ranking_config = config.get('asset_search', {}).get('ranking', {}) or {}
+        self.weights = {**self.DEFAULT_WEIGHTS, **ranking_config.get('weights', {})}
+
+    def rank(self, candidates: List[Dict[str, Any]], keyword: str, min_duration: float = 0) -> List[Dict[str, Any]]:
+        """
+        返回按得分从高到低排序的候选列表（稳定排序，同分保持提供者原有顺序）。
+        每个候选会被写入 'rank_score' 字段，便于日志排查。
+        """
+        if not candidates:
+            return []
+
+        sizes = [c.get('file_size') for c in candidates if c.get('file_size')]
+        max_size = max(sizes) if sizes else None
+        keyword_tokens = self._tokenize(keyword)
+
+        for candidate in candidates:
+            scores = {
+                'duration': self._score_duration(candidate.get('duration'), min_duration),
+                'keyword': self._score_keyword(candidate, keyword_tokens),
+                'resolution': self._score_resolution(candidate.get('width'), candidate.get('height')),
+                'orientation': self._score_orientation(candidate.get('width'), candidate.get('height')),
+                'fps': self._score_fps(candidate.get('fps')),
+                'file_size': self._score_file_size(candidate.get('file_size'), max_size),
+            }
+            candidate['rank_score'] = round(sum(self.weights.get(k, 0) * v for k, v in scores.items()), 4)
+            log.debug(f"      -> 候选素材 {candidate.get('id')} 得分 {candidate['rank_score']}: {scores}")
+
+        return sorted(candidates, key=lambda c: c['rank_score'], reverse=True)
+
+    @staticmethod
+    def _tokenize(text: str) -> set:
+        return {t for t in re.split(r'[^\w]+', (text or '').lower()) if t}
+
+    def _score_duration(self, duration: Optional[float], min_duration: float) -> float:
+        """时长不足会导致 tpad 静帧补齐，按覆盖比例扣分。"""
+        if not duration:
+            return self.NEUTRAL_SCORE
+        if not min_duration or duration >= min_duration:
+            return 1.0
+        return max(0.0, duration / min_duration) * 0.8
+
+    def _score_keyword(self, candidate: Dict[str, Any], keyword_tokens: set) -> float:
+        if not keyword_tokens:
+            return self.NEUTRAL_SCORE
+        tags = candidate.get('tags') or []
+        text = " ".join([candidate.get('video_name') or '', candidate.get('description') or ''] + list(tags))
+        candidate_tokens = self._tokenize(text)
+        if not candidate_tokens:
+            return self.NEUTRAL_SCORE
+        return len(keyword_tokens & candidate_tokens) / len(keyword_tokens)
+
+    def _score_resolution(self, width: Optional[int], height: Optional[int]) -> float:
+        if not width or not height:
+            return self.NEUTRAL_SCORE
+        # 与合成器的 force_original_aspect_ratio=decrease 一致：任一边达到目标即无需放大
+        coverage = max(width / self.target_width, height / self.target_height)
+        return min(1.0, coverage)
+
+    def _score_orientation(self, width: Optional[int], height: Optional[int]) -> float:
+        if not width or not height:
+            return self.NEUTRAL_SCORE
+        target_landscape = self.target_width >= self.target_height
+        return 1.0 if (width >= height) == target_landscape else 0.0
+
+    def _score_fps(self, fps: Optional[float]) -> float:
+        if not fps:
+            return self.NEUTRAL_SCORE
+        return min(1.0, fps / self.target_fps)
+
+    def _score_file_size(self, file_size: Optional[int], max_size: Optional[int]) -> float:
+        if not file_size or not max_size:
+            return self.NEUTRAL_SCORE
+        return 1.0 - (file_size / max_size) * 0.5
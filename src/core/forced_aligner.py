@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+forced_aligner.py
+
+已知文稿时的强制对齐：文稿先按块合成 TTS，再拼接为最终音频，因此每个块在最终音频中的
+时间窗口、以及块内的文字都是已知的。本模块只需在每个块内按字符比例估计句子边界，
+再吸附到块音频中最近的静音区间，即可得到句子级时间轴，无需运行 Whisper 识别。
+
+静音吸附失败的比例过高、或有句子跨越两个块时，置信度会降低，由调用方退回到 Whisper 对齐。
+"""
+import wave
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+from .text import TextProcessor
+
+
+def wav_duration(path: str) -> float:
+    """读取 WAV 文件头，返回时长（秒）。"""
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def read_wav_mono(path: str) -> Tuple[np.ndarray, int]:
+    """读取 PCM WAV 文件，返回 (单声道 float32 波形, 采样率)。"""
+    with wave.open(path, 'rb') as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        frames = wav.readframes(wav.getnframes())
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(sample_width)
+    if dtype is None:
+        raise ValueError(f"Unsupported WAV sample width {sample_width} in {path}")
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if sample_width == 1:
+        samples -= 128
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+class ForcedAligner:
+    """
+    基于 TTS 分块时间窗口和静音检测的句子级强制对齐器。
+    """
+
+    FRAME_SECONDS = 0.02          # 能量分析帧长
+    MIN_SILENCE_SECONDS = 0.15    # 视为句间停顿的最短静音
+    SILENCE_RATIO = 0.1           # 低于语音帧中位能量该比例的帧视为静音
+
+    def __init__(self, text_processor: TextProcessor, snap_tolerance: float = 0.8, workers: int = 4):
+        self.text_processor = text_processor
+        self.snap_tolerance = snap_tolerance
+        self.workers = max(1, workers)
+
+    def assign_sentences(self, sentences: List[str], chunks: List[Dict]) -> List[List[Tuple]]:
+        """
+        将句子按顺序归入各 TTS 块。
+
+        Returns:
+            每块一个列表，元素为 (句子, 起始字符, 结束字符)，字符位置以整篇规范化文稿为基准；
+            在文稿中定位不到的句子归入当前块，字符位置为 None。
+        """
+        return self._assign(sentences, chunks)[0]
+
+    def _assign(self, sentences: List[str], chunks: List[Dict]):
+        """assign_sentences 的实现，额外返回各块在规范化字符流中的边界数组。"""
+        chunk_texts = self.text_processor.normalize_batch([c['text'] for c in chunks])
+        sentence_texts = self.text_processor.normalize_batch(sentences)
+
+        # 各块在规范化文稿字符流中的区间
+        chunk_bounds = np.cumsum([0] + [len(t) for t in chunk_texts])
+        stream = "".join(chunk_texts)
+
+        per_chunk = [[] for _ in chunks]
+        cursor = 0
+        chunk_index = 0
+        for sentence, normalized in zip(sentences, sentence_texts):
+            if not normalized:
+                continue
+            pos = stream.find(normalized, cursor)
+            if pos < 0:
+                logging.debug(f"Could not locate sentence in TTS chunks: '{sentence}'")
+                per_chunk[chunk_index].append((sentence, None, None))
+                continue
+            # 句子归入其起点所在的块
+            chunk_index = int(np.searchsorted(chunk_bounds, pos, side='right')) - 1
+            per_chunk[chunk_index].append((sentence, pos, pos + len(normalized)))
+            cursor = pos + len(normalized)
+        return per_chunk, chunk_bounds
+
+    def align(self, sentences: List[str], chunks: List[Dict]) -> Tuple[List[Dict], float]:
+        """
+        Args:
+            sentences: 字幕句子列表（与 TTS 分块来自同一份文稿）。
+            chunks: 每个 TTS 块一项，包含 text、start、end（在最终音频中的秒数）和 audio_path。
+
+        Returns:
+            (aligned_data, confidence)。aligned_data 与 Whisper 对齐的输出结构一致；
+            confidence 为句子定位率与句间边界吸附到静音的比例之积 (0-1)。
+            跨越块边界的句子只能归入起点所在的块，结束时间会被截断在该块末尾，因此不计入定位成功的句子。
+        """
+        per_chunk, chunk_bounds = self._assign(sentences, chunks)
+        expected = sum(len(items) for items in per_chunk)
+        per_chunk = [[item for item in items if item[1] is not None] for items in per_chunk]
+
+        # 各块互不依赖，并行处理
+        jobs = [
+            (chunk, chunk_bounds[i], chunk_bounds[i + 1], items)
+            for i, (chunk, items) in enumerate(zip(chunks, per_chunk))
+            if items and chunk_bounds[i + 1] > chunk_bounds[i]
+        ]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda job: self._align_chunk(*job), jobs))
+
+        aligned_data = []
+        snapped, boundaries = 0, 0
+        for entries, chunk_snapped, chunk_boundaries in results:
+            aligned_data.extend(entries)
+            snapped += chunk_snapped
+            boundaries += chunk_boundaries
+
+        located = sum(len(items) for items in per_chunk)
+        spanning = sum(
+            1 for i, items in enumerate(per_chunk) for _, _, end in items if end > chunk_bounds[i + 1]
+        )
+        coverage = (located - spanning) / expected if expected else 0.0
+        snap_rate = snapped / boundaries if boundaries else 1.0
+        confidence = coverage * snap_rate
+        logging.info(f"Forced alignment: located {located}/{expected} sentences ({spanning} spanning two chunks), "
+                     f"snapped {snapped}/{boundaries} boundaries to pauses (confidence {confidence:.2f}).")
+        return aligned_data, confidence
+
+    def _align_chunk(self, chunk: Dict, chunk_lo: int, chunk_hi: int, items) -> Tuple[List[Dict], int, int]:
+        """在单个块的时间窗口内为其句子分配时间。"""
+        samples, rate = read_wav_mono(chunk['audio_path'])
+        silences = self._find_silences(samples, rate)
+        duration = len(samples) / rate
+
+        # 语音的实际起止（去掉块首尾静音）
+        speech_start = silences[0][1] if silences and silences[0][0] <= 0 else 0.0
+        speech_end = silences[-1][0] if silences and silences[-1][1] >= duration - self.FRAME_SECONDS else duration
+        speech_span = max(speech_end - speech_start, 1e-3)
+        chunk_chars = chunk_hi - chunk_lo
+        internal = [s for s in silences if speech_start < s[0] and s[1] < speech_end]
+
+        # 句间边界：按字符比例估计，再吸附到最近的、位于上一边界之后的静音区间
+        cuts = []
+        snapped = 0
+        last_time = speech_start
+        for (_, _, prev_end), (_, next_start, _) in zip(items[:-1], items[1:]):
+            boundary_char = (prev_end + next_start) / 2 - chunk_lo
+            estimate = speech_start + speech_span * boundary_char / chunk_chars
+            candidates = [s for s in internal if s[0] >= last_time and abs((s[0] + s[1]) / 2 - estimate) <= self.snap_tolerance]
+            if candidates:
+                best = min(candidates, key=lambda s: abs((s[0] + s[1]) / 2 - estimate))
+                cuts.append(best)
+                snapped += 1
+                last_time = best[1]
+            else:
+                cuts.append((max(estimate, last_time), max(estimate, last_time)))
+                last_time = max(estimate, last_time)
+
+        entries = []
+        starts = [speech_start] + [cut[1] for cut in cuts]
+        ends = [cut[0] for cut in cuts] + [speech_end]
+        for (sentence, _, _), start, end in zip(items, starts, ends):
+            entries.append({
+                "text": sentence,
+                "start": float(chunk['start'] + start),
+                "end": float(chunk['start'] + max(end, start)),
+                "source": "text_file"
+            })
+        return entries, snapped, len(cuts)
+
+    def _find_silences(self, samples: np.ndarray, rate: int) -> List[Tuple[float, float]]:
+        """基于短时能量检测静音区间，返回 [(开始秒, 结束秒), ...]。"""
+        frame = max(1, int(rate * self.FRAME_SECONDS))
+        n_frames = len(samples) // frame
+        if n_frames == 0:
+            return []
+        energy = np.sqrt(np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+        voiced = energy[energy > 0]
+        if voiced.size == 0:
+            return [(0.0, len(samples) / rate)]
+        threshold = np.median(voiced) * self.SILENCE_RATIO
+        silent = energy <= threshold
+
+        # 提取连续静音帧的区间
+        edges = np.diff(np.concatenate([[0], silent.astype(np.int8), [0]]))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        min_frames = int(self.MIN_SILENCE_SECONDS / self.FRAME_SECONDS)
+        return [
+            (start * self.FRAME_SECONDS, end * self.FRAME_SECONDS)
+            for start, end in zip(run_starts, run_ends)
+            if end - start >= min_frames or start == 0 or end == n_frames
+        ]
@@ -6,7 +6,7 @@ from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 import os
 import shutil
-from src.core.asset_manager import AssetManager
+from src.core.asset_manager import get_asset_manager, release_asset_manager
 from src.config_loader import config
 from src.logger import log
 # from ..utils import get_terminal_width_by_ratio
@@ -315,13 +315,15 @@ class FrameAccurateVideoComposer:
         """
         log.info(f"  -> 正在为场景替换素材: {scene.get('asset_path')}")
         try:
-            asset_manager = AssetManager(config, self.task_id)
+            asset_manager = get_asset_manager(config, self.task_id)
             online_search_count = config.get('asset_search', {}).get('online_search_count', 10)
         except Exception as e:
             log.error(f"  -> 替换失败：初始化 AssetManager 失败。错误: {e}")
             return False
 
         old_asset_path = scene.get('asset_path')
+        # 有问题的旧素材也要登记，避免替换时又选回它
+        asset_manager.mark_asset_used(scene)
         found_video_info_list = asset_manager.find_assets_for_scene(scene, online_search_count)
         
         if not found_video_info_list:
@@ -463,29 +465,33 @@ class FrameAccurateVideoComposer:
         segment_results = []
         max_retries = 1
         print(f"\n🎞️ 共 {len(self.structure)} 个视频段落待处理")
-        for i, segment in enumerate(self.structure):
-            print(f"\n🎬 正在处理 Segment {i+1}/{len(self.structure)}")
+        try:
+            for i, segment in enumerate(self.structure):
+                print(f"\n🎬 正在处理 Segment {i+1}/{len(self.structure)}")
             
-            result = None
-            for attempt in range(max_retries + 1):
-                try:
-                    result = self.process_segment(segment, i)
-                    break
-                except RuntimeError as e:
-                    log.error(f"生成 Segment {i} 失败 (尝试 {attempt + 1}/{max_retries + 1})。错误: {e}")
-                    if attempt < max_retries:
-                        recovery_successful = self._handle_segment_failure(segment, i)
-                        if recovery_successful:
-                            log.success(f"恢复成功，正在重试 Segment {i}...")
-                            continue
+                result = None
+                for attempt in range(max_retries + 1):
+                    try:
+                        result = self.process_segment(segment, i)
+                        break
+                    except RuntimeError as e:
+                        log.error(f"生成 Segment {i} 失败 (尝试 {attempt + 1}/{max_retries + 1})。错误: {e}")
+                        if attempt < max_retries:
+                            recovery_successful = self._handle_segment_failure(segment, i)
+                            if recovery_successful:
+                                log.success(f"恢复成功，正在重试 Segment {i}...")
+                                continue
+                            else:
+                                log.error(f"恢复失败，终止 Segment {i} 的处理。")
+                                raise e
                         else:
-                            log.error(f"恢复失败，终止 Segment {i} 的处理。")
+                            log.error(f"已达到最大重试次数，Segment {i} 彻底失败。")
                             raise e
-                    else:
-                        log.error(f"已达到最大重试次数，Segment {i} 彻底失败。")
-                        raise e
             
-            segment_results.append(result)
+                segment_results.append(result)
+        finally:
+            # 素材替换只发生在分段处理期间，处理完后释放任务级的素材管理器
+            release_asset_manager(self.task_id)
 
         # --- 合并最终视频 ---
         self.combine_segments(segment_results, true_audio_duration)
@@ -25,7 +25,7 @@ from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 import os
 import shutil
-from src.core.asset_manager import AssetManager
+from src.core.asset_manager import AssetManager, get_asset_manager, release_asset_manager
 from src.config_loader import config
 from src.logger import log
 from src.utils import run_command
@@ -109,6 +109,70 @@ class FrameAccurateVideoComposerV2:
         except (RuntimeError, ValueError):
             return 0.0
 
+    def probe_asset(self, path):
+        """🔎 用一次 ffprobe 读取素材的时长以及首个视频流的宽、高、帧率；读取失败的字段为 None（时长为 0.0）"""
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,r_frame_rate:format=duration",
+            "-of", "json",
+            str(path)
+        ]
+        probe = {"duration": 0.0, "width": None, "height": None, "fps": None}
+        try:
+            result = run_command(cmd, f"Failed to probe {path}")
+            data = json.loads(result.stdout)
+        except (RuntimeError, ValueError):
+            return probe
+
+        try:
+            probe["duration"] = float(data.get("format", {}).get("duration", 0.0))
+        except (TypeError, ValueError):
+            pass
+        stream = (data.get("streams") or [{}])[0]
+        probe["width"], probe["height"] = stream.get("width"), stream.get("height")
+        num, _, den = str(stream.get("r_frame_rate", "")).partition("/")
+        try:
+            probe["fps"] = float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            pass
+        return probe
+
+    def _probe_scene(self, scene, probe):
+        """记录素材探测结果：real_duration 用于静帧补齐，source_stream 用于判断能否跳过缩放和帧率转换"""
+        scene["real_duration"] = probe["duration"]
+        scene["source_stream"] = {key: probe[key] for key in ("width", "height", "fps")}
+
+    def _source_matches_output(self, scene):
+        """判断本地素材文件（经 ffprobe 确认）是否已与输出分辨率一致"""
+        stream = scene.get("source_stream") or {}
+        return stream.get("width") == self.width and stream.get("height") == self.height
+
+    def _source_matches_fps(self, scene):
+        """判断本地素材文件（经 ffprobe 确认）的帧率是否已与输出帧率一致"""
+        fps = (scene.get("source_stream") or {}).get("fps")
+        return bool(fps) and abs(fps - self.fps) < 0.01
+
+    def _build_scene_filter(self, idx, scene, frames, v_label):
+        """🧩 构建单个场景的滤镜链：缩放/填充 → 帧率 → 静帧补齐 → 按帧裁剪"""
+        filters = []
+        if not self._source_matches_output(scene):
+            filters.append(f"scale={self.width}:{self.height}:force_original_aspect_ratio=decrease")
+            filters.append(f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2")
+        filters.append("setsar=1")
+        if not self._source_matches_fps(scene):
+            filters.append(f"fps={self.fps}")
+
+        allocated_duration = frames / self.fps
+        real_duration = scene.get("real_duration", 0)
+        if allocated_duration > real_duration and real_duration > 0:
+            pad_duration = allocated_duration - real_duration
+            filters.append(f"tpad=stop_mode=clone:stop_duration={pad_duration}")
+
+        filters.append(f"select='between(n,0,{frames-1})'")
+        filters.append("setpts=PTS-STARTPTS")
+        return f"[{idx}:v]" + ",".join(filters) + f"[{v_label}];"
+
     def process_segment(self, segment, seg_index):
         """🎬 基于帧数分配段落时长，生成段落视频，确保零误差"""
         scenes = segment.get("scenes", [])
@@ -128,13 +192,13 @@ class FrameAccurateVideoComposerV2:
         # 计算目标时长所需的总帧数
         target_total_frames = int(round(target_duration * self.fps))
         
-        # 并发获取每个素材文件的实际时长
+        # 并发探测每个素材文件的实际时长和码流信息
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            real_durations = list(tqdm(executor.map(self.get_duration, asset_paths),
-                                    total=len(scenes),
-                                    desc=f"⏱️ Getting asset durations for Segment {seg_index:02d}"))
-        for scene, real_dur in zip(scenes, real_durations):
-            scene["real_duration"] = real_dur
+            probes = list(tqdm(executor.map(self.probe_asset, asset_paths),
+                               total=len(scenes),
+                               desc=f"⏱️ Probing assets for Segment {seg_index:02d}"))
+        for scene, probe in zip(scenes, probes):
+            self._probe_scene(scene, probe)
 
         # 根据每个场景的 'time' 比例，在场景间分配总帧数
         total_time_ratio = sum(scene["time"] for scene in scenes)
@@ -160,19 +224,7 @@ class FrameAccurateVideoComposerV2:
             frames = scene["allocated_frames"]
             v_label = f"v{idx}"
             
-            base_filter = (f"[{idx}:v]scale={self.width}:{self.height}:force_original_aspect_ratio=decrease,"
-                           f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={self.fps}")
-
-            pad_filter = ""
-            allocated_duration = frames / self.fps
-            real_duration = scene.get("real_duration", 0)
-            if allocated_duration > real_duration and real_duration > 0:
-                pad_duration = allocated_duration - real_duration
-                pad_filter = f",tpad=stop_mode=clone:stop_duration={pad_duration}"
-
-            trim_and_pts_filter = f",select='between(n,0,{frames-1})',setpts=PTS-STARTPTS[{v_label}];"
-            
-            filter_lines.append(base_filter + pad_filter + trim_and_pts_filter)
+            filter_lines.append(self._build_scene_filter(idx, scene, frames, v_label))
             concat_labels.append(f"[{v_label}]")
 
             origin = scene["time"]
@@ -243,19 +295,7 @@ class FrameAccurateVideoComposerV2:
             total_frames += frames
             v_label = f"v{idx}"
             
-            base_filter = (f"[{idx}:v]scale={self.width}:{self.height}:force_original_aspect_ratio=decrease,"
-                           f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={self.fps}")
-            
-            pad_filter = ""
-            allocated_duration = frames / self.fps
-            real_duration = scene.get("real_duration", 0)
-            if allocated_duration > real_duration and real_duration > 0:
-                pad_duration = allocated_duration - real_duration
-                pad_filter = f",tpad=stop_mode=clone:stop_duration={pad_duration}"
-
-            trim_and_pts_filter = f",select='between(n,0,{frames-1})',setpts=PTS-STARTPTS[{v_label}];"
-            
-            filter_lines.append(base_filter + pad_filter + trim_and_pts_filter)
+            filter_lines.append(self._build_scene_filter(idx, scene, frames, v_label))
             concat_labels.append(f"[{v_label}]")
 
         filter_complex = "".join(filter_lines)
@@ -302,20 +342,23 @@ class FrameAccurateVideoComposerV2:
         """为有问题的场景替换素材"""
         log.info(f"  -> Replacing asset for scene: {scene.get('asset_path')}")
         try:
-            asset_manager = AssetManager(config, self.task_id)
+            asset_manager = get_asset_manager(config, self.task_id)
             online_search_count = config.get('asset_search', {}).get('online_search_count', 10)
         except Exception as e:
             log.error(f"  -> Replacement failed: Could not initialize AssetManager. Error: {e}")
             return False
 
         old_asset_path = scene.get('asset_path')
+        # 有问题的旧素材也要登记，避免替换时又选回它
+        asset_manager.mark_asset_used(scene)
         found_video_info_list = asset_manager.find_assets_for_scene(scene, online_search_count)
         
         if not found_video_info_list:
             log.error(f"  -> Could not find a replacement asset.")
             return False
 
-        new_asset_path = found_video_info_list[0].get('local_path')
+        new_video_info = found_video_info_list[0]
+        new_asset_path = new_video_info.get('local_path')
         if not new_asset_path or not os.path.exists(new_asset_path):
             log.error(f"  -> AssetManager returned an invalid new asset path.")
             return False
@@ -324,6 +367,8 @@ class FrameAccurateVideoComposerV2:
             if os.path.exists(old_asset_path):
                 os.remove(old_asset_path)
             shutil.move(new_asset_path, old_asset_path)
+            # 同步更新新素材的来源信息
+            scene['asset_meta'] = AssetManager.describe_asset(new_video_info)
             log.success(f"  -> Successfully replaced asset, moving '{new_asset_path}' to '{old_asset_path}'")
             return True
         except Exception as e:
@@ -355,9 +400,8 @@ class FrameAccurateVideoComposerV2:
                         log.error("  -> Asset replacement failed, aborting recovery for this segment.")
                         return False
                     
-                    # 素材替换成功后，需要重新获取它的真实时长
-                    new_duration = self.get_duration(scene['asset_path'])
-                    scene['real_duration'] = new_duration
+                    # 素材替换成功后，需要重新探测它的真实时长和码流信息
+                    self._probe_scene(scene, self.probe_asset(scene['asset_path']))
 
                     log.info("  -> Asset replaced successfully. Re-validating the entire segment from the beginning.")
                     break
@@ -461,33 +505,37 @@ class FrameAccurateVideoComposerV2:
         segment_results = []
         max_retries = 1 # 每个段落的最大恢复尝试次数
         print(f"\n🎞️ Found {len(self.structure)} video segments to process")
-        for i, segment in enumerate(self.structure):
-            print(f"\n🎬 Processing Segment {i+1}/{len(self.structure)}")
+        try:
+            for i, segment in enumerate(self.structure):
+                print(f"\n🎬 Processing Segment {i+1}/{len(self.structure)}")
             
-            result = None
-            for attempt in range(max_retries + 1):
-                try:
-                    result = self.process_segment(segment, i)
-                    break # 如果成功，则跳出重试循环
-                except Exception as e:
-                    log.error(f"Failed to generate Segment {i} (Attempt {attempt + 1}/{max_retries + 1}). Error: {e}")
-                    if attempt < max_retries and self.strict_mode is False:
-                        recovery_successful = self._handle_segment_failure(segment, i)
-                        if recovery_successful:
-                            log.success(f"Recovery successful. Retrying Segment {i}...")
-                            continue # 继续下一次尝试
+                result = None
+                for attempt in range(max_retries + 1):
+                    try:
+                        result = self.process_segment(segment, i)
+                        break # 如果成功，则跳出重试循环
+                    except Exception as e:
+                        log.error(f"Failed to generate Segment {i} (Attempt {attempt + 1}/{max_retries + 1}). Error: {e}")
+                        if attempt < max_retries and self.strict_mode is False:
+                            recovery_successful = self._handle_segment_failure(segment, i)
+                            if recovery_successful:
+                                log.success(f"Recovery successful. Retrying Segment {i}...")
+                                continue # 继续下一次尝试
+                            else:
+                                log.error(f"Recovery failed. Aborting processing for Segment {i}.")
+                                result = None # 标记为失败
+                                break # 恢复失败，跳出重试
                         else:
-                            log.error(f"Recovery failed. Aborting processing for Segment {i}.")
-                            result = None # 标记为失败
-                            break # 恢复失败，跳出重试
-                    else:
-                        log.error(f"Max retries reached or strict mode is on. Segment {i} has failed permanently.")
-                        if self.strict_mode:
-                            raise e # 严格模式下直接抛出异常
-                        result = None # 非严格模式下标记失败
-                        break # 跳出重试
+                            log.error(f"Max retries reached or strict mode is on. Segment {i} has failed permanently.")
+                            if self.strict_mode:
+                                raise e # 严格模式下直接抛出异常
+                            result = None # 非严格模式下标记失败
+                            break # 跳出重试
             
-            segment_results.append(result)
+                segment_results.append(result)
+        finally:
+            # 素材替换只发生在分段处理期间，处理完后释放任务级的素材管理器
+            release_asset_manager(self.task_id)
 
         self.combine_segments(segment_results, true_audio_duration)
         
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from src import metrics
+from src.logger import log
+
+
+class LlmResponseCache:
+    """
+    LLM 响应的持久化缓存（SQLite）。
+    键由 提供者 + 模型 + 调用方式（generate/chat）+ 提示词（或消息列表）+ 采样参数 计算哈希得到，
+    支持 TTL 过期，条目数超过上限时按最近使用时间淘汰最久未用的条目。
+    """
+
+    # 每写入这么多条目清理一次过期和超量的条目
+    EVICT_INTERVAL = 50
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 同一连接供多个线程（以及事件循环）使用，访问由 _lock 串行化
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            self._evict()
+
+    @staticmethod
+    def make_key(provider: str, model: Optional[str], kind: str, payload: Any, params: Dict[str, Any]) -> str:
+        """生成缓存键：参数按键名排序，None 值不参与，数值统一为浮点数（temperature=0 与 0.0 视为相同）。"""
+        normalized = sorted(
+            (k, float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v)
+            for k, v in params.items() if v is not None
+        )
+        data = json.dumps([provider, model, kind, payload, normalized], ensure_ascii=False, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """命中且未过期时返回缓存的响应文本，否则返回 None。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, response: str, provider: str = None, model: str = None):
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, provider, model, response, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, response, now, now),
+                )
+                self._puts += 1
+                if self._puts % self.EVICT_INTERVAL == 0:
+                    self._evict()
+        except sqlite3.Error as e:
+            log.warning(f"写入 LLM 响应缓存失败: {e}")
+
+    def delete(self, key: str):
+        """删除一个条目（调用方发现缓存的响应无效时使用）。"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            log.warning(f"删除 LLM 响应缓存失败: {e}")
+
+    def _evict(self):
+        """删除过期条目；条目数仍超过上限时，按最近使用时间删除最久未用的条目。调用方需持有 _lock。"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+
+_caches: Dict[str, LlmResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(config: dict) -> Optional[LlmResponseCache]:
+    """
+    按数据库路径返回进程内共享的缓存实例；配置中禁用时返回 None。
+    """
+    cache_config = config.get('llm_providers', {}).get('cache', {}) or {}
+    if not cache_config.get('enabled', True):
+        return None
+
+    path = cache_config.get('path', 'storage/cache/llm_cache.sqlite3')
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LlmResponseCache(
+                path,
+                ttl_seconds=float(cache_config.get('ttl_hours', 168)) * 3600,
+                max_entries=int(cache_config.get('max_entries', 20000)),
+            )
+            metrics.register_source("llm_cache", _caches[path].stats)
+        return _caches[path]
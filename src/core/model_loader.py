@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import logging
+import time
+import threading
+from contextlib import contextmanager
 from threading import Lock
-from faster_whisper import WhisperModel
+from src.core.whisper_factory import get_whisper_model, release_whisper_model
 from sentence_transformers import SentenceTransformer
 from opencc import OpenCC
 from src.config_loader import Config
@@ -29,8 +32,26 @@ class SingletonMeta(type):
 class ModelLoader(metaclass=SingletonMeta):
     """
     A singleton class to load and provide access to shared models.
-    Ensures that each model is loaded only once.
+    Each model is loaded lazily on its first get_* call, exactly once even under
+    concurrent access. Models can optionally be warmed up in the background at
+    server startup and unloaded again after an idle timeout.
+
+    Code that keeps using a model across several calls should hold it through
+    lease(); a leased model is never unloaded by the idle monitor.
     """
+
+    # Models that can be warmed up / unloaded, mapped to their attribute names.
+    MODEL_ATTRS = {
+        "opencc": "opencc",
+        "sentence_transformer": "sentence_model",
+        "whisper": "whisper_model",
+    }
+    # Getter method for each model.
+    MODEL_GETTERS = {
+        "opencc": "get_opencc",
+        "sentence_transformer": "get_sentence_model",
+        "whisper": "get_whisper_model",
+    }
     def __init__(self, config: Config):
         if not config:
             raise RuntimeError("A valid Config object must be provided to initialize ModelLoader.")
@@ -53,7 +74,15 @@ class ModelLoader(metaclass=SingletonMeta):
         self.whisper_model = None
         self.sentence_model = None
         self.opencc = None
-        self._load_models()
+
+        # One lock per model so that loading Whisper never blocks OpenCC users.
+        self._locks = {name: Lock() for name in self.MODEL_ATTRS}
+        self._last_used = {}
+        self._leases = {name: 0 for name in self.MODEL_ATTRS}
+
+        self._idle_timeout = self.config.get('model_loader.idle_unload_seconds', 0) or 0
+        if self._idle_timeout > 0:
+            threading.Thread(target=self._idle_monitor, name="model-idle-monitor", daemon=True).start()
 
     def _load_sentence_transformer(self):
         """Loads the Sentence Transformer model based on the config."""
@@ -82,7 +111,12 @@ class ModelLoader(metaclass=SingletonMeta):
                     self.model = model
                     self.tokenizer = tokenizer
 
-                def encode(self, text, show_progress_bar=False):
+                def encode(self, text, batch_size=32, show_progress_bar=False):
+                    # Batched input is split into chunks of batch_size to bound memory use.
+                    if isinstance(text, list) and len(text) > batch_size:
+                        import numpy as np
+                        chunks = [self.encode(text[i:i + batch_size], batch_size) for i in range(0, len(text), batch_size)]
+                        return np.concatenate(chunks, axis=0)
                     inputs = self.tokenizer(text, padding=True, truncation=True, return_tensors="pt")
                     outputs = self.model(**inputs)
                     # Mean pooling
@@ -100,36 +134,99 @@ class ModelLoader(metaclass=SingletonMeta):
         
         logging.info("SentenceTransformer model loaded successfully.")
 
-    def _load_models(self):
-        """Loads all necessary models from paths specified in the config."""
+    def _load_opencc(self):
+        logging.info("Loading OpenCC model (t2s)...")
+        self.opencc = OpenCC('t2s')
+        logging.info("OpenCC model loaded.")
+
+    def _load_whisper(self):
+        logging.info(f"Loading Whisper model from local path: '{self.whisper_model_path}'...")
+        self.whisper_model = get_whisper_model(self.whisper_model_path, self.config)
+        logging.info("Whisper model loaded.")
+
+    def _ensure_loaded(self, name: str, loader):
+        """Double-checked, per-model once-initialization."""
+        attr = self.MODEL_ATTRS[name]
+        model = getattr(self, attr)
+        if model is None:
+            with self._locks[name]:
+                model = getattr(self, attr)
+                if model is None:
+                    try:
+                        loader()
+                    except Exception as e:
+                        logging.error(f"Failed to load model '{name}': {e}", exc_info=True)
+                        raise
+                    model = getattr(self, attr)
+        self._last_used[name] = time.monotonic()
+        return model
+
+    def warm_up(self, models=None, background: bool = True):
+        """
+        Loads the given models (default: all) ahead of time, e.g. at server startup,
+        so that the first request does not pay the load time.
+        """
+        models = models or list(self.MODEL_ATTRS)
+
+        def run():
+            for name in models:
+                if name not in self.MODEL_GETTERS:
+                    logging.warning(f"Unknown model '{name}' in warm-up list, skipping.")
+                    continue
+                try:
+                    getattr(self, self.MODEL_GETTERS[name])()
+                except Exception:
+                    pass  # already logged by _ensure_loaded; the next get_* call will retry
+            logging.info(f"Model warm-up finished: {models}")
+
+        if background:
+            threading.Thread(target=run, name="model-warmup", daemon=True).start()
+        else:
+            run()
+
+    @contextmanager
+    def lease(self, name: str):
+        """
+        Yields the model (loading it if needed) and keeps it resident until the
+        block exits. The idle timer restarts when the last lease is released.
+        """
+        with self._locks[name]:
+            self._leases[name] += 1
         try:
-            logging.info("Loading OpenCC model (t2s)...")
-            self.opencc = OpenCC('t2s')
-            logging.info("OpenCC model loaded.")
-
-            self._load_sentence_transformer()
-
-            logging.info(f"Loading Whisper model from local path: '{self.whisper_model_path}'...")
-            self.whisper_model = WhisperModel(self.whisper_model_path, device="cuda", compute_type="int8")
-            logging.info("Whisper model loaded.")
-
-        except Exception as e:
-            logging.error(f"Failed to load one or more models: {e}", exc_info=True)
-            # Depending on the application, you might want to raise the exception
-            # or handle it gracefully.
-            raise
+            yield getattr(self, self.MODEL_GETTERS[name])()
+        finally:
+            with self._locks[name]:
+                self._leases[name] -= 1
+                self._last_used[name] = time.monotonic()
+
+    def unload(self, name: str):
+        """Drops the loader's reference to a model so its memory can be reclaimed. Leased models are kept."""
+        with self._locks[name]:
+            if getattr(self, self.MODEL_ATTRS[name]) is None or self._leases[name] > 0:
+                return
+            setattr(self, self.MODEL_ATTRS[name], None)
+            if name == "whisper":
+                release_whisper_model(self.whisper_model_path, self.config)
+            self._last_used.pop(name, None)
+        logging.info(f"Model '{name}' unloaded after being idle for more than {self._idle_timeout}s.")
+
+    def _idle_monitor(self):
+        """Unloads the heavy models once they have not been requested for idle_unload_seconds."""
+        interval = max(1, min(60, self._idle_timeout / 2))
+        while True:
+            time.sleep(interval)
+            now = time.monotonic()
+            # OpenCC is tiny and used everywhere, so it is kept resident.
+            for name in ("sentence_transformer", "whisper"):
+                last_used = self._last_used.get(name)
+                if last_used is not None and now - last_used > self._idle_timeout:
+                    self.unload(name)
 
     def get_whisper_model(self):
-        if not self.whisper_model:
-            raise RuntimeError("Whisper model is not loaded.")
-        return self.whisper_model
+        return self._ensure_loaded("whisper", self._load_whisper)
 
     def get_sentence_model(self):
-        if not self.sentence_model:
-            raise RuntimeError("SentenceTransformer model is not loaded.")
-        return self.sentence_model
+        return self._ensure_loaded("sentence_transformer", self._load_sentence_transformer)
 
     def get_opencc(self):
-        if not self.opencc:
-            raise RuntimeError("OpenCC model is not loaded.")
-        return self.opencc
+        return self._ensure_loaded("opencc", self._load_opencc)
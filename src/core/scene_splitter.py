@@ -1,8 +1,9 @@
 import os
 import json
+import asyncio
+from src import http_client
 from src.logger import log
 from tqdm import tqdm
-import math
 
 from src.providers.llm import LlmManager
 from src.core.task_manager import TaskManager
@@ -40,7 +41,7 @@ class SceneSplitter:
         self.chunk_size = splitter_config.get('chunk_size', 50)
         self.overlap = splitter_config.get('overlap', 10)
 
-    def _get_split_points_from_chunk(self, chunk_segments: list) -> list[int]:
+    async def _get_split_points_from_chunk(self, chunk_segments: list) -> list[int]:
         """
         Sends a text chunk to the LLM and identifies scene change points.
         Now uses the 'generate' endpoint for efficiency and semantic correctness.
@@ -49,7 +50,7 @@ class SceneSplitter:
         prompt = self.prompt_template.format(numbered_text=numbered_text)
         try:
             # Use generate_with_failover instead of chat_with_failover
-            content = self.llm_manager.generate_with_failover(
+            content = await self.llm_manager.agenerate_with_failover(
                 prompt=prompt,
                 temperature=0.0
             )
@@ -85,45 +86,63 @@ class SceneSplitter:
             
         return scenes_for_cache
 
+    async def _split_chunk(self, chunk: list, chunk_start: int) -> list[int]:
+        """
+        返回单个块内的分割点（相对行号）。优先读取该块的缓存文件，没有缓存时请求 LLM 并写入缓存。
+        """
+        chunk_end = chunk_start + self.chunk_size
+        cache_file = self.task_manager.get_file_path('scene_split_chunk', start=chunk_start, end=chunk_end-1)
+
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cached_scenes = json.load(f)
+                return [scene['end_line_in_chunk'] for scene in cached_scenes]
+            except (json.JSONDecodeError, KeyError) as e:
+                log.warning(f"Cache file '{os.path.basename(cache_file)}' is corrupt: {e}. Regenerating.", exc_info=True)
+                os.remove(cache_file)
+
+        relative_split_points = await self._get_split_points_from_chunk(chunk)
+        chunk_scenes_for_cache = self._construct_scenes_for_chunk(chunk, relative_split_points)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(chunk_scenes_for_cache, f, ensure_ascii=False, indent=4)
+        return relative_split_points
+
+    async def _split_chunks(self, segments: list, chunk_starts: list) -> list[list[int]]:
+        """
+        并发处理所有块，返回与 chunk_starts 一一对应的块内分割点。
+        同时在途的 LLM 请求数由提供者的 max_concurrency 限制。
+        """
+        with tqdm(total=len(chunk_starts), desc="Semantic Scene Splitting (LLM)", unit="chunk") as pbar:
+            async def process(chunk_start: int) -> list[int]:
+                points = await self._split_chunk(segments[chunk_start:chunk_start + self.chunk_size], chunk_start)
+                pbar.update(1)
+                return points
+
+            try:
+                return await asyncio.gather(*(process(chunk_start) for chunk_start in chunk_starts))
+            finally:
+                await http_client.aclose_clients()  # 本次事件循环创建的连接随循环一起释放
+
     def split(self, segments: list) -> list:
         if not segments:
             return []
 
-        all_split_indices = set()
         step = self.chunk_size - self.overlap
         if step <= 0:
             log.error("chunk_size must be greater than overlap. Using default step.")
             step = self.chunk_size // 2 if self.chunk_size > 1 else 1
 
-        num_chunks = math.ceil(len(segments) / step)
-        pbar = tqdm(range(0, len(segments), step), total=num_chunks, desc="Semantic Scene Splitting (LLM)", unit="chunk")
-
-        for i in pbar:
-            chunk_start = i
-            chunk_end = i + self.chunk_size
-            chunk = segments[chunk_start:chunk_end]
-            if not chunk: continue
-
-            cache_file = self.task_manager.get_file_path('scene_split_chunk', start=chunk_start, end=chunk_end-1)
-            relative_split_points = []
-
-            if os.path.exists(cache_file):
-                try:
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        cached_scenes = json.load(f)
-                    relative_split_points = [scene['end_line_in_chunk'] for scene in cached_scenes]
-                except (json.JSONDecodeError, KeyError) as e:
-                    log.warning(f"Cache file '{os.path.basename(cache_file)}' is corrupt: {e}. Regenerating.", exc_info=True)
-                    os.remove(cache_file)
-            
-            if not relative_split_points and not os.path.exists(cache_file):
-                relative_split_points = self._get_split_points_from_chunk(chunk)
-                chunk_scenes_for_cache = self._construct_scenes_for_chunk(chunk, relative_split_points)
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(chunk_scenes_for_cache, f, ensure_ascii=False, indent=4)
+        # 各块之间除了最终的分割点并集外互不依赖，并发请求；
+        # gather 按 chunk_starts 的顺序返回结果，合并结果与完成顺序无关
+        chunk_starts = list(range(0, len(segments), step))
+        chunk_points = asyncio.run(self._split_chunks(segments, chunk_starts))
 
+        all_split_indices = set()
+        for chunk_start, relative_split_points in zip(chunk_starts, chunk_points):
+            chunk_length = len(segments[chunk_start:chunk_start + self.chunk_size])
             for point in relative_split_points:
-                if 0 <= point < len(chunk):
+                if 0 <= point < chunk_length:
                     all_split_indices.add(chunk_start + point)
 
         all_split_indices.add(len(segments) - 1)
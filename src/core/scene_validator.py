@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 from collections import deque
 from src.core.task_manager import TaskManager
 from src.keyword_generator import KeywordGenerator
@@ -11,14 +12,16 @@ class SceneValidator:
     通过迭代验证和修复，确保数据结构的健壮性。
     """
 
-    def __init__(self, task_id: str):
+    def __init__(self, task_id: str, style: Optional[str] = None):
         """
         初始化验证器。
 
         Args:
             task_id (str): 当前任务的 ID。
+            style (Optional[str]): 关键词提示词风格，与生成关键词时一致才能复用按场景缓存的结果。
         """
         self.task_id = task_id
+        self.style = style
         self.task_manager = TaskManager(task_id)
         self.min_duration = config.get('composition_settings.min_duration', 5)
         self.max_scene_fix_retries = config.get('validation_settings.max_scene_fix_retries', 10) 
@@ -113,8 +116,11 @@ class SceneValidator:
                     log.warning(f"Main scene {i + 1} structure is invalid. Triggering regeneration of its sub-scenes.")
                     scene_was_fixed_in_pass = True
                     if keyword_gen is None:
-                        keyword_gen = KeywordGenerator(config)
-                    self._regenerate_scene(current_main_scene, keyword_gen)
+                        keyword_gen = KeywordGenerator(config, style=self.style, task_id=self.task_id)
+                    # 无效的子镜头若正是缓存中的生成结果（包括上一轮重新生成的结果），需绕过缓存；
+                    # 否则（如合并后的场景此前已生成过）可以直接使用缓存
+                    refresh = current_scene_fix_retry > 1 or keyword_gen.is_cached_result(current_main_scene)
+                    self._regenerate_scene(current_main_scene, keyword_gen, refresh=refresh)
                     continue 
                 
                 if self._fix_durations(current_main_scene, self.min_duration):
@@ -294,12 +300,12 @@ class SceneValidator:
             if sub_scenes and abs(rounding_error) > 0.001:
                 sub_scenes[-1]['time'] = round(sub_scenes[-1].get('time', 0) + rounding_error, 2)
 
-    def _regenerate_scene(self, scene: dict, keyword_gen: KeywordGenerator):
-        """使用KeywordGenerator重新生成单个场景的子场景（就地修改）。"""
+    def _regenerate_scene(self, scene: dict, keyword_gen: KeywordGenerator, refresh: bool = False):
+        """使用KeywordGenerator重新生成单个场景的子场景（就地修改）。refresh 为 True 时不使用缓存的结果。"""
         scene_text = scene.get('text', '') 
         log.info(f"Regenerating sub-scenes for text: \"{scene_text[:50]}...\" (Parent duration: {scene.get('duration', 0):.2f}s)")
         try:
-            keyword_gen.generate_for_scenes([scene])
+            keyword_gen.generate_for_scenes([scene], refresh=refresh)
 
             if scene.get('scenes'):
                 log.success("Successfully regenerated scene.")
@@ -107,7 +107,7 @@ class SceneProcess:
 
         # 保存后统一验证和修复场景文件
         log.info("Running scene validation and fixing after saving final scenes...")
-        validator = SceneValidator(self.task_manager.task_id)
+        validator = SceneValidator(self.task_manager.task_id, style=self.style)
         if not validator.validate_and_fix():
             log.error("Scene validation and fixing failed. Final scenes might be incomplete or incorrect.")
         else:
@@ -123,20 +123,21 @@ class SceneProcess:
 
     def _generate_keywords_for_scenes(self, scenes: list) -> list:
         log.info("--- Step 3: Generating keywords for each scene ---")
-        keyword_gen = KeywordGenerator(config, style=self.style)
+        # 按场景缓存生成结果，中断后重跑只需生成尚未完成的场景
+        keyword_gen = KeywordGenerator(config, style=self.style, task_id=self.task_manager.task_id)
         
         # 第一次关键词生成
         log.info("Starting initial keyword generation pass...")
-        scenes_iterable = tqdm(scenes, desc="Generating Keywords", unit="scene")
-        keyword_gen.generate_for_scenes(scenes_iterable)
+        with tqdm(total=len(scenes), desc="Generating Keywords", unit="scene") as progress:
+            keyword_gen.generate_for_scenes(scenes, progress=progress)
         
         # 对失败场景进行重试处理（未生成 scenes 字段的情况）
         scenes_to_retry = [s for s in scenes if not s.get('scenes')]
         
         if scenes_to_retry:
             log.warning(f"Found {len(scenes_to_retry)} scenes that failed keyword generation. Starting retry pass...")
-            retry_iterable = tqdm(scenes_to_retry, desc="Retrying Keywords", unit="scene")
-            keyword_gen.generate_for_scenes(retry_iterable)
+            with tqdm(total=len(scenes_to_retry), desc="Retrying Keywords", unit="scene") as progress:
+                keyword_gen.generate_for_scenes(scenes_to_retry, progress=progress)
             
             # 最终失败检查
             still_failed_scenes = [s for s in scenes_to_retry if not s.get('scenes')]
@@ -1,31 +1,87 @@
 # -*- coding: utf-8 -*-                        # 指定源码文件编码为 UTF-8，支持中文字符
 import logging                                 # 导入日志记录模块
+import numpy as np                             # 导入 NumPy，用于批量嵌入与向量化相似度计算
+from collections import OrderedDict            # 有序字典，用于实现 LRU 缓存
 from tqdm import tqdm                          # 导入进度条库，用于显示处理进度
 from thefuzz import fuzz                       # 导入字符串模糊匹配工具（Levenshtein 距离）
-from sentence_transformers import util         # 导入语义相似度计算工具
 from .model_loader import ModelLoader          # 导入自定义模型加载器
 from .text import TextProcessor                # 导入文本处理模块
+from .aligner import BandedAligner             # 导入动态规划对齐器
+from .text_buffer import NormalizedTextBuffer  # 导入预规范化文本缓冲区
+from .semantic_index import SemanticIndex                  # 导入向量化语义检索索引
 
 class Searcher:
     """
     搜索器类：负责将文本与音频转录内容进行对齐，并执行语义搜索。
     """
+    BUFFER_CACHE_SIZE = 4                                        # 文本缓冲区/语义索引缓存的最大条目数
     def __init__(self, model_loader: ModelLoader, text_processor: TextProcessor):
-        self.sentence_model = model_loader.get_sentence_model()  # 加载语义嵌入模型
+        self.model_loader = model_loader                         # 语义嵌入模型在编码时通过 lease 借用，空闲时可被卸载
         self.text_processor = text_processor                     # 初始化文本处理器
+        self._buffer_cache = OrderedDict()                       # 按列表对象缓存已构建的文本缓冲区（LRU）
+        self._index_cache = OrderedDict()                        # 按列表对象缓存已构建的语义索引（LRU）
+
+    def get_buffer(self, items, key='word'):
+        """
+        返回 items（Whisper 词或已对齐段落列表）的预规范化文本缓冲区，同一列表只构建一次。
+        对齐器和语义搜索共用这一缓存。list 不支持弱引用，缓存项持有列表本身（保证 id 不被复用），
+        因此只保留最近使用的 BUFFER_CACHE_SIZE 个。
+        """
+        cache_key = (id(items), len(items), key)
+        cached = self._buffer_cache.get(cache_key)
+        if cached is not None and cached[0] is items:
+            self._buffer_cache.move_to_end(cache_key)
+            return cached[1]
+        buffer = NormalizedTextBuffer((item[key] for item in items), self.text_processor)
+        self._buffer_cache[cache_key] = (items, buffer)
+        while len(self._buffer_cache) > self.BUFFER_CACHE_SIZE:
+            self._buffer_cache.popitem(last=False)
+        return buffer
+
+    def get_index(self, aligned_data, embeddings=None) -> SemanticIndex:
+        """
+        返回已对齐段落列表的语义检索索引，同一列表只构建一次（缓存方式与 get_buffer 相同）。
+        embeddings 为对齐缓存旁的嵌入矩阵，未提供时使用每项自带的 'embedding' 字段。
+        """
+        cache_key = (id(aligned_data), len(aligned_data))
+        cached = self._index_cache.get(cache_key)
+        if cached is not None and cached[0] is aligned_data:
+            self._index_cache.move_to_end(cache_key)
+            return cached[1]
+        index = SemanticIndex.from_aligned(aligned_data, embeddings)
+        self._index_cache[cache_key] = (aligned_data, index)
+        while len(self._index_cache) > self.BUFFER_CACHE_SIZE:
+            self._index_cache.popitem(last=False)
+        return index
 
     def _encode_text(self, text: str):
         """将输入文本编码为语义嵌入向量。"""
-        if not self.sentence_model:                              # 模型未加载时输出错误日志
-            logging.error("SentenceTransformer model not loaded. Cannot encode text.")
-            return None
-        return self.sentence_model.encode(text, show_progress_bar=False)  # 调用模型进行编码
+        with self.model_loader.lease("sentence_transformer") as sentence_model:
+            if not sentence_model:                               # 模型未加载时输出错误日志
+                logging.error("SentenceTransformer model not loaded. Cannot encode text.")
+                return None
+            return sentence_model.encode(text, show_progress_bar=False)  # 调用模型进行编码
+
+    def encode_batch(self, texts, batch_size=64):
+        """
+        将多条文本一次性批量编码，返回 float16 的嵌入矩阵 (len(texts), dim)。
+        对齐完成后统一调用，避免每行一次模型调用的开销。
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float16)
+        with self.model_loader.lease("sentence_transformer") as sentence_model:
+            if not sentence_model:
+                logging.error("SentenceTransformer model not loaded. Cannot encode text.")
+                return None
+            embeddings = sentence_model.encode(list(texts), batch_size=batch_size, show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32).astype(np.float16)
 
     def linear_align(self, target_lines, whisper_words, debug=False):
         """将目标文本与 Whisper 模型转录的单词进行线性窗口对齐。"""
         aligned_results = []             # 保存最终对齐结果
         used_word_indices = set()        # 保存已使用的音频词索引，避免重复匹配
         whisper_idx = 0                  # 当前搜索的起始索引（滑动窗口）
+        word_buffer = self.get_buffer(whisper_words)  # 每个词只规范化一次，窗口文本直接切片获得
 
         for line in tqdm(target_lines, desc="Linearly Aligning Text"):  # 为每一行文本做对齐
             normalized_line = self.text_processor.normalize(line)       # 对文本进行标准化处理
@@ -50,8 +106,7 @@ class Searcher:
                     sub_sequence = whisper_words[i:j+1]   # 获取当前位置的词组子序列
                     if not sub_sequence: continue
 
-                    sub_sequence_text = "".join([w['word'] for w in sub_sequence])  # 拼接子序列文本
-                    normalized_sub_sequence = self.text_processor.normalize(sub_sequence_text)  # 对音频文本进行标准化
+                    normalized_sub_sequence = word_buffer.window_text(i, j + 1)  # 从缓冲区切片得到规范化文本
 
                     current_score = fuzz.token_set_ratio(normalized_line, normalized_sub_sequence)  # 计算模糊匹配得分
 
@@ -71,7 +126,6 @@ class Searcher:
                     "text": line,                                           # 原始文本
                     "start": best_match_info['words'][0]['start'],         # 匹配段起始时间
                     "end": best_match_info['words'][-1]['end'],            # 匹配段结束时间
-                    "embedding": self._encode_text(line),                  # 文本语义嵌入
                     "source": "text_file"                                  # 来源标记
                 })
                 whisper_idx = best_match_info['end_idx']                   # 更新搜索起点
@@ -83,30 +137,51 @@ class Searcher:
 
         return aligned_results, used_word_indices  # 返回对齐结果与已使用音频索引
 
-    def search(self, query_text, aligned_data):
-        """在已对齐的数据中进行语义查询匹配。"""
+    def dp_align(self, target_lines, whisper_words, band_width=300, match_threshold=75):
+        """
+        使用带状动态规划全局对齐文本与 Whisper 单词，返回值与 linear_align 完全一致。
+        每个文本行和单词只规范化一次，复杂度与转录长度成线性关系。
+        """
+        aligner = BandedAligner(self.text_processor, band_width=band_width, match_threshold=match_threshold)
+        matches = aligner.align(target_lines, whisper_words, self.get_buffer(whisper_words))  # 计算每一行对应的单词区间
+
+        aligned_results = []             # 保存最终对齐结果
+        used_word_indices = set()        # 保存已使用的音频词索引
+        for match in matches:
+            line = target_lines[match['line_index']]
+            words = whisper_words[match['start_word']:match['end_word']]
+            aligned_results.append({
+                "text": line,                                           # 原始文本
+                "start": words[0]['start'],                            # 匹配段起始时间
+                "end": words[-1]['end'],                               # 匹配段结束时间
+                "source": "text_file"                                  # 来源标记
+            })
+            used_word_indices.update(range(match['start_word'], match['end_word']))
+
+        return aligned_results, used_word_indices  # 返回对齐结果与已使用音频索引
+
+    def search(self, query_text, aligned_data, embeddings=None):
+        """
+        在已对齐的数据中进行语义查询匹配，返回最相近的一个段落。
+        索引按 aligned_data 缓存，对同一份对齐结果多次查询不会重复构建。
+        """
+        index = self.get_index(aligned_data, embeddings)
+
+        # 规范化后与某个段落完全相同时，该段落必然是语义最相近的结果，无需编码
+        text_buffer = self.get_buffer(index.items, key='text')
+        normalized_query = self.text_processor.normalize(query_text)
+        exact_idx = text_buffer.find_item(normalized_query) if normalized_query else -1
+        if exact_idx >= 0:
+            item = index.items[exact_idx]
+            return {"text": item.get('text'), "start": item.get('start'), "end": item.get('end'), "similarity": 1.0}
+
+        if len(index) == 0:
+            return None
         query_embedding = self._encode_text(query_text)     # 编码查询文本为嵌入向量
         if query_embedding is None:                         # 编码失败则记录错误并返回空
             logging.error("Could not encode query text.")
             return None
 
-        best_match = None                                   # 保存最佳匹配结果
-        max_similarity = -1.0                               # 初始化最大相似度值
-
-        for item in aligned_data:                           # 遍历所有已对齐段落
-            segment_embedding = item.get('embedding')       # 获取段落的嵌入向量
-            if segment_embedding is None:
-                continue
-
-            similarity = util.cos_sim(query_embedding, segment_embedding).item()  # 计算余弦相似度
-
-            if similarity > max_similarity:                 # 更新最大相似度并保存最佳匹配信息
-                max_similarity = similarity
-                best_match = {
-                    "text": item.get('text'),              # 匹配文本内容
-                    "start": item.get('start'),            # 起始时间
-                    "end": item.get('end'),                # 结束时间
-                    "similarity": similarity               # 相似度值
-                }
-
+        best_match = index.query(query_embedding, top_k=1)[0][0]
+        best_match.pop('index', None)
         return best_match                                   # 返回最佳匹配结果（语义最相近的片段）
@@ -0,0 +1,124 @@
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from src.logger import log
+
+
+class SearchResultCache:
+    """
+    视频提供者搜索结果的持久化缓存。
+    键由 提供者 + 规范化后的查询词 + 数量 + 过滤条件 组成，支持 TTL 过期和 LRU 淘汰，
+    并以 JSON 文件的形式保存在磁盘上，供重试、素材替换和任务重跑复用。
+    """
+
+    # 每写入这么多条结果才落盘一次，避免每次搜索都重写整个缓存文件；剩余的修改由 flush() 写入
+    SAVE_INTERVAL = 20
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._load()
+
+    @staticmethod
+    def make_key(provider: str, keywords: List[str], count: int, min_duration: float,
+                 filters: Optional[Dict[str, Any]] = None) -> str:
+        """生成缓存键：查询词统一小写并压缩空白，过滤条件按键名排序。"""
+        query = " ".join(" ".join(keywords).lower().split())
+        return json.dumps(
+            [provider, query, int(count), round(float(min_duration or 0), 2), sorted((filters or {}).items())],
+            ensure_ascii=False,
+        )
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """命中时返回结果的深拷贝（调用方会在结果上写入 local_path 等字段）；未命中或已过期返回 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created_at'] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry['results'])
+
+    def put(self, key: str, results: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[key] = {'created_at': time.time(), 'results': copy.deepcopy(results)}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty += 1
+            if self._dirty >= self.SAVE_INTERVAL:
+                self._save()
+
+    def flush(self):
+        """将尚未落盘的修改写入缓存文件。素材查找结束和进程退出时调用。"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"搜索结果缓存文件 {self.path} 读取失败，将重新建立缓存: {e}")
+            return
+
+        now = time.time()
+        # 文件中的条目按 LRU 顺序保存（最久未使用的在前）
+        for key, entry in data:
+            if now - entry.get('created_at', 0) <= self.ttl_seconds:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        log.info(f"已加载 {len(self._entries)} 条搜索结果缓存: {self.path}")
+
+    def _save(self):
+        """先写临时文件再原子替换，避免进程中断时留下损坏的缓存文件。调用方需持有 _lock。"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self._entries.items()), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+        except OSError as e:
+            log.warning(f"写入搜索结果缓存失败: {e}")
+
+
+_caches: Dict[str, SearchResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(config: dict) -> Optional[SearchResultCache]:
+    """
+    按缓存文件路径返回进程内共享的缓存实例；配置中禁用时返回 None。
+    """
+    cache_config = config.get('asset_search', {}).get('search_cache', {}) or {}
+    if not cache_config.get('enabled', True):
+        return None
+
+    path = cache_config.get('path', 'storage/cache/search_results.json')
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SearchResultCache(
+                path,
+                ttl_seconds=float(cache_config.get('ttl_hours', 72)) * 3600,
+                max_entries=int(cache_config.get('max_entries', 2000)),
+            )
+            atexit.register(_caches[path].flush)
+        return _caches[path]
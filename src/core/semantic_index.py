@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from .task_manager import TaskManager
+
+
+class SemanticIndex:
+    """
+    已对齐段落的语义检索索引。
+    持有按行归一化的嵌入矩阵，一次矩阵乘法 + argpartition 即可回答一批查询的 top-k。
+    """
+
+    def __init__(self, items, embeddings):
+        if len(items) != len(embeddings):
+            raise ValueError(f"Index items ({len(items)}) and embeddings ({len(embeddings)}) must have the same length.")
+        self.items = items
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def from_aligned(cls, aligned_data, embeddings=None) -> "SemanticIndex":
+        """
+        由对齐结果构建索引。embeddings 为对齐缓存旁的 .npy 矩阵；
+        未提供时退回到旧缓存中每项自带的 'embedding' 字段（没有嵌入的项不参与检索）。
+        """
+        if embeddings is not None:
+            return cls(aligned_data, embeddings)
+        items = [item for item in aligned_data if item.get('embedding') is not None]
+        if not items:
+            return cls([], np.zeros((0, 1), dtype=np.float32))
+        return cls(items, np.stack([np.asarray(item['embedding']).reshape(-1) for item in items]))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def query(self, query_embeddings, top_k: int = 1):
+        """
+        批量查询。
+
+        Args:
+            query_embeddings: 形状为 (q, dim) 的查询嵌入矩阵（单条查询可传一维向量）。
+            top_k: 每条查询返回的结果数量。
+
+        Returns:
+            list[list[dict]]: 每条查询一个按相似度降序排列的结果列表，
+                              每项包含 text、start、end、similarity、index。
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if len(self.items) == 0:
+            return [[] for _ in range(len(queries))]
+
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        similarities = queries @ self.matrix.T                       # (q, n)
+
+        k = min(top_k, len(self.items))
+        if k < len(self.items):
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(len(self.items)), (len(queries), 1))
+        rows = np.arange(len(queries))[:, None]
+        order = np.argsort(-similarities[rows, candidates], axis=1)
+        top = candidates[rows, order]
+
+        results = []
+        for q, indices in enumerate(top):
+            matches = []
+            for idx in indices:
+                item = self.items[idx]
+                matches.append({
+                    "text": item.get('text'),
+                    "start": item.get('start'),
+                    "end": item.get('end'),
+                    "similarity": float(similarities[q, idx]),
+                    "index": int(idx),
+                })
+            results.append(matches)
+        return results
+
+
+def texts_fingerprint(aligned_data) -> str:
+    """对齐结果中全部文本的哈希，用于校验嵌入矩阵是否由同一份对齐结果生成。"""
+    digest = hashlib.sha256()
+    for item in aligned_data:
+        digest.update((item.get('text') or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _fingerprint_path(embeddings_path: str) -> str:
+    return os.path.splitext(embeddings_path)[0] + '.sha256'
+
+
+def save_embeddings(embeddings_path: str, embeddings, aligned_data):
+    """保存嵌入矩阵，并在旁边记录对应对齐文本的哈希。"""
+    np.save(embeddings_path, embeddings)
+    with open(_fingerprint_path(embeddings_path), 'w', encoding='utf-8') as f:
+        f.write(texts_fingerprint(aligned_data))
+
+
+def load_embeddings(embeddings_path: str, aligned_data):
+    """
+    读取与 aligned_data 对应的嵌入矩阵。文件不存在、缺少哈希记录或哈希不一致
+    （对齐结果已重新生成，即使条数相同）时返回 None。
+    """
+    fingerprint_path = _fingerprint_path(embeddings_path)
+    if not os.path.exists(embeddings_path) or not os.path.exists(fingerprint_path):
+        return None
+    with open(fingerprint_path, 'r', encoding='utf-8') as f:
+        if f.read().strip() != texts_fingerprint(aligned_data):
+            return None
+    embeddings = np.load(embeddings_path)
+    return embeddings if len(embeddings) == len(aligned_data) else None
+
+
+# 最多缓存这么多个任务的索引，超出时淘汰最久未使用的
+MAX_TASK_INDEXES = 8
+
+_task_indexes: "OrderedDict[str, tuple]" = OrderedDict()
+_task_indexes_lock = threading.Lock()
+
+
+def get_task_index(task_id: str) -> SemanticIndex | None:
+    """
+    返回任务的语义检索索引（由 .whisper 下的对齐缓存和嵌入矩阵构建）。
+    结果按任务缓存（最多 MAX_TASK_INDEXES 个任务，按最近使用淘汰），对齐文件更新后自动重建；
+    任务不存在或尚未完成对齐时返回 None。
+    """
+    if not TaskManager.exists(task_id):
+        return None
+    task_manager = TaskManager(task_id)
+    aligned_path = task_manager.get_file_path('alignment_cache')
+    embeddings_path = task_manager.get_file_path('alignment_embeddings')
+    if not os.path.exists(aligned_path):
+        return None
+
+    mtimes = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (aligned_path, embeddings_path))
+    with _task_indexes_lock:
+        cached = _task_indexes.get(task_id)
+        if cached and cached[0] == mtimes:
+            _task_indexes.move_to_end(task_id)
+            return cached[1]
+
+        with open(aligned_path, 'rb') as f:
+            aligned_data = pickle.load(f)
+        embeddings = load_embeddings(embeddings_path, aligned_data)
+        if embeddings is None and os.path.exists(embeddings_path):
+            logging.warning(f"Embeddings in {embeddings_path} do not match alignment cache, ignoring them.")
+
+        index = SemanticIndex.from_aligned(aligned_data, embeddings)
+        _task_indexes[task_id] = (mtimes, index)
+        _task_indexes.move_to_end(task_id)
+        while len(_task_indexes) > MAX_TASK_INDEXES:
+            _task_indexes.popitem(last=False)
+        return index
@@ -5,8 +5,8 @@ from pathlib import Path
 from typing import Optional
 from tqdm import tqdm
 import re
-import torch
-from faster_whisper import WhisperModel
+from src.config_loader import config
+from src.core.whisper_factory import get_whisper_model
 import yt_dlp
 import fnmatch
 import json
@@ -196,116 +196,6 @@ class SubtitlesProcessor:
             print(f"❌ 发生未知错误：{e}")
             self.audio_path = None
 
-    def Otranscribe_with_whisper(self, model_dir: str):
-        if not self.audio_path or not Path(self.audio_path).exists():
-            print("❌ Audio file not found for transcription.")
-            return []
-
-        print(f"🎙️ Transcribing audio with Faster Whisper model: {model_dir}...")
-        try:
-            # 确保 torch 已导入且可用，如果可用则使用 cuda
-            model = WhisperModel(model_dir, device="cuda" if torch.cuda.is_available() else "cpu", compute_type="float16")
-            segments, info = model.transcribe(self.audio_path, beam_size=5)
-            print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
-            
-            segments_list = list(segments) # 转换为列表以便多次访问
-            # print(f"DEBUG: Transcribed segments count: {len(segments_list)}") # 调试打印已移除
-            
-            return segments_list
-        except ImportError:
-            print("❌ PyTorch not found. Please install PyTorch for GPU support or ensure it's in your environment.")
-            print("Falling back to CPU if possible, or try installing torch: pip install torch torchvision torchaudio --index-url https://download.pytorch.org/whl/cu118 (for CUDA 11.8)")
-            try:
-                model = WhisperModel(model_dir, device="cpu", compute_type="int8") # CPU 模式可以使用 int8 优化
-                segments, info = model.transcribe(self.audio_path, beam_size=5)
-                print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
-                
-                segments_list = list(segments)
-                # print(f"DEBUG: Transcribed segments count (CPU fallback): {len(segments_list)}") # 调试打印已移除
-                
-                return segments_list
-            except Exception as e:
-                print(f"❌ Error during CPU transcription fallback: {e}")
-                return []
-        except Exception as e:
-            print(f"❌ Error during transcription: {e}")
-            return []
-
-
-    def OOtranscribe_with_whisper(self, model_dir: str):
-        if not self.audio_path or not Path(self.audio_path).exists():
-            print("❌ Audio file not found for transcription.")
-            return []
-
-        print(f"🎙️ Transcribing audio with Faster Whisper model: {model_dir}...")
-        try:
-            model = WhisperModel(model_dir, device="cuda" if torch.cuda.is_available() else "cpu", compute_type="float16")
-            
-            # 使用 tqdm 来显示进度条
-            # Faster Whisper 的 transcribe 方法返回一个迭代器
-            # info 对象包含 duration_ms，可以用来估算总进度
-            # 也可以直接迭代 segments，tqdm 会自动计算迭代次数
-            
-            # 第一次调用 transcribe 时获取 segments 和 info
-            segments_generator, info = model.transcribe(self.audio_path, beam_size=5)
-            print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
-            
-            segments_list = []
-            # 获取音频总时长（毫秒），用于进度条
-            total_audio_duration_ms = info.duration * 1000 
-            
-            # 使用 tqdm 包装 segments 迭代器，并根据音频时长显示进度
-            # desc: 进度条描述
-            # total: 迭代的总量，这里用音频总时长
-            # unit: 单位
-            # unit_scale: 单位的缩放比例 (ms -> s)
-            # bar_format: 自定义进度条格式，显示已转录时长
-            
-            # 记录起始时间，用于计算已转录时长
-            start_time_segment = 0.0
-
-            # 收集 segments 并在 tqdm 中显示进度
-            for segment in tqdm(segments_generator, 
-                                desc="🔊 Transcribing Audio", 
-                                unit="s", unit_scale=True,
-                                total=total_audio_duration_ms / 1000, # total in seconds
-                                bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]"):
-                
-                segments_list.append(segment)
-                # 更新进度条的当前值，使用当前 segment 的结束时间
-                tqdm.write_text(tqdm._instances[0], f"Processed: {self._format_timestamp(segment.end)}", end='\r') # 显示当前转录到哪个时间点
-                
-            return segments_list
-            
-        except ImportError:
-            print("❌ PyTorch not found. Please install PyTorch for GPU support or ensure it's in your environment.")
-            print("Falling back to CPU if possible, or try installing torch: pip install torch torchvision torchaudio --index-url https://download.pytorch.org/whl/cu118 (for CUDA 11.8)")
-            try:
-                model = WhisperModel(model_dir, device="cpu", compute_type="int8")
-                
-                segments_generator, info = model.transcribe(self.audio_path, beam_size=5)
-                print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
-                
-                segments_list = []
-                total_audio_duration_ms = info.duration * 1000
-                
-                for segment in tqdm(segments_generator, 
-                                    desc="🔊 Transcribing Audio (CPU)", 
-                                    unit="s", unit_scale=True,
-                                    total=total_audio_duration_ms / 1000,
-                                    bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]"):
-                    segments_list.append(segment)
-                    tqdm.write_text(tqdm._instances[0], f"Processed: {self._format_timestamp(segment.end)}", end='\r')
-                    
-                return segments_list
-            except Exception as e:
-                print(f"❌ Error during CPU transcription fallback: {e}")
-                return []
-        except Exception as e:
-            print(f"❌ Error during transcription: {e}")
-            return []
-
-
     def transcribe_with_whisper(self, model_dir: str):
         if not self.audio_path or not Path(self.audio_path).exists():
             print("❌ Audio file not found for transcription.")
@@ -313,7 +203,8 @@ class SubtitlesProcessor:
 
         print(f"🎙️ Transcribing audio with Faster Whisper model: {model_dir}...")
         try:
-            model = WhisperModel(model_dir, device="cuda" if torch.cuda.is_available() else "cpu", compute_type="float16")
+            # 使用进程内共享的模型，设备和计算精度由 whisper 配置和硬件探测决定（无 GPU 时为 CPU int8）
+            model = get_whisper_model(model_dir, config)
             
             segments_generator, info = model.transcribe(self.audio_path, beam_size=5)
             print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
@@ -342,31 +233,6 @@ class SubtitlesProcessor:
             
             return segments_list
             
-        except ImportError:
-            print("❌ PyTorch not found. Please install PyTorch for GPU support or ensure it's in your environment.")
-            print("Falling back to CPU if possible, or try installing torch: pip install torch torchvision torchaudio --index-url https://download.pytorch.org/whl/cu118 (for CUDA 11.8)")
-            try:
-                model = WhisperModel(model_dir, device="cpu", compute_type="int8")
-                
-                segments_generator, info = model.transcribe(self.audio_path, beam_size=5)
-                print(f"✅ Detected language: {info.language} with probability {info.language_probability:.4f}")
-                
-                segments_list = []
-                total_duration_seconds = info.duration
-
-                print("🔊 Transcription Progress (CPU Fallback):")
-                for i, segment in enumerate(segments_generator):
-                    segments_list.append(segment)
-                    
-                    progress_percentage = (segment.end / total_duration_seconds) * 100 if total_duration_seconds > 0 else 0
-                    print(f"  Processed: {self._format_timestamp(segment.end)} / {self._format_timestamp(total_duration_seconds)} ({progress_percentage:.1f}%)", end='\r', flush=True)
-                
-                print("\n✅ Transcription Complete (CPU Fallback)!")
-                
-                return segments_list
-            except Exception as e:
-                print(f"❌ Error during CPU transcription fallback: {e}")
-                return []
         except Exception as e:
             print(f"❌ Error during transcription: {e}")
             return []
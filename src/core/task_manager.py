@@ -19,16 +19,19 @@ class TaskManager:
         "audio_segment": ".audios/segments/{index}.wav",
         "tts_audio": ".audios/tts_cache/{name}.wav",
         "doc_segment": ".documents/segments/{index}.txt",
+        "timing_manifest": ".audios/timing_manifest.json",
         # Subtitles
         "final_srt": "final.srt",
         "sentences": ".documents/sentences.txt",
         "whisper_cache": ".whisper/transcription.json",
         "alignment_cache": ".whisper/aligned.pkl",
+        "alignment_embeddings": ".whisper/aligned_embeddings.npy",
         # Scene Generator
         "final_scenes": "final_scenes.json",
         "final_scenes_with_assets": "final_scenes_assets.json", # 新增：用于存储带有素材路径的场景数据
         "segments_cache": ".scenes/segments.json",
         "scenes_raw_cache": ".scenes/scenes_raw.json",
+        "scene_keywords": ".scenes/keywords/{name}.json",
         # Scene Splitter
         "scene_split_chunk": ".scenes/scenes_split/chunk_{start}_{end}.json",
         # Video Composer
@@ -48,8 +51,7 @@ class TaskManager:
     STATUS_FAILED = "FAILED"
 
     def __init__(self, task_id: Optional[str] = None):
-        paths_config = config.get('paths', {})
-        self._base_path = Path(paths_config.get('task_folder', 'storage/tasks'))
+        self._base_path = self._get_base_path()
         
         if task_id:
             self.task_id = task_id
@@ -62,6 +64,16 @@ class TaskManager:
         self._setup_cache_dirs()
         self._status_file_path = self.task_path / "status.json" # Define status file path
 
+    @staticmethod
+    def _get_base_path() -> Path:
+        paths_config = config.get('paths', {})
+        return Path(paths_config.get('task_folder', 'storage/tasks'))
+
+    @classmethod
+    def exists(cls, task_id: str) -> bool:
+        """Checks whether a task folder exists, without creating it."""
+        return bool(task_id) and (cls._get_base_path() / task_id).is_dir()
+
     @staticmethod
     def _generate_task_id() -> str:
         return str(uuid.uuid4())
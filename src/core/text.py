@@ -3,19 +3,85 @@ import logging                         # 引入日志模块，用于记录错误
 import warnings                        # 引入警告模块，用于忽略特定警告
 import re                              # 引入正则表达式模块，用于文本清洗与分割
 import cn2an                           # 中文数字与阿拉伯数字互转的库
+import threading                       # 引入线程锁，保护共享的规范化缓存
+from collections import OrderedDict    # 有序字典，用于实现 LRU 缓存
+from src import metrics                # 引入指标注册表，用于上报缓存命中率
 from .model_loader import ModelLoader # 从当前模块引入模型加载器
 
+_NON_WORD_RE = re.compile(r'[^\w]')   # 预编译：匹配所有非字母数字字符
+
+
+class _NormalizeCache:
+    """
+    规范化结果的有界 LRU 缓存（进程内共享，线程安全），并统计命中率。
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str):
+        with self._lock:
+            value = self._data.get(text)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(text)
+            self.hits += 1
+            return value
+
+    def put(self, text: str, value: str):
+        with self._lock:
+            self._data[text] = value
+            self._data.move_to_end(text)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_normalize_cache = None
+_normalize_cache_lock = threading.Lock()
+
+
+def _get_normalize_cache(max_size: int) -> _NormalizeCache:
+    """返回进程内共享的规范化缓存，首次调用时创建并注册到指标中。"""
+    global _normalize_cache
+    with _normalize_cache_lock:
+        if _normalize_cache is None:
+            _normalize_cache = _NormalizeCache(max_size)
+            metrics.register_source("text_normalize_cache", _normalize_cache.stats)
+        return _normalize_cache
+
+
 class TextProcessor:
     """
     文本处理类：包括规范化、时间格式化、句子分割等功能。
     """
+    # 批量规范化时用于拼接文本的分隔符（OpenCC 会原样保留换行）
+    _BATCH_SEPARATOR = "\n"
+
     def __init__(self, model_loader: ModelLoader):
         # 初始化时从 ModelLoader 获取 OpenCC 实例（用于繁简转换）
         self.cc = model_loader.get_opencc()
+        # 规范化结果缓存，容量可通过 text_processing.normalize_cache_size 配置
+        cache_size = model_loader.config.get('text_processing.normalize_cache_size', 65536)
+        self.cache = _get_normalize_cache(cache_size)
 
     def normalize(self, text: str) -> str:
         """
-        对文本进行深度规范化：
+        对文本进行深度规范化（结果带 LRU 缓存）：
         - 繁体转简体
         - 中文数字转阿拉伯数字
         - 移除标点，转为小写
@@ -25,20 +91,66 @@ class TextProcessor:
             logging.error("OpenCC model not loaded. Cannot normalize text.")
             return text
 
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+
         # Step 1: 繁体转简体
         simplified_text = self.cc.convert(text)
 
-        # Step 2: 中文数字转阿拉伯数字（使用 cn2an）
+        # Step 2 + 3: 中文数字转阿拉伯数字，移除标点并转小写
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", UserWarning)  # 忽略 UserWarning
-            try:
-                normalized_text = cn2an.transform(simplified_text, "cn2an")
-            except (ValueError, KeyError):
-                # 转换失败时回退为简体文本（不改变数字）
-                normalized_text = simplified_text
-        
-        # Step 3: 移除非字母数字字符（保留汉字和英文）并转小写
-        return re.sub(r'[^\w]', '', normalized_text).lower()
+            result = self._finish_normalize(simplified_text)
+
+        self.cache.put(text, result)
+        return result
+
+    def normalize_batch(self, texts: list[str]) -> list[str]:
+        """
+        批量规范化：未命中缓存的文本合并为一次 OpenCC 调用，warnings 上下文也只进入一次。
+        返回结果与 [normalize(t) for t in texts] 完全一致。
+        """
+        if not self.cc:
+            logging.error("OpenCC model not loaded. Cannot normalize text.")
+            return list(texts)
+
+        results = [self.cache.get(text) for text in texts]
+        # 同一批次中重复的文本只转换一次
+        pending = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if not pending:
+            return results
+
+        simplified = self._convert_batch(pending)
+        converted = {}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # 忽略 UserWarning
+            for text, simplified_text in zip(pending, simplified):
+                converted[text] = self._finish_normalize(simplified_text)
+                self.cache.put(text, converted[text])
+
+        return [r if r is not None else converted[t] for t, r in zip(texts, results)]
+
+    def _convert_batch(self, texts: list[str]) -> list[str]:
+        """一次 OpenCC 调用完成整批繁简转换；文本自身含分隔符时退回逐条转换。"""
+        if any(self._BATCH_SEPARATOR in t for t in texts):
+            return [self.cc.convert(t) for t in texts]
+        converted = self.cc.convert(self._BATCH_SEPARATOR.join(texts)).split(self._BATCH_SEPARATOR)
+        if len(converted) != len(texts):
+            return [self.cc.convert(t) for t in texts]
+        return converted
+
+    @staticmethod
+    def _finish_normalize(simplified_text: str) -> str:
+        """对已繁转简的文本做数字转换和字符清洗。调用方负责屏蔽 cn2an 的 UserWarning。"""
+        try:
+            normalized_text = cn2an.transform(simplified_text, "cn2an")
+        except (ValueError, KeyError):
+            # 转换失败时回退为简体文本（不改变数字）
+            normalized_text = simplified_text
+
+        # 移除非字母数字字符（保留汉字和英文）并转小写
+        return _NON_WORD_RE.sub('', normalized_text).lower()
 
     @staticmethod
     def format_time(seconds: float) -> str:
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from .text import TextProcessor
+
+# 中文数字字符（含大写和繁体）；只由这些字符组成的相邻项需要合并后再规范化
+_CN_NUMERAL_CHARS = frozenset("零〇一二三四五六七八九十百千万亿两壹贰叁肆伍陆柒捌玖拾佰仟萬億兩")
+
+
+class NormalizedTextBuffer:
+    """
+    预规范化文本缓冲区：对一组文本（Whisper 词、文稿句子等）只做一次规范化，
+    拼接为一段连续的字符序列，并记录每一项在其中的偏移量和字符到项的反向映射。
+    任意连续项的规范化文本都可以直接切片得到，无需再 join + normalize。
+
+    - text:          拼接后的规范化文本
+    - chars:         text 的 Unicode 码点数组 (uint32)，供向量化比较
+    - offsets:       长度为 len + 1 的偏移数组，第 i 项占据 text[offsets[i]:offsets[i + 1]]
+    - char_to_item:  每个字符所属的项下标
+
+    逐项规范化与整段规范化只在中文数字上有差别：Whisper 可能把“二十三”切成“二”“十”“三”三个词，
+    逐词转换得到 "2103"，整段转换得到 "23"。因此连续的纯中文数字项会去掉词间空格、合并后一起规范化，
+    结果整体记在第一项上（其余项为空），其字符按位置分摊到各项，保证区间首尾字符仍对应首尾两项。
+    """
+
+    def __init__(self, texts, text_processor: TextProcessor):
+        texts = list(texts)
+        runs = self._numeral_runs(texts)
+        normalized = text_processor.normalize_batch(texts + ["".join(t.strip() for t in texts[a:b]) for a, b in runs])
+        merged = normalized[len(texts):]
+        normalized = normalized[:len(texts)]
+        for (a, b), text in zip(runs, merged):
+            normalized[a:b] = [text] + [""] * (b - a - 1)
+        lengths = np.fromiter((len(t) for t in normalized), dtype=np.int64, count=len(normalized))
+
+        self.text = "".join(normalized)
+        self.chars = np.frombuffer(self.text.encode('utf-32-le'), dtype=np.uint32)
+        self.offsets = np.zeros(len(normalized) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.char_to_item = np.repeat(np.arange(len(normalized), dtype=np.int64), lengths)
+        for (a, b), text in zip(runs, merged):
+            start = self.offsets[a]
+            self.char_to_item[start:start + len(text)] = np.rint(np.linspace(a, b - 1, len(text))).astype(np.int64)
+        self._item_index = None
+
+    @staticmethod
+    def _numeral_runs(texts) -> list:
+        """找出连续两项及以上、每项都只由中文数字组成的区间 [(start, end), ...]。"""
+        runs, start = [], None
+        for index, text in enumerate(texts + [""]):
+            stripped = text.strip()
+            if stripped and all(ch in _CN_NUMERAL_CHARS for ch in stripped):
+                if start is None:
+                    start = index
+                continue
+            if start is not None and index - start > 1:
+                runs.append((start, index))
+            start = None
+        return runs
+
+    @classmethod
+    def from_words(cls, whisper_words, text_processor: TextProcessor) -> "NormalizedTextBuffer":
+        """由 Whisper 词列表构建缓冲区。"""
+        return cls((w['word'] for w in whisper_words), text_processor)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def item_text(self, index: int) -> str:
+        """第 index 项的规范化文本。"""
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def window_text(self, start: int, end: int) -> str:
+        """第 [start, end) 项拼接后的规范化文本。"""
+        return self.text[self.offsets[start]:self.offsets[end]]
+
+    def item_at(self, char_index: int) -> int:
+        """字符下标所属的项下标。"""
+        return int(self.char_to_item[char_index])
+
+    def find_item(self, normalized_text: str) -> int:
+        """返回规范化文本与之完全相同的第一项下标，不存在时返回 -1。"""
+        if self._item_index is None:
+            self._item_index = {}
+            for index in range(len(self)):
+                self._item_index.setdefault(self.item_text(index), index)
+        return self._item_index.get(normalized_text, -1)
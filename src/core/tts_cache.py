@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from src import metrics
+from src.logger import log
+
+
+class TtsAudioCache:
+    """
+    跨任务共享的 TTS 音频缓存（内容寻址）。
+    键由 提供者 + 合成参数（说话人、语速、音量、模型等）+ 规范化后的文本 计算哈希得到，
+    音频按键名保存在缓存目录中；总大小超过上限时按最近使用时间（文件 mtime）淘汰最久未用的文件。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self._files():
+            self._total_bytes += path.stat().st_size
+
+    @staticmethod
+    def make_key(provider: str, params: Dict[str, Any], text: str) -> str:
+        """生成缓存键：文本去除首尾空白并压缩连续空白，参数按键名排序，None 值不参与。"""
+        normalized_text = " ".join(text.split())
+        payload = json.dumps(
+            [provider, sorted((k, v) for k, v in params.items() if v is not None), normalized_text],
+            ensure_ascii=False, default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.wav"
+
+    def _files(self):
+        return (p for p in self.directory.glob('*/*.wav') if p.is_file())
+
+    def get(self, key: str, destination: str) -> bool:
+        """命中时把缓存音频复制到 destination 并返回 True；文件不存在或复制失败（例如恰好被淘汰）时返回 False。"""
+        path = self._path(key)
+        temp_destination = destination + ".part"
+        try:
+            with self._lock:
+                if not path.exists():
+                    self.misses += 1
+                    return False
+                os.utime(path)  # 刷新最近使用时间
+            shutil.copyfile(path, temp_destination)
+            os.replace(temp_destination, destination)
+        except OSError as e:
+            log.warning(f"读取 TTS 缓存失败，将重新合成: {e}")
+            with self._lock:
+                self.misses += 1
+            if os.path.exists(temp_destination):
+                os.remove(temp_destination)
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key: str, source: str):
+        """把合成好的音频存入缓存，必要时淘汰最久未用的文件。"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix('.tmp')
+            shutil.copyfile(source, temp_path)
+            with self._lock:
+                previous = path.stat().st_size if path.exists() else 0
+                os.replace(temp_path, path)
+                self._total_bytes += path.stat().st_size - previous
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+        except OSError as e:
+            log.warning(f"写入 TTS 缓存失败: {e}")
+
+    def _evict(self):
+        """按 mtime 从旧到新删除文件，直到总大小回到上限的 90% 以下。"""
+        target = self.max_bytes * 0.9
+        entries = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in self._files()), key=lambda e: e[0])
+        self._total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self._total_bytes -= size
+            removed += 1
+        log.info(f"TTS 缓存超过上限，已淘汰 {removed} 个文件，当前大小 {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_caches: Dict[str, TtsAudioCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_cache(config: dict) -> Optional[TtsAudioCache]:
+    """
+    按缓存目录返回进程内共享的缓存实例；配置中禁用时返回 None。
+    """
+    cache_config = config.get('tts_providers', {}).get('cache', {}) or {}
+    if not cache_config.get('enabled', True):
+        return None
+
+    directory = cache_config.get('dir', 'storage/cache/tts')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = TtsAudioCache(
+                directory,
+                max_bytes=int(float(cache_config.get('max_size_mb', 2048)) * 1024 * 1024),
+            )
+            metrics.register_source("tts_cache", _caches[directory].stats)
+        return _caches[directory]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+WAV 拼接工具。
+
+所有输入的格式（声道数、采样宽度、采样率）一致时，用 wave 模块逐块复制 PCM 帧到输出文件，
+内存占用与音频总长度无关；格式不一致（需要重采样）或输入不是 wave 可读的 PCM 文件时，
+才退回到 ffmpeg 的 concat 滤镜。
+
+流式返回的 WAV 在写出文件头时还不知道音频长度，RIFF/data 长度字段通常是 0 或 0xFFFFFFFF，
+repair_wav_header 按实际文件大小回填这两个字段。
+"""
+import os
+import wave
+import struct
+import subprocess
+from collections import Counter
+from typing import List, Tuple
+
+from src.logger import log
+
+# 每次复制的帧数
+_COPY_FRAMES = 1 << 16
+
+
+def _read_format(path: str) -> Tuple[int, int, int] | None:
+    """返回 (声道数, 采样宽度, 采样率)，wave 无法读取时返回 None。"""
+    try:
+        with wave.open(path, 'rb') as wav:
+            return wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+    except (wave.Error, EOFError) as e:
+        log.debug(f"'{path}' is not a plain PCM WAV file: {e}")
+        return None
+
+
+def concat_wav_files(input_paths: List[str], output_path: str, progress=None):
+    """
+    按顺序拼接 WAV 文件。
+
+    Args:
+        input_paths: 待拼接的文件列表。
+        output_path: 输出文件路径。
+        progress: 可选的 tqdm 进度条，每处理完一个文件更新一次。
+    """
+    formats = [_read_format(path) for path in input_paths]
+    if None not in formats and len(set(formats)) == 1:
+        _stream_concat(input_paths, output_path, progress)
+        return
+
+    # 以出现最多的格式为目标格式，其余文件交由 ffmpeg 重采样
+    known = [f for f in formats if f is not None]
+    channels, sample_width, rate = Counter(known).most_common(1)[0][0] if known else (1, 2, 24000)
+    log.warning(f"Audio segments have mixed formats {sorted(set(known))}, "
+                f"resampling to {rate} Hz / {channels} ch with ffmpeg.")
+    _ffmpeg_concat(input_paths, output_path, channels, sample_width, rate)
+    if progress is not None:
+        progress.update(len(input_paths))
+
+
+def _stream_concat(input_paths: List[str], output_path: str, progress=None):
+    """格式一致时逐块复制 PCM 帧。"""
+    with wave.open(input_paths[0], 'rb') as first:
+        params = first.getparams()
+
+    with wave.open(output_path, 'wb') as out:
+        out.setnchannels(params.nchannels)
+        out.setsampwidth(params.sampwidth)
+        out.setframerate(params.framerate)
+        for path in input_paths:
+            with wave.open(path, 'rb') as wav:
+                while True:
+                    frames = wav.readframes(_COPY_FRAMES)
+                    if not frames:
+                        break
+                    out.writeframesraw(frames)
+            if progress is not None:
+                progress.update(1)
+    # wave 在关闭时按实际写入的帧数回填文件头
+
+
+def _ffmpeg_concat(input_paths: List[str], output_path: str, channels: int, sample_width: int, rate: int):
+    """用 ffmpeg concat 滤镜拼接，并统一重采样到目标格式。"""
+    layout = 'mono' if channels == 1 else 'stereo'
+    sample_fmt = {1: 'u8', 2: 's16', 4: 's32'}.get(sample_width, 's16')
+    command = ['ffmpeg', '-y', '-v', 'error']
+    for path in input_paths:
+        command += ['-i', path]
+    filters = [
+        f"[{i}:a]aresample={rate},aformat=sample_fmts={sample_fmt}:channel_layouts={layout}[a{i}]"
+        for i in range(len(input_paths))
+    ]
+    inputs = "".join(f"[a{i}]" for i in range(len(input_paths)))
+    filters.append(f"{inputs}concat=n={len(input_paths)}:v=0:a=1[out]")
+    codec = 'pcm_u8' if sample_fmt == 'u8' else f"pcm_{sample_fmt}le"
+    command += ['-filter_complex', ";".join(filters), '-map', '[out]', '-c:a', codec, '-f', 'wav', output_path]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg audio concatenation failed: {result.stderr.strip()}")
+
+
+def repair_wav_header(path: str):
+    """
+    按文件实际大小回填 RIFF 和 data 块的长度字段（原地修改）。
+
+    Raises:
+        ValueError: 文件不是 RIFF/WAVE 格式或找不到 data 块。
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError(f"'{path}' is not a RIFF/WAVE file")
+        # 依次跳过 data 之前的各个块（fmt、LIST 等）
+        offset = 12
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+            if chunk_id == b'data':
+                data_size = file_size - offset - 8
+                if chunk_size != data_size:
+                    f.seek(offset + 4)
+                    f.write(struct.pack('<I', data_size))
+                    f.seek(4)
+                    f.write(struct.pack('<I', file_size - 8))
+                return
+            offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError(f"No data chunk found in '{path}'")
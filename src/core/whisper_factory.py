@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Whisper 模型工厂。
+
+根据配置和硬件探测决定 device / compute_type / cpu_threads / num_workers，
+并在进程内按 (模型路径, 运行参数) 缓存模型实例，所有 Whisper 使用方共享同一个模型。
+"""
+import os
+import logging
+from threading import Lock
+from faster_whisper import WhisperModel
+
+_models = {}
+_models_lock = Lock()
+
+
+def _cuda_available() -> bool:
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except Exception:
+        return False
+
+
+def resolve_whisper_options(config) -> dict:
+    """
+    解析 Whisper 运行参数。配置项 whisper.device / compute_type / cpu_threads / num_workers
+    为 "auto" 或 0 时按硬件自动选择：有 CUDA 用 cuda + int8_float16（显存约为 float16 的一半，
+    速度相近），否则用 cpu + int8，需要 float16 时在配置中显式指定；
+    num_workers 默认与分块转录的并行数一致，cpu_threads 默认平分 CPU 核心。
+    """
+    whisper_config = config.get('whisper', {}) or {}
+
+    device = whisper_config.get('device', 'auto')
+    if device == 'auto':
+        device = 'cuda' if _cuda_available() else 'cpu'
+
+    compute_type = whisper_config.get('compute_type', 'auto')
+    if compute_type == 'auto':
+        compute_type = 'int8_float16' if device == 'cuda' else 'int8'
+
+    num_workers = int(whisper_config.get('num_workers', 0) or 0)
+    if num_workers <= 0:
+        num_workers = max(1, int((whisper_config.get('transcription', {}) or {}).get('workers', 1)))
+
+    cpu_threads = int(whisper_config.get('cpu_threads', 0) or 0)
+    if cpu_threads <= 0 and device == 'cpu':
+        cpu_threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    return {
+        'device': device,
+        'compute_type': compute_type,
+        'cpu_threads': cpu_threads,
+        'num_workers': num_workers,
+    }
+
+
+def get_whisper_model(model_path: str, config) -> WhisperModel:
+    """
+    返回进程内共享的 Whisper 模型，首次调用时加载。
+    GPU 加载失败时自动退回到 CPU int8。
+    """
+    options = resolve_whisper_options(config)
+    key = (os.path.abspath(model_path), tuple(sorted(options.items())))
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        logging.info(f"Loading Whisper model from '{model_path}' with {options}...")
+        try:
+            model = WhisperModel(model_path, **options)
+        except Exception as e:
+            if options['device'] == 'cpu':
+                raise
+            logging.warning(f"Failed to load Whisper model on {options['device']} ({e}), falling back to CPU int8.")
+            cpu_options = dict(options, device='cpu', compute_type='int8',
+                               cpu_threads=max(1, (os.cpu_count() or 1) // options['num_workers']))
+            model = WhisperModel(model_path, **cpu_options)
+        logging.info("Whisper model loaded.")
+        _models[key] = model
+        return model
+
+
+def release_whisper_model(model_path: str, config):
+    """从缓存中移除模型，使其在没有其他引用后被回收（用于空闲卸载）。"""
+    options = resolve_whisper_options(config)
+    key = (os.path.abspath(model_path), tuple(sorted(options.items())))
+    with _models_lock:
+        _models.pop(key, None)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+共享的 HTTP 客户端层。
+
+- 每个服务端点（scheme://host:port）共用一个带连接池的 HTTPAdapter，保持长连接，
+  逐块合成、下载等高频请求不必每次重新建立 TCP/TLS 连接；
+- 每个线程持有自己的 Session（挂载同一个共享 Adapter），避免 Session 跨线程共享的问题；
+- 访问本地或局域网服务时以 trust_env=False 关闭环境变量中的代理，取代每次调用时构造的 proxies 字典；
+- 未显式传入 timeout 时使用 http_client 配置中的默认连接/读取超时；
+- 重试使用带随机抖动的指数退避（backoff_delay），避免多个并发请求在同一时刻重试；
+- 各端点的请求数、失败数、重试数和已建立的连接数通过 metrics 的 "http_pools" 暴露；
+- 异步版本（arequest / aget / apost / adownload / astream）基于 httpx.AsyncClient，按事件循环和端点复用客户端。
+"""
+import asyncio
+import contextlib
+import random
+import threading
+import time
+import weakref
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import metrics
+from src.config_loader import config
+from src.logger import log
+
+_adapters: Dict[str, HTTPAdapter] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+_local = threading.local()
+# 事件循环 -> {(端点, trust_env): AsyncClient}；AsyncClient 绑定创建它的事件循环，循环结束后随之释放
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = weakref.WeakKeyDictionary()
+
+# 这些状态码视为服务端暂时不可用，值得重试
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _client_config() -> dict:
+    return config.get('http_client', {}) or {}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _get_adapter(origin: str) -> HTTPAdapter:
+    with _lock:
+        adapter = _adapters.get(origin)
+        if adapter is None:
+            pool_size = int(_client_config().get('pool_maxsize', 16))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            _adapters[origin] = adapter
+            _stats.setdefault(origin, {'requests': 0, 'errors': 0, 'retries': 0})
+        return adapter
+
+
+def get_session(url: str, trust_env: bool = True) -> requests.Session:
+    """
+    返回当前线程访问 url 所在端点的 Session。
+
+    :param trust_env: False 时忽略环境变量中的代理设置（用于本地或局域网服务）。
+    """
+    origin = _origin(url)
+    sessions = getattr(_local, 'sessions', None)
+    if sessions is None:
+        sessions = _local.sessions = {}
+    session = sessions.get((origin, trust_env))
+    if session is None:
+        session = requests.Session()
+        session.trust_env = trust_env
+        session.mount(origin + '/', _get_adapter(origin))
+        sessions[(origin, trust_env)] = session
+    return session
+
+
+def get_async_client(url: str, trust_env: bool = True) -> httpx.AsyncClient:
+    """返回当前事件循环中访问 url 所在端点的 AsyncClient（保持长连接）。"""
+    origin = _origin(url)
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get((origin, trust_env))
+    if client is None:
+        pool_size = int(_client_config().get('pool_maxsize', 16))
+        client = httpx.AsyncClient(
+            trust_env=trust_env,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        clients[(origin, trust_env)] = client
+        with _lock:
+            _stats.setdefault(origin, {'requests': 0, 'errors': 0, 'retries': 0})
+    return client
+
+
+async def aclose_clients():
+    """关闭当前事件循环中创建的所有 AsyncClient；在 asyncio.run 的临时事件循环结束前调用。"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def default_timeout() -> Tuple[float, float]:
+    """默认的 (连接超时, 读取超时)，单位秒。"""
+    client_config = _client_config()
+    return float(client_config.get('connect_timeout', 10)), float(client_config.get('read_timeout', 120))
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """
+    第 attempt 次（从 0 开始）重试前的等待时间：在 [0, min(cap, base * 2^attempt)] 内均匀取值（full jitter）。
+    """
+    client_config = _client_config()
+    base = float(client_config.get('backoff_base', 1.0)) if base is None else base
+    cap = float(client_config.get('backoff_max', 30.0)) if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _record(origin: str, key: str):
+    with _lock:
+        _stats[origin][key] += 1
+
+
+def request(method: str, url: str, *, trust_env: bool = True, retries: int = 0, **kwargs) -> requests.Response:
+    """
+    通过共享连接池发送请求。
+
+    :param retries: 连接失败、超时或服务端返回 429/5xx 时的重试次数（带抖动的指数退避）。
+    :param kwargs: 透传给 requests.Session.request，未指定 timeout 时使用默认超时。
+    :return: 响应对象；最后一次尝试得到的错误状态码由调用方自行 raise_for_status。
+    """
+    kwargs.setdefault('timeout', default_timeout())
+    session = get_session(url, trust_env=trust_env)
+    origin = _origin(url)
+
+    for attempt in range(retries + 1):
+        _record(origin, 'requests')
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _record(origin, 'errors')
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            log.warning(f"Request to {origin} failed ({e}), retrying in {delay:.1f}s...")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                if response.status_code >= 400:
+                    _record(origin, 'errors')
+                return response
+            _record(origin, 'errors')
+            response.close()
+            delay = backoff_delay(attempt)
+            log.warning(f"Request to {origin} returned {response.status_code}, retrying in {delay:.1f}s...")
+        _record(origin, 'retries')
+        time.sleep(delay)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def download(url: str, destination: str, *, chunk_size: int = 1 << 16, **kwargs):
+    """流式下载到 destination（经由连接池），HTTP 错误时抛出异常。"""
+    with get(url, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        with open(destination, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
+
+def _async_timeout(timeout) -> httpx.Timeout:
+    """把 requests 风格的 timeout（数值或 (连接, 读取) 元组）转换为 httpx.Timeout。"""
+    if timeout is None:
+        timeout = default_timeout()
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+async def arequest(method: str, url: str, *, trust_env: bool = True, retries: int = 0, **kwargs) -> httpx.Response:
+    """request 的异步版本，重试语义相同；kwargs 透传给 httpx.AsyncClient.request。"""
+    kwargs['timeout'] = _async_timeout(kwargs.get('timeout'))
+    client = get_async_client(url, trust_env=trust_env)
+    origin = _origin(url)
+
+    for attempt in range(retries + 1):
+        _record(origin, 'requests')
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            _record(origin, 'errors')
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            log.warning(f"Request to {origin} failed ({e}), retrying in {delay:.1f}s...")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                if response.status_code >= 400:
+                    _record(origin, 'errors')
+                return response
+            _record(origin, 'errors')
+            delay = backoff_delay(attempt)
+            log.warning(f"Request to {origin} returned {response.status_code}, retrying in {delay:.1f}s...")
+        _record(origin, 'retries')
+        await asyncio.sleep(delay)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest('GET', url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest('POST', url, **kwargs)
+
+
+@contextlib.asynccontextmanager
+async def astream(method: str, url: str, *, trust_env: bool = True, **kwargs):
+    """
+    以流式方式发送请求（不重试），在 async with 块内通过 response.aiter_bytes 读取响应体。
+    """
+    kwargs['timeout'] = _async_timeout(kwargs.get('timeout'))
+    client = get_async_client(url, trust_env=trust_env)
+    origin = _origin(url)
+    _record(origin, 'requests')
+    try:
+        async with client.stream(method, url, **kwargs) as response:
+            if response.status_code >= 400:
+                _record(origin, 'errors')
+            yield response
+    except httpx.TransportError:
+        _record(origin, 'errors')
+        raise
+
+
+async def adownload(url: str, destination: str, *, trust_env: bool = True, retries: int = 0, timeout=None,
+                    chunk_size: int = 1 << 16):
+    """download 的异步版本：流式写入 destination，连接失败或 429/5xx 时按退避重试。"""
+    client = get_async_client(url, trust_env=trust_env)
+    origin = _origin(url)
+    for attempt in range(retries + 1):
+        _record(origin, 'requests')
+        try:
+            async with client.stream('GET', url, timeout=_async_timeout(timeout)) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                    raise httpx.HTTPStatusError(f"status {response.status_code}", request=response.request, response=response)
+                response.raise_for_status()
+                with open(destination, 'wb') as f:
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        f.write(chunk)
+            return
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            _record(origin, 'errors')
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRY_STATUS_CODES
+            if attempt >= retries or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            log.warning(f"Download from {origin} failed ({e}), retrying in {delay:.1f}s...")
+        _record(origin, 'retries')
+        await asyncio.sleep(delay)
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """各端点的请求统计；connections 为连接池实际建立过的连接数，与 requests 对比即可看出复用率。"""
+    with _lock:
+        result = {origin: dict(counters) for origin, counters in _stats.items()}
+        adapters = dict(_adapters)
+    for origin, adapter in adapters.items():
+        pools = adapter.poolmanager.pools
+        result[origin]['connections'] = sum(getattr(pools[key], 'num_connections', 0) for key in list(pools.keys()))
+    return result
+
+
+metrics.register_source("http_pools", stats)
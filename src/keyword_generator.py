@@ -1,8 +1,12 @@
 import os
 import json
+import asyncio
+import hashlib
 from typing import Optional
+from src import http_client
 from src.logger import log
 from src.providers.llm import LlmManager
+from src.core.task_manager import TaskManager
 
 import re
 
@@ -68,8 +72,38 @@ def _parse_llm_json_response(raw_text: str, prompt: str = None) -> dict | None:
     log.warning("No valid JSON object found in LLM response. Response: %r", cleaned_text[:200] + "...")
     return None
 
+# 批量模式附加在单场景提示词之后的说明：逐个场景套用上面的规则，按 index 输出 JSON 数组
+_BATCH_INSTRUCTIONS = """
+📚 Batch Mode:
+The instructions above describe how to process ONE scene. Below are {count} independent scenes.
+Apply the instructions to each scene separately, using that scene's own `duration` as the total duration
+and its `text` as the Chinese narration. Never merge, reorder or skip scenes.
+
+🗂 Scenes (JSON):
+{scenes_json}
+
+📦 Output a single JSON array with exactly one element per input scene:
+```json
+[
+  {{"index": 0, "scenes": [ /* scene objects exactly as specified above */ ]}}
+]
+```
+Every `index` must be the `index` of an input scene.
+"""
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：非 ASCII 字符（中文等）约 1 token/字，ASCII 约 4 字符/token。"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
 class KeywordGenerator:
-    def __init__(self, config: dict, style: Optional[str] = None):
+    def __init__(self, config: dict, style: Optional[str] = None, task_id: Optional[str] = None):
+        """
+        Args:
+            task_id: 指定时按场景缓存生成结果（.scenes/keywords/），中断后重跑或验证器重新生成时直接复用。
+        """
         self.config = config
         self.llm_manager = LlmManager(config)
         if not self.llm_manager.get_provider():
@@ -78,6 +112,16 @@ class KeywordGenerator:
         log.info(f"KeywordGenerator initialized with style: '{style}'.")
         
         self.prompt_template = self._load_prompt_template(style)
+        self.min_duration = self.config.get("composition_settings.min_duration", 3)
+        # 提示词模板的指纹：修改提示词后旧的缓存结果自动失效
+        self.prompt_version = hashlib.sha256(self.prompt_template.encode('utf-8')).hexdigest()[:12]
+        self.task_manager = TaskManager(task_id) if task_id else None
+
+        # 批量模式：一次请求处理多个场景，提示词模板只发送一次
+        keyword_config = self.config.get('keyword_generation', {}) or {}
+        self.batch_enabled = keyword_config.get('batch_enabled', True)
+        self.batch_token_budget = int(keyword_config.get('batch_token_budget', 6000))
+        self.batch_max_scenes = max(1, int(keyword_config.get('batch_max_scenes', 8)))
 
     def _load_prompt_template(self, style: Optional[str]) -> str:
         """根据指定的风格加载提示词模板，可以是路径也可以是内容。"""
@@ -86,6 +130,7 @@ class KeywordGenerator:
             raise ValueError("Prompt config 'prompts.auto_corp.scene_keywords' not found in config.yaml")
 
         style_key = style if style and style in aoto_corp_prompt_config else 'default'
+        self.style_key = style_key
         
         prompt_path_or_content = aoto_corp_prompt_config.get(style_key)
         if not prompt_path_or_content:
@@ -108,51 +153,225 @@ class KeywordGenerator:
             return prompt_path_or_content
 
 
-    def generate_for_scenes(self, scenes: list) -> list:
-        min_duration = self.config.get("composition_settings.min_duration", 3)
+    def _generation_params(self, scene: dict) -> dict:
+        """构造用于格式化提示词的完整参数。"""
+        return {
+            "min_duration": self.min_duration,
+            "scene_text": scene["text"],
+            "duration": scene["duration"],
+            # 为模板中所有可能的占位符提供默认值，以防 KeyError
+            "emotion_tags": "N/A",
+            "camera_tags": "N/A",
+            "action_tags": "N/A",
+            "scene_tags": "N/A",
+            "health_tags": "N/A"
+        }
+
+    def generate_for_scenes(self, scenes: list, progress=None, refresh: bool = False) -> list:
+        """
+        为场景生成子镜头和关键词（就地写入 scene['scenes']，失败时为空列表）。
+        请求并发发送，同时在途的请求数由 LLM 提供者的 max_concurrency 限制；
+        每个场景成功后立即写入缓存，已缓存的场景不再请求。
+
+        Args:
+            scenes: 场景列表。
+            progress: 可选的 tqdm 进度条，每完成一个场景更新一次。
+            refresh: True 时忽略已有缓存重新生成（结果仍写入场景缓存），LLM 请求也绕过响应缓存。
+        """
+        scenes = list(scenes)
+        pending = []
         for scene in scenes:
-            try:
-                # 构造用于格式化提示词的完整参数
-                generation_params = {
-                    "min_duration": min_duration,
-                    "scene_text": scene["text"],
-                    "duration": scene["duration"],
-                    # 为模板中所有可能的占位符提供默认值，以防 KeyError
-                    "emotion_tags": "N/A",
-                    "camera_tags": "N/A",
-                    "action_tags": "N/A",
-                    "scene_tags": "N/A",
-                    "health_tags": "N/A"
-                }
-
-                # 在调用 LLM 之前，先将提示词模板完整格式化
-                final_prompt = self.prompt_template.format(**generation_params)
-
-                # 仅将最终的、已格式化的提示词传递给 LLM 管理器
-                # 这样既能确保提示词内容正确，又能避免将无效参数传递给底层 API
-                response_text = self.llm_manager.generate_with_failover(
-                    prompt=final_prompt
-                )
-
-                # 解析 LLM 输出的 JSON 文本，转为结构化格式
-                prompt_context_for_logging = f"Template: {self.prompt_template}, Params: {generation_params}"
-                parsed_data = _parse_llm_json_response(response_text, prompt=prompt_context_for_logging)
-
-                # 如果生成结果合法，并且包含 'scenes' 字段
-                if parsed_data and isinstance(parsed_data, dict) and 'scenes' in parsed_data:
-                    sub_scenes = parsed_data.get('scenes', [])
-                    scene['scenes'] = sub_scenes
-                else:
-                    # 如果解析失败，则设置为空列表
-                    scene['scenes'] = []
-            
-            except Exception as e:
-                # 捕获异常，打印错误日志（截取前30字符避免过长）
-                log.error(
-                    f"Failed to generate keywords for scene: \"{scene['text'][:30]}...\"。",
-                    exc_info=True
-                )
-                scene['scenes'] = []
+            cached = None if refresh else self._load_cached(scene)
+            if cached:
+                scene['scenes'] = cached
+                if progress is not None:
+                    progress.update(1)
+            else:
+                pending.append(scene)
+
+        if len(pending) < len(scenes):
+            log.info(f"Restored keywords for {len(scenes) - len(pending)}/{len(scenes)} scenes from cache.")
+        if pending:
+            asyncio.run(self._agenerate_for_scenes(pending, progress, refresh))
 
         # 返回处理后的完整场景列表
         return scenes
+
+    async def _agenerate_for_scenes(self, scenes: list, progress=None, refresh: bool = False):
+        try:
+            if self.batch_enabled and len(scenes) > 1:
+                await asyncio.gather(*(self._generate_batch(batch, progress, refresh) for batch in self._plan_batches(scenes)))
+            else:
+                await asyncio.gather(*(self._generate_one(scene, progress, refresh) for scene in scenes))
+        finally:
+            await http_client.aclose_clients()  # 本次事件循环创建的连接随循环一起释放
+
+    def _cache_path(self, scene: dict) -> Optional[str]:
+        """场景缓存文件路径；键由文本、时长、风格、最短时长和提示词指纹决定。未指定 task_id 时返回 None。"""
+        if self.task_manager is None:
+            return None
+        payload = json.dumps(
+            [scene["text"], scene["duration"], self.style_key, self.min_duration, self.prompt_version],
+            ensure_ascii=False,
+        )
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return self.task_manager.get_file_path('scene_keywords', name=key)
+
+    def _load_cached(self, scene: dict) -> Optional[list]:
+        cache_path = self._cache_path(scene)
+        if not cache_path or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('scenes') or None
+        except (OSError, json.JSONDecodeError, AttributeError) as e:
+            log.warning(f"Keyword cache file '{os.path.basename(cache_path)}' is corrupt: {e}. Regenerating.")
+            return None
+
+    def is_cached_result(self, scene: dict) -> bool:
+        """场景当前的子镜头是否就是缓存中的生成结果。是的话，重新生成时必须绕过缓存，否则只会得到同一结果。"""
+        return bool(scene.get('scenes')) and self._load_cached(scene) == scene['scenes']
+
+    def _store(self, scene: dict):
+        """把场景的生成结果写入缓存（先写临时文件再改名，中断时不会留下不完整的文件）。"""
+        cache_path = self._cache_path(scene)
+        if not cache_path or not scene.get('scenes'):
+            return
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"text": scene["text"], "duration": scene["duration"], "scenes": scene['scenes']},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, cache_path)
+
+    async def _generate_one(self, scene: dict, progress=None, refresh: bool = False):
+        await self._generate_single(scene, refresh)
+        self._store(scene)
+        if progress is not None:
+            progress.update(1)
+
+    async def _generate_single(self, scene: dict, refresh: bool = False):
+        """单场景模式：使用原始提示词模板为一个场景发送一次请求。"""
+        try:
+            generation_params = self._generation_params(scene)
+
+            # 在调用 LLM 之前，先将提示词模板完整格式化
+            final_prompt = self.prompt_template.format(**generation_params)
+
+            # 仅将最终的、已格式化的提示词传递给 LLM 管理器
+            # 这样既能确保提示词内容正确，又能避免将无效参数传递给底层 API
+            response_text = await self.llm_manager.agenerate_with_failover(
+                prompt=final_prompt, cache=False if refresh else None
+            )
+
+            # 解析 LLM 输出的 JSON 文本，转为结构化格式
+            prompt_context_for_logging = f"Template: {self.prompt_template}, Params: {generation_params}"
+            parsed_data = _parse_llm_json_response(response_text, prompt=prompt_context_for_logging)
+
+            # 如果生成结果合法，并且包含 'scenes' 字段
+            if parsed_data and isinstance(parsed_data, dict) and 'scenes' in parsed_data:
+                sub_scenes = parsed_data.get('scenes', [])
+                scene['scenes'] = sub_scenes
+            else:
+                # 如果解析失败，则设置为空列表，并删除这条无效响应的缓存
+                scene['scenes'] = []
+                await asyncio.to_thread(self.llm_manager.discard_cached, 'generate', final_prompt)
+
+        except Exception as e:
+            # 捕获异常，打印错误日志（截取前30字符避免过长）
+            log.error(
+                f"Failed to generate keywords for scene: \"{scene['text'][:30]}...\"。",
+                exc_info=True
+            )
+            scene['scenes'] = []
+
+    def _batch_prompt_prefix(self) -> str:
+        """批量请求共用的提示词：单场景模板中与具体场景相关的占位符改为指向下方场景列表。"""
+        params = self._generation_params({
+            "text": "(the `text` of each scene listed below)",
+            "duration": "(the `duration` of each scene)",
+        })
+        return self.prompt_template.format(**params)
+
+    def _scene_tokens(self, scene: dict) -> int:
+        """估算一个场景在批量请求中占用的 token：输入文本 + 输出中复述的原文 + 每个子镜头的关键词等字段。"""
+        text_tokens = _estimate_tokens(scene["text"])
+        sub_scene_count = max(1.0, float(scene.get("duration") or 0) / max(float(self.min_duration), 1.0))
+        return 2 * text_tokens + int(60 * sub_scene_count) + 20
+
+    def _plan_batches(self, scenes: list) -> list:
+        """按 token 预算和场景数上限贪心地把场景装入批次，保持原有顺序。"""
+        fixed_tokens = _estimate_tokens(self._batch_prompt_prefix()) + _estimate_tokens(_BATCH_INSTRUCTIONS)
+        batches, current, used = [], [], fixed_tokens
+        for scene in scenes:
+            cost = self._scene_tokens(scene)
+            if current and (used + cost > self.batch_token_budget or len(current) >= self.batch_max_scenes):
+                batches.append(current)
+                current, used = [], fixed_tokens
+            current.append(scene)
+            used += cost
+        if current:
+            batches.append(current)
+        log.info(f"Keyword generation: {len(scenes)} scenes packed into {len(batches)} batched requests.")
+        return batches
+
+    async def _generate_batch(self, batch: list, progress=None, refresh: bool = False):
+        """
+        为一批场景发送一次请求；响应中缺失或无效的场景对半拆分后并发重试，直到退回单场景模式。
+        """
+        if len(batch) == 1:
+            await self._generate_one(batch[0], progress, refresh)
+            return
+
+        results = await self._request_batch(batch, refresh)
+        failed = []
+        for index, scene in enumerate(batch):
+            sub_scenes = results.get(index)
+            if sub_scenes:
+                scene['scenes'] = sub_scenes
+                self._store(scene)
+                if progress is not None:
+                    progress.update(1)
+            else:
+                failed.append(scene)
+
+        if failed:
+            log.warning(f"{len(failed)}/{len(batch)} scenes missing from the batched keyword response, "
+                        f"retrying them in smaller batches.")
+            middle = (len(failed) + 1) // 2
+            await asyncio.gather(*(self._generate_batch(part, progress, refresh) for part in (failed[:middle], failed[middle:]) if part))
+
+    async def _request_batch(self, batch: list, refresh: bool = False) -> dict:
+        """
+        发送批量请求，返回 {批内序号: 子镜头列表}；请求或解析失败时返回空字典。
+        响应中有场景缺失或无效时删除该响应的缓存，否则重跑时拆分后的重试会一直命中同一条坏结果。
+        """
+        scenes_payload = [
+            {"index": index, "duration": scene["duration"], "text": scene["text"]}
+            for index, scene in enumerate(batch)
+        ]
+        instructions = _BATCH_INSTRUCTIONS.format(
+            count=len(batch), scenes_json=json.dumps(scenes_payload, ensure_ascii=False, indent=2)
+        )
+        prompt = self._batch_prompt_prefix() + "\n" + instructions
+
+        try:
+            response_text = await self.llm_manager.agenerate_with_failover(prompt=prompt, cache=False if refresh else None)
+        except Exception as e:
+            log.error(f"Batched keyword request for {len(batch)} scenes failed: {e}")
+            return {}
+
+        parsed_data = _parse_llm_json_response(response_text, prompt=prompt)
+        # 约定输出为数组；也接受 {"results": [...]} 形式的包装
+        if isinstance(parsed_data, dict):
+            parsed_data = parsed_data.get('results')
+
+        results = {}
+        for item in parsed_data if isinstance(parsed_data, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index, sub_scenes = item.get('index'), item.get('scenes')
+            if isinstance(index, int) and 0 <= index < len(batch) and isinstance(sub_scenes, list) and sub_scenes:
+                results[index] = sub_scenes
+        if len(results) < len(batch):
+            await asyncio.to_thread(self.llm_manager.discard_cached, 'generate', prompt)
+        return results
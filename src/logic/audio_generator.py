@@ -3,7 +3,7 @@ AudioGenerator 是一个用于从文本生成配音音频的自动化处理类
 
 核心功能：
 - 支持按段落智能分割文稿，并控制段落时长（scene_target_length）
-- 使用 TTS 模块将每段文字转为音频，支持 URL 下载或本地路径迁移
+- 使用 TTS 模块将每段文字转为音频，支持流式直接写入、URL 下载或本地路径迁移
 - 自动合成多个语音段，输出最终音频文件（WAV 格式）
 - 支持任务上下文管理与多阶段缓存，配合 TaskManager 提供路径管理
 - 提供错误日志记录与异常回溯机制，保障稳定性
@@ -15,21 +15,26 @@ AudioGenerator 是一个用于从文本生成配音音频的自动化处理类
 - config_loader：加载 TTS 参数与分段长度配置
 - tts：TTS 文本转语音服务（可插件化调用）
 - task_manager：管理任务路径和文件命名
-- AudioSegment（pydub）：处理音频合并与导出
+- wav_concat：流式拼接 WAV 音频段（格式不一致时由 ffmpeg 重采样）
 - tqdm：实时显示处理进度条
 """
 import os
+import json
+import wave
 import shutil
-import requests
+import httpx
+import asyncio
 from tqdm import tqdm
 from typing import List, Dict, Optional
-from pydub import AudioSegment
 
 from src.logger import log
 # ✅ 修改：导入 get_tts_instance 工厂函数，而不是全局实例
 from src.tts import get_tts_instance
 from src.config_loader import config
+from src import http_client
 from src.core.task_manager import TaskManager
+from src.core.wav_concat import concat_wav_files
+from src.core.tts_cache import TtsAudioCache, get_tts_cache
 
 class AudioGenerator:
     def __init__(self, task_id: str, doc_file: str, speaker: str):
@@ -52,6 +57,7 @@ class AudioGenerator:
         self.scene_target_length = text_processing_config.get('scene_target_length', 300)
         
         self.final_audio = self.task_manager.get_file_path('final_audio')
+        self.segment_keys: List[str] = []  # 每段的 TTS 缓存键，写入时间清单供下次运行判断哪些段需要重新合成
 
     def run(self):
         log.info(f"--- Starting Text-First Audio Preprocessing for Task ID: {self.task_manager.task_id} ---")
@@ -64,15 +70,21 @@ class AudioGenerator:
             # print(f"segment_text: \n{ segment_text}")
 
             # 分段合成音频
-            self._synthesize_audio_segments(segment_text)
+            segments_changed = self._synthesize_audio_segments(segment_text)
 
             final_audio_path = self.task_manager.get_file_path('final_audio')
+            if segments_changed and os.path.exists(final_audio_path):
+                log.info("Audio segments changed since the last run, recombining final audio.")
+                os.remove(final_audio_path)
             if os.path.exists(final_audio_path):
                 log.info(f"Final audio already exists, skipping combination: {final_audio_path}")
             else:
                 if not self._combine_audio_segments(len(segment_text), final_audio_path):
                     raise RuntimeError("Failed to combine audio segments.")
 
+            # 记录每段在最终音频中的位置，字幕阶段据此按段对齐
+            self._write_timing_manifest(segment_text, final_audio_path)
+
             log.success("Text-first audio preprocessing pipeline completed successfully.")
 
         except Exception as e:
@@ -109,7 +121,10 @@ class AudioGenerator:
 
         return scene_chunks
 
-    def _synthesize_audio_segments(self, segments: List[str]):
+    def _synthesize_audio_segments(self, segments: List[str]) -> bool:
+        """
+        合成所有缺失或已过期的段，返回是否有段被重新生成（需要重新拼接最终音频）。
+        """
         log.info("--- Step 2.2: Synthesizing audio for each segment ---")
         
         tts_instance = get_tts_instance()
@@ -135,33 +150,103 @@ class AudioGenerator:
             tts_kwargs['speaker'] = speaker_value
             log.info(f"Using {provider_name} speaker: {speaker_value}")
 
-        for i, segment_text in enumerate(tqdm(segments, desc="Synthesizing Audio")):
+        # 缓存键覆盖提供者、说话人、语速、音量、模型和文本；与上次时间清单记录的键不同的段说明文本或参数已改变
+        provider = tts_instance.manager.provider
+        cache_params = {attr: getattr(provider, attr, None) for attr in ('speed', 'volume', 'model', 'sample_rate')}
+        cache_params.update({k: v for k, v in tts_kwargs.items() if k != 'task_id'})
+        self.segment_keys = [TtsAudioCache.make_key(provider_name, cache_params, text) for text in segments]
+        previous_keys = self._load_previous_segment_keys()
+        tts_cache = get_tts_cache(config)
+
+        changed = bool(previous_keys) and len(previous_keys) != len(segments)
+        pending = []
+        for i, key in enumerate(self.segment_keys):
             audio_segment_path = self.task_manager.get_file_path('audio_segment', index=i)
             if os.path.exists(audio_segment_path):
+                if previous_keys.get(i, key) == key:
+                    continue
+                os.remove(audio_segment_path)  # 文本或合成参数已改变，旧音频作废
+            changed = True
+            if tts_cache and tts_cache.get(key, audio_segment_path):
+                log.info(f"Restored audio for segment {i} from TTS cache.")
                 continue
-            
-            try:
-                # Pass the combined kwargs to the synthesis function
-                response = tts_instance.synthesize(segment_text, **tts_kwargs)
-                
-                # 检查是返回了URL还是本地路径
-                if 'url' in response and response['url']:
-                    # 如果是URL，下载文件
-                    if not self._download_file(response['url'], audio_segment_path):
-                        log.error(f"Failed to download audio for segment {i} from URL: {response['url']}")
-                elif 'path' in response and response['path']:
-                    # 如果是本地路径，直接移动或复制文件
-                    shutil.move(response['path'], audio_segment_path)
-                    log.info(f"Moved synthesized audio for segment {i} to final location.")
-                else:
-                    log.error(f"TTS response for segment {i} is invalid: {response}")
+            pending.append(i)
 
-            except Exception as e:
-                log.error(f"An error occurred during synthesis for segment {i}: {e}", exc_info=True)
-                # Re-raise the exception to halt the process
-                raise
-        
+        if not pending:
+            log.info("All audio segments are up to date, skipping synthesis.")
+            return changed
+
+        asyncio.run(self._synthesize_pending(tts_instance, segments, pending, tts_kwargs, tts_cache))
         log.success("Finished synthesizing all segments.")
+        return True
+
+    async def _synthesize_pending(self, tts_instance, segments: List[str], pending: List[int], tts_kwargs: Dict, tts_cache):
+        """
+        在事件循环中并发合成 pending 中的段。
+        同时进行的合成请求数由提供者的 max_concurrency 限制；返回 URL 的段在合成名额之外下载，
+        下载与其余段的合成同时进行。支持流式返回的提供者直接把音频写入段文件旁的临时文件，不再需要下载。
+        每段的输出路径由序号决定，因此结果天然有序。
+        """
+        max_concurrency = tts_instance.manager.provider.max_concurrency
+        log.info(f"Synthesizing {len(pending)} segments with up to {max_concurrency} concurrent requests...")
+
+        synth_slots = asyncio.Semaphore(max_concurrency)
+        download_slots = asyncio.Semaphore(max_concurrency)
+        failures = {}
+
+        with tqdm(total=len(pending), desc="Synthesizing Audio") as progress:
+            async def produce(i: int):
+                audio_segment_path = self.task_manager.get_file_path('audio_segment', index=i)
+                stream_path = audio_segment_path + ".stream"
+                # 合成请求的重试由提供者的 _aexecute_with_retry 负责，下载由 adownload 自行重试，这里不再叠加重试
+                try:
+                    async with synth_slots:
+                        response = await tts_instance.asynthesize(
+                            segments[i], raise_errors=True, stream_to=stream_path, **tts_kwargs
+                        )
+
+                    # 检查是返回了URL还是本地路径
+                    if 'url' in response and response['url']:
+                        # 如果是URL，下载文件
+                        async with download_slots:
+                            if not await self._download_file(response['url'], audio_segment_path):
+                                raise RuntimeError(f"failed to download {response['url']}")
+                    elif 'path' in response and response['path']:
+                        # 如果是本地路径，直接移动或复制文件
+                        shutil.move(response['path'], audio_segment_path)
+                        log.info(f"Moved synthesized audio for segment {i} to final location.")
+                    else:
+                        raise RuntimeError(f"invalid TTS response: {response}")
+                except Exception as e:
+                    log.error(f"Segment {i} failed: {e}")
+                    failures[i] = e
+                    if os.path.exists(stream_path):
+                        os.remove(stream_path)
+                else:
+                    if tts_cache:
+                        tts_cache.put(self.segment_keys[i], audio_segment_path)
+                progress.update(1)
+
+            try:
+                await asyncio.gather(*(produce(i) for i in pending))
+            finally:
+                await http_client.aclose_clients()  # 本次事件循环创建的连接随循环一起释放
+
+        if failures:
+            raise RuntimeError(f"Failed to synthesize audio for segments {sorted(failures)}.")
+
+    def _load_previous_segment_keys(self) -> Dict[int, str]:
+        """读取上次运行时间清单中记录的各段缓存键。"""
+        manifest_path = self.task_manager.get_file_path('timing_manifest')
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"Failed to read timing manifest {manifest_path}: {e}")
+            return {}
+        return {chunk['index']: chunk['cache_key'] for chunk in manifest.get('chunks', []) if chunk.get('cache_key')}
 
     def _combine_audio_segments(self, num_segments: int, output_path: str) -> bool:
         log.info("\n--- Step 2.3: Combining all audio segments ---")
@@ -171,26 +256,62 @@ class AudioGenerator:
             return False
         if len(valid_audio_files) != num_segments:
             log.warning("Some audio segments failed to generate and will be skipped.")
+        # 先写入临时文件，拼接中断时不会留下不完整的最终音频
+        temp_output_path = output_path + ".part"
         try:
-            combined_audio = sum(AudioSegment.from_wav(f) for f in tqdm(valid_audio_files, desc="Combining Audio"))
-            combined_audio.export(output_path, format="wav")
+            with tqdm(total=len(valid_audio_files), desc="Combining Audio") as progress:
+                concat_wav_files(valid_audio_files, temp_output_path, progress=progress)
+            os.replace(temp_output_path, output_path)
             log.success(f"All audio segments combined successfully to: {output_path}")
             return True
         except Exception as e:
             log.error(f"Failed to combine audio files: {e}")
+            if os.path.exists(temp_output_path):
+                os.remove(temp_output_path)
             return False
         
-    def _download_file(self, url: str, destination: str) -> bool:
+    def _write_timing_manifest(self, segments: List[str], final_audio_path: str):
+        """
+        输出时间清单：每段的序号、原文以及在最终音频中的起止采样点。
+        偏移量按最终音频的采样率换算，未生成音频的段不占用时间。
+        """
+        manifest_path = self.task_manager.get_file_path('timing_manifest')
+        with wave.open(final_audio_path, 'rb') as wav:
+            sample_rate = wav.getframerate()
+            total_samples = wav.getnframes()
+
+        chunks = []
+        offset = 0
+        for i, text in enumerate(segments):
+            audio_segment_path = self.task_manager.get_file_path('audio_segment', index=i)
+            if not os.path.exists(audio_segment_path):
+                continue
+            with wave.open(audio_segment_path, 'rb') as wav:
+                samples = round(wav.getnframes() * sample_rate / wav.getframerate())
+            chunks.append({
+                "index": i,
+                "text": text,
+                "start_sample": offset,
+                "end_sample": offset + samples,
+                "cache_key": self.segment_keys[i] if i < len(self.segment_keys) else None,
+            })
+            offset += samples
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"sample_rate": sample_rate, "total_samples": total_samples, "chunks": chunks},
+                      f, ensure_ascii=False, indent=2)
+        log.info(f"Timing manifest with {len(chunks)} chunks saved to {manifest_path}")
+
+    async def _download_file(self, url: str, destination: str) -> bool:
         """
         Helper function to download a file from a URL.
         """
+        # 先写入临时文件再改名，避免中断的下载被当作已完成的段
+        temp_destination = destination + ".part"
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with open(destination, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            await http_client.adownload(url, temp_destination, trust_env=False, retries=2)
+            os.replace(temp_destination, destination)
             return True
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             log.error(f"Error downloading {url}: {e}")
             return False
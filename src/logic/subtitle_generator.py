@@ -2,6 +2,9 @@
 import os  # 文件和路径操作
 import json  # 处理JSON格式数据
 import pickle  # 对象序列化和反序列化
+import wave  # 读取分块音频失败时的异常类型
+import numpy as np  # 嵌入矩阵的存取
+from concurrent.futures import ThreadPoolExecutor  # 按 TTS 分块并行对齐
 from tqdm import tqdm  # 显示进度条
 from typing import List, Dict  # 类型注解
 
@@ -13,7 +16,9 @@ from src.core.task_manager import TaskManager  # 任务管理器
 from src.core.model_loader import ModelLoader  # 模型加载器
 from src.core.text import TextProcessor  # 文本处理器
 from src.core.search import Searcher  # 文本音频匹配模块
+from src.core.semantic_index import load_embeddings, save_embeddings  # 对齐嵌入矩阵的存取
 from src.core.audio_transcriber import AudioTranscriber  # 音频处理器
+from src.core.forced_aligner import ForcedAligner, wav_duration  # 基于 TTS 分块的强制对齐
 
 from src.utils import add_line_breaks_after_punctuation  # 文本断句工具
 
@@ -59,7 +64,6 @@ class SubtitleGenerator:
             log.info("\n--- Initializing models for subtitle generation ---")
 
             model_loader = ModelLoader(config)  # 初始化模型加载器
-            audio_transcriber = AudioTranscriber(model_loader)  # 初始化音频处理器
             text_processor = TextProcessor(model_loader)  # 初始化文本处理器
             searcher = Searcher(model_loader, text_processor)  # 初始化搜索匹配器
 
@@ -70,17 +74,34 @@ class SubtitleGenerator:
                 self.task_manager.get_file_path('original_doc'),
                 self.task_manager.get_file_path('sentences')
             )
-            whisper_segments = self._transcribe_audio(
-                audio_transcriber,
-                final_audio_path,
-                self.task_manager.get_file_path('whisper_cache')
-            )
-            aligned_data = self._align_text_to_audio(
-                searcher,
+            tts_chunks = self._load_tts_chunks(final_audio_path)  # 音频生成阶段记录的分块时间窗口
+            # 文稿已知时优先用 TTS 分块做强制对齐，置信度不足时才退回 Whisper 转录 + 对齐
+            aligned_data = self._force_align_text(
+                text_processor,
                 sentences,
-                whisper_segments,
+                tts_chunks,
                 self.task_manager.get_file_path('alignment_cache')
             )
+            if aligned_data is None:
+                # 只有退回 Whisper 对齐时才需要转录器（转录时才会借用 Whisper 模型）
+                audio_transcriber = AudioTranscriber(model_loader)
+                whisper_segments = self._transcribe_audio(
+                    audio_transcriber,
+                    final_audio_path,
+                    self.task_manager.get_file_path('whisper_cache')
+                )
+                aligned_data = self._align_text_to_audio(
+                    searcher,
+                    sentences,
+                    whisper_segments,
+                    self.task_manager.get_file_path('alignment_cache'),
+                    tts_chunks
+                )
+            self._embed_aligned_text(
+                searcher,
+                aligned_data,
+                self.task_manager.get_file_path('alignment_embeddings')
+            )
             self._create_srt_from_alignment(
                 aligned_data,
                 self.task_manager.get_file_path('final_srt')
@@ -133,6 +154,66 @@ class SubtitleGenerator:
         log.success(f"Processed {len(processed_sentences)} sentences and saved to {sentences_output_path}")  # 日志：处理完成
         return processed_sentences  # 返回处理后的句子列表
 
+    # 读取音频生成阶段输出的时间清单，换算出每块在最终音频中的时间窗口（秒）
+    def _load_tts_chunks(self, final_audio_path: str) -> List[Dict] | None:
+        manifest_path = self.task_manager.get_file_path('timing_manifest')
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        sample_rate = manifest['sample_rate']
+        chunks = [
+            {
+                "index": chunk['index'],
+                "text": chunk['text'],
+                "start": chunk['start_sample'] / sample_rate,
+                "end": chunk['end_sample'] / sample_rate,
+                "audio_path": self.task_manager.get_file_path('audio_segment', index=chunk['index']),
+            }
+            for chunk in manifest.get('chunks', [])
+        ]
+        if not chunks:
+            return None
+        # 清单必须与当前的最终音频一致，否则说明最终音频已被替换（例如上传的音频）
+        total = wav_duration(final_audio_path)
+        if abs(total - chunks[-1]['end']) > 0.5:
+            log.warning(f"Timing manifest covers {chunks[-1]['end']:.2f}s but final audio lasts {total:.2f}s, ignoring it.")
+            return None
+        return chunks
+
+    # 强制对齐：直接利用 TTS 分块的时间窗口和块内停顿确定句子时间，成功时返回对齐结果
+    def _force_align_text(self, text_processor: TextProcessor, sentences: List[str], chunks: List[Dict] | None, alignment_cache_path: str) -> List[Dict] | None:
+        alignment_config = config.get('alignment', {}) or {}
+        if alignment_config.get('mode', 'forced') != 'forced' or os.path.exists(alignment_cache_path):
+            return None  # 已有对齐缓存时由 _align_text_to_audio 读取
+
+        log.info("\n--- Step 3.2: Forced alignment from TTS chunks ---")
+        if not chunks:
+            log.info("No usable TTS chunk timing found, falling back to Whisper alignment.")
+            return None
+
+        aligner = ForcedAligner(
+            text_processor,
+            snap_tolerance=alignment_config.get('snap_tolerance', 0.8),
+            workers=alignment_config.get('workers', 4),
+        )
+        try:
+            aligned_data, confidence = aligner.align(sentences, chunks)
+        except (OSError, wave.Error, ValueError) as e:
+            # 分块音频缺失、截断或无法读取时退回 Whisper 对齐
+            log.warning(f"Forced alignment failed to read TTS chunk audio ({e}), falling back to Whisper alignment.")
+            return None
+        min_confidence = alignment_config.get('min_confidence', 0.6)
+        if not aligned_data or confidence < min_confidence:
+            log.warning(f"Forced alignment confidence {confidence:.2f} below {min_confidence}, falling back to Whisper alignment.")
+            return None
+
+        with open(alignment_cache_path, 'wb') as f:
+            pickle.dump(aligned_data, f)  # 缓存对齐结果
+        log.success(f"Forced alignment data saved to {alignment_cache_path}")
+        return aligned_data
+
     # 使用Whisper模型转录音频
     def _transcribe_audio(self, audio_transcriber: AudioTranscriber, audio_path: str, whisper_cache_path: str) -> List[Dict]:
         log.info("\n--- Step 3.2: Transcribing audio with Whisper ---")
@@ -153,7 +234,7 @@ class SubtitleGenerator:
         return whisper_segments
 
     # 将文本句子与音频转录结果进行对齐
-    def _align_text_to_audio(self, searcher: Searcher, sentences: List[str], whisper_segments: List[Dict], alignment_cache_path: str) -> List[Dict]:
+    def _align_text_to_audio(self, searcher: Searcher, sentences: List[str], whisper_segments: List[Dict], alignment_cache_path: str, chunks: List[Dict] | None = None) -> List[Dict]:
         log.info("\n--- Step 3.3: Aligning text to audio ---")
 
         if os.path.exists(alignment_cache_path):  # 若对齐结果已缓存则读取
@@ -161,15 +242,58 @@ class SubtitleGenerator:
             with open(alignment_cache_path, 'rb') as f:
                 return pickle.load(f)
 
-        log.info("Running linear alignment...")  # 开始对齐
-
         all_whisper_words = [word for segment in whisper_segments for word in segment.get('words', [])]  # 提取所有词
-        aligned_data, _ = searcher.linear_align(sentences, all_whisper_words)  # 执行线性对齐
+
+        alignment_config = config.get('alignment', {}) or {}
+        engine = alignment_config.get('engine', 'dp')  # 对齐引擎：dp（带状动态规划）或 linear（旧的窗口穷举）
+
+        def align(lines, words):
+            if engine == 'linear':
+                return searcher.linear_align(lines, words)[0]  # 执行线性对齐
+            return searcher.dp_align(
+                lines,
+                words,
+                band_width=alignment_config.get('band_width', 300),
+                match_threshold=alignment_config.get('match_threshold', 75),
+            )[0]  # 执行动态规划对齐
+
+        if chunks:
+            # 有时间清单时，每块的句子只在该块时间窗口内的词中搜索，各块并行对齐
+            log.info(f"Running {engine} alignment within {len(chunks)} TTS chunk windows...")
+            per_chunk = ForcedAligner(searcher.text_processor).assign_sentences(sentences, chunks)
+            windows = []
+            for chunk, items in zip(chunks, per_chunk):
+                # 以词的中点归属时间窗口，相邻窗口互不重叠
+                words = [w for w in all_whisper_words if chunk['start'] <= (w['start'] + w['end']) / 2 < chunk['end']]
+                windows.append(([item[0] for item in items], words))
+            with ThreadPoolExecutor(max_workers=max(1, alignment_config.get('workers', 4))) as executor:
+                results = executor.map(lambda window: align(*window) if window[0] and window[1] else [], windows)
+                aligned_data = [entry for entries in results for entry in entries]
+        else:
+            log.info(f"Running {engine} alignment...")
+            aligned_data = align(sentences, all_whisper_words)
         with open(alignment_cache_path, 'wb') as f:
             pickle.dump(aligned_data, f)  # 缓存对齐结果
         log.success(f"Alignment data saved to {alignment_cache_path}")
         return aligned_data
 
+    # 对齐完成后批量计算句子嵌入，以 float16 矩阵保存到对齐缓存旁的 .npy 文件
+    def _embed_aligned_text(self, searcher: Searcher, aligned_data: List[Dict], embeddings_path: str) -> np.ndarray:
+        embeddings = load_embeddings(embeddings_path, aligned_data)  # 若嵌入已缓存且与对齐文本的哈希一致则直接读取
+        if embeddings is not None:
+            log.info(f"Found existing alignment embeddings: {embeddings_path}")
+            return embeddings
+
+        batch_size = config.get('alignment', {}).get('embedding_batch_size', 64)
+        log.info(f"Encoding {len(aligned_data)} aligned sentences (batch size {batch_size})...")
+        embeddings = searcher.encode_batch([entry['text'] for entry in aligned_data], batch_size=batch_size)
+        if embeddings is None:
+            log.warning("Sentence model unavailable, skipping alignment embeddings.")
+            return None
+        save_embeddings(embeddings_path, embeddings, aligned_data)  # 保存嵌入矩阵及对齐文本的哈希
+        log.success(f"Alignment embeddings saved to {embeddings_path}")
+        return embeddings
+
     # 根据对齐结果生成SRT字幕文件
     def _create_srt_from_alignment(self, aligned_data: List[Dict], srt_output_path: str):
         log.info("--- Step 3.4: Generating SRT file ---")
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+进程内的简单指标注册表。
+
+各模块通过 increment() 累加计数器，或通过 register_source() 注册一个返回统计字典的回调
+（例如缓存命中率），snapshot() 汇总所有指标，供 /metrics 接口和日志使用。
+"""
+import threading
+from typing import Any, Callable, Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def increment(name: str, value: float = 1):
+    """累加一个计数器。"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def register_source(name: str, source: Callable[[], Dict[str, Any]]):
+    """注册一个统计来源；同名来源会被覆盖。"""
+    with _lock:
+        _sources[name] = source
+
+
+def snapshot() -> Dict[str, Any]:
+    """返回当前所有计数器和统计来源的快照。"""
+    with _lock:
+        counters = dict(_counters)
+        sources = dict(_sources)
+
+    result: Dict[str, Any] = {"counters": counters}
+    for name, source in sources.items():
+        try:
+            result[name] = source()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
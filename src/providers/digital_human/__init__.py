@@ -8,7 +8,8 @@ def get_digital_human_provider() -> DigitalHumanProvider:
     if heygem_config:
         return HeygemProvider(
             endpoint=heygem_config.get("endpoint"),
-            token=heygem_config.get("token")
+            token=heygem_config.get("token"),
+            timeout=heygem_config.get("timeout", 1800)
         )
     # 如果没有找到相关配置，则抛出错误
     raise ValueError("Heygem API provider not configured in config.yaml")
@@ -1,10 +1,12 @@
-import requests
 from typing import Optional, Dict, Any
 from .base import DigitalHumanProvider
+from src import http_client
 
 class HeygemProvider(DigitalHumanProvider):
-    def __init__(self, endpoint: str, token: str):
+    def __init__(self, endpoint: str, token: str, timeout: float = 1800):
         self.endpoint = endpoint
+        # 数字人视频生成耗时较长，读取超时单独配置
+        self.timeout = (http_client.default_timeout()[0], timeout)
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/json"
@@ -17,12 +19,9 @@ class HeygemProvider(DigitalHumanProvider):
             if segments_json:
                 data["segments_json"] = segments_json
 
-            # 明确禁用代理，以避免在调用内网服务时出现 "Privoxy" 等代理错误
+            # 明确禁用代理（trust_env=False），以避免在调用内网服务时出现 "Privoxy" 等代理错误
             # 这与 IndexTtsProvider 和其他内网服务的处理方式保持一致
-            proxies = {
-               "http": None,
-               "https": None,
-            }
-            response = requests.post(self.endpoint, headers=self.headers, files=files, data=data, proxies=proxies)
+            response = http_client.post(self.endpoint, headers=self.headers, files=files, data=data,
+                                        timeout=self.timeout, trust_env=False)
             response.raise_for_status()
             return response.json()
@@ -1,12 +1,15 @@
 import sys
 import time
+import asyncio
+import weakref
 from .base import BaseLlmProvider
 from .ollama import OllamaProvider
 from .siliconflow import SiliconflowProvider
 from .openai import OpenAIProvider
 from .gemini import GeminiProvider
 from src.logger import log
-from typing import Dict, Optional, List, Any, Callable
+from src.core.llm_cache import get_llm_cache
+from typing import Dict, Optional, List, Any, Callable, Tuple
 
 # 映射提供者名称到其类
 _PROVIDER_CLASSES = {
@@ -34,6 +37,11 @@ class LlmManager:
         # 防止重复初始化
         if hasattr(self, '_initialized') and self._initialized:
             return
+
+        # 事件循环 -> 限制在途请求数的信号量（asyncio.Semaphore 绑定创建它的事件循环）
+        self._async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.cache = None
+        self.cache_nonzero_temperature = False
         
         if config is None:
             self.provider: Optional[BaseLlmProvider] = None
@@ -82,6 +90,10 @@ class LlmManager:
                 return
 
             log.info(f"Successfully loaded LLM provider: '{used_provider_name}' with model '{self.model_name}'")
+
+            # 响应缓存：默认只缓存 temperature 为 0 的确定性请求
+            self.cache = get_llm_cache(config)
+            self.cache_nonzero_temperature = bool((llm_config.get('cache', {}) or {}).get('cache_nonzero_temperature', False))
         except Exception as e:
             log.error(f"Failed to load LLM provider '{used_provider_name}': {e}")
             self.provider = None
@@ -95,25 +107,63 @@ class LlmManager:
         """
         return self.provider
 
-    def _execute_with_retry(self, method_name: str, *args, **kwargs) -> Any:
+    def _cache_key(self, kind: str, payload: Any, use_cache: Optional[bool], kwargs: Dict) -> Optional[str]:
         """
-        使用重试逻辑执行提供者的方法（'generate' 或 'chat'）。
+        返回本次请求的缓存键，不使用缓存时返回 None。
+        use_cache 为调用方传入的 cache 参数：False 总是绕过缓存，True 总是使用缓存；
+        未指定时只缓存 temperature 为 0 的请求（除非配置了 cache_nonzero_temperature）。
         """
+        if self.cache is None or use_cache is False:
+            return None
+        temperature = kwargs.get('temperature', self.provider.config.get('temperature'))
+        if use_cache is None and not self.cache_nonzero_temperature and temperature != 0:
+            return None
+        return self.cache.make_key(self.provider.name, kwargs.get('model'), kind, payload, kwargs)
+
+    def _prepare_request(self, kind: str, args: Tuple, kwargs: Dict) -> Optional[str]:
+        """补全模型参数并返回本次请求的缓存键（不使用缓存时为 None）。"""
         if not self.provider:
             log.error("No LLM provider is configured or available to execute the request.")
             raise RuntimeError("No LLM provider is configured or available to execute the request.")
 
-        last_exception = None
+        use_cache = kwargs.pop('cache', None)
         # Ensure the model is passed if not already in kwargs
         if 'model' not in kwargs and self.model_name:
             kwargs['model'] = self.model_name
 
+        return self._cache_key(kind, args[0] if args else None, use_cache, kwargs)
+
+    def _lookup(self, cache_key: Optional[str]) -> Optional[str]:
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            log.debug(f"LLM response cache hit for provider '{self.provider.name}'.")
+        return cached
+
+    def _store_response(self, cache_key: Optional[str], response: Any, kwargs: Dict):
+        if cache_key is not None and isinstance(response, str) and response:
+            self.cache.put(cache_key, response, provider=self.provider.name, model=kwargs.get('model'))
+
+    def _execute_with_retry(self, method_name: str, *args, **kwargs) -> Any:
+        """
+        使用重试逻辑执行提供者的方法（'generate' 或 'chat'）。
+        kwargs 中的 cache 参数控制是否使用响应缓存，不会传给提供者。
+        """
+        cache_key = self._prepare_request(method_name, args, kwargs)
+        cached = self._lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        last_exception = None
         for attempt in range(self.retries + 1):
             try:
                 # 将此日志级别从 INFO 降低到 DEBUG，以减少正常运行时的干扰
                 log.debug(f"Attempting to use LLM provider: '{self.provider.name}' (Attempt {attempt + 1}/{self.retries + 1})")
                 method: Callable = getattr(self.provider, method_name)
-                return method(*args, **kwargs)
+                response = method(*args, **kwargs)
+                self._store_response(cache_key, response, kwargs)
+                return response
             except Exception as e:
                 last_exception = e
                 log.warning(f"LLM provider '{self.provider.name}' failed on attempt {attempt + 1}: {e}")
@@ -124,6 +174,57 @@ class LlmManager:
         log.error(f"LLM provider '{self.provider.name}' failed after {self.retries + 1} attempts. Last error: {last_exception}")
         raise RuntimeError(f"LLM provider '{self.provider.name}' failed after {self.retries + 1} attempts. Last error: {last_exception}")
 
+    def _async_slot(self) -> asyncio.Semaphore:
+        """返回当前事件循环中限制在途请求数的信号量，上限为提供者的 max_concurrency。"""
+        loop = asyncio.get_running_loop()
+        slot = self._async_slots.get(loop)
+        if slot is None:
+            slot = self._async_slots[loop] = asyncio.Semaphore(self.provider.max_concurrency)
+        return slot
+
+    async def _aexecute_with_retry(self, method_name: str, *args, **kwargs) -> Any:
+        """
+        _execute_with_retry 的异步版本，调用提供者的 'agenerate' 或 'achat'。
+        同时在途的请求数受提供者的 max_concurrency 限制，重试等待期间不占用名额。
+        缓存的读写是同步的 SQLite 操作，放到线程中执行，不阻塞事件循环。
+        """
+        # 与同步版本共用缓存：agenerate/achat 的结果以 generate/chat 的键存取
+        cache_key = self._prepare_request(method_name[1:], args, kwargs)
+        cached = await asyncio.to_thread(self._lookup, cache_key) if cache_key is not None else None
+        if cached is not None:
+            return cached
+
+        last_exception = None
+        for attempt in range(self.retries + 1):
+            try:
+                log.debug(f"Attempting to use LLM provider: '{self.provider.name}' (Attempt {attempt + 1}/{self.retries + 1})")
+                method: Callable = getattr(self.provider, method_name)
+                async with self._async_slot():
+                    response = await method(*args, **kwargs)
+                if cache_key is not None:
+                    await asyncio.to_thread(self._store_response, cache_key, response, kwargs)
+                return response
+            except Exception as e:
+                last_exception = e
+                log.warning(f"LLM provider '{self.provider.name}' failed on attempt {attempt + 1}: {e}")
+                if attempt < self.retries:
+                    await asyncio.sleep(1)
+
+        log.error(f"LLM provider '{self.provider.name}' failed after {self.retries + 1} attempts. Last error: {last_exception}")
+        raise RuntimeError(f"LLM provider '{self.provider.name}' failed after {self.retries + 1} attempts. Last error: {last_exception}")
+
+    def discard_cached(self, kind: str, payload: Any, **kwargs):
+        """
+        删除一次请求的缓存响应。调用方发现响应无效（如无法解析）时调用，避免之后一直命中这条坏结果。
+        kind 为 'generate' 或 'chat'，payload 为提示词或消息列表，kwargs 与请求时相同。
+        """
+        if self.cache is None or not self.provider:
+            return
+        kwargs.pop('cache', None)
+        if 'model' not in kwargs and self.model_name:
+            kwargs['model'] = self.model_name
+        self.cache.delete(self._cache_key(kind, payload, True, kwargs))
+
     def generate_with_failover(self, prompt: str, **kwargs) -> str:
         """
         使用重试逻辑生成文本。
@@ -136,6 +237,18 @@ class LlmManager:
         """
         return self._execute_with_retry('chat', messages, **kwargs)
 
+    async def agenerate_with_failover(self, prompt: str, **kwargs) -> str:
+        """
+        generate_with_failover 的异步版本，可在事件循环中并发调用。
+        """
+        return await self._aexecute_with_retry('agenerate', prompt, **kwargs)
+
+    async def achat_with_failover(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        chat_with_failover 的异步版本。
+        """
+        return await self._aexecute_with_retry('achat', messages, **kwargs)
+
     @property
     def default(self) -> Optional[BaseLlmProvider]:
         """
@@ -1,6 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 
+from src import http_client
+
 class BaseLlmProvider(ABC):
     """
     LLM提供者的抽象基类。
@@ -13,6 +16,8 @@ class BaseLlmProvider(ABC):
         """
         self.name = name
         self.config = config
+        # 异步调用时同时在途的请求数上限：本地服务（如 Ollama）按其并行能力设置，远程 API 可以放宽
+        self.max_concurrency = max(1, int(self.config.get('max_concurrency', 1)))
 
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
@@ -28,5 +33,33 @@ class BaseLlmProvider(ABC):
         """
         pass
 
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        generate 的异步版本。默认在线程中执行同步实现，提供者可以改写为原生的异步请求。
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        chat 的异步版本。默认在线程中执行同步实现。
+        """
+        return await asyncio.to_thread(self.chat, messages, **kwargs)
+
+    async def _achat_completions(self, base_url: str, api_key: str, payload: Dict[str, Any],
+                                 timeout=None, trust_env: bool = True) -> str:
+        """
+        通过共享的 httpx 客户端调用 OpenAI 兼容的 /chat/completions 接口，返回第一条回复的内容。
+        供 OpenAI、SiliconFlow 等兼容接口的提供者实现原生的 achat。
+        """
+        response = await http_client.apost(
+            base_url.rstrip('/') + '/chat/completions',
+            headers={"Authorization": f"Bearer {api_key}"},
+            json=payload,
+            timeout=timeout,
+            trust_env=trust_env,
+        )
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
     def __repr__(self):
         return f"<{self.__class__.__name__}(name='{self.name}')>"
\ No newline at end of file
@@ -1,6 +1,7 @@
 import openai
 import os
 from .base import BaseLlmProvider
+from .openai import DEFAULT_BASE_URL
 from typing import List, Dict
 
 class GeminiProvider(BaseLlmProvider):
@@ -64,3 +65,23 @@ class GeminiProvider(BaseLlmProvider):
             return response.choices[0].message.content
         except Exception as e:
             raise
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Native async generate.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        return await self.achat(messages, **kwargs)
+
+    async def achat(self, messages: List, **kwargs) -> str:
+        """
+        Native async chat over the shared httpx client. Like the sync client, it ignores proxy environment variables.
+        """
+        model = kwargs.pop('model', self.default_model)
+        if model != self.model:
+            raise ValueError(f"Model '{model}' is not the configured model for provider '{self.name}'. Configured model: {self.model}")
+
+        return await self._achat_completions(
+            self.base_url or DEFAULT_BASE_URL, self.api_key, {"model": model, "messages": messages, **kwargs},
+            timeout=self.timeout, trust_env=False,
+        )
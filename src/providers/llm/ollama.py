@@ -1,6 +1,7 @@
 import os
 import ollama
 from .base import BaseLlmProvider
+from src import http_client
 from src.logger import log
 from typing import List, Dict, Any
 from contextlib import contextmanager
@@ -32,6 +33,8 @@ def no_proxy():
         if proxies_to_remove:
             log.info("System proxy settings restored.")
 
+DEFAULT_HOST = "http://localhost:11434"
+
 class OllamaProvider(BaseLlmProvider):
     """
     Ollama LLM 提供者。
@@ -99,3 +102,39 @@ class OllamaProvider(BaseLlmProvider):
             raise
         except Exception as e:
             raise
+
+    async def _apost(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        通过共享的 httpx 客户端调用 Ollama 的 REST 接口（不走代理，与同步客户端一致）。
+        """
+        host = (self.config.get('host') or DEFAULT_HOST).rstrip('/')
+        response = await http_client.apost(
+            f"{host}{endpoint}", json={**payload, "stream": False},
+            timeout=self.config.get('timeout', 600), trust_env=False,
+        )
+        if response.status_code == 404 and "not found" in response.text.lower():
+            log.error(f"Model '{payload['model']}' not found. Please pull it with `ollama pull {payload['model']}`.")
+        response.raise_for_status()
+        return response.json()
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        generate 的原生异步实现（httpx.AsyncClient）。
+        """
+        model = kwargs.pop('model', self.default_model)
+        if model != self.model:
+            raise ValueError(f"Model '{model}' is not the configured model for provider '{self.name}'. Configured model: {self.model}")
+
+        response = await self._apost('/api/generate', {"model": model, "prompt": prompt, "options": kwargs})
+        return response.get('response', '')
+
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        chat 的原生异步实现（httpx.AsyncClient）。
+        """
+        model = kwargs.pop('model', self.default_model)
+        if model != self.model:
+            raise ValueError(f"Model '{model}' is not the configured model for provider '{self.name}'. Configured model: {self.model}")
+
+        response = await self._apost('/api/chat', {"model": model, "messages": messages, "options": kwargs})
+        return response['message']['content']
@@ -2,6 +2,8 @@ import openai
 from .base import BaseLlmProvider
 from typing import List, Dict
 
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
 class OpenAIProvider(BaseLlmProvider):
     """
     OpenAI LLM Provider.
@@ -47,3 +49,22 @@ class OpenAIProvider(BaseLlmProvider):
             return response.choices[0].message.content
         except Exception as e:
             raise
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Native async generate.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        return await self.achat(messages, **kwargs)
+
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Native async chat over the shared httpx client.
+        """
+        model = kwargs.pop('model', self.default_model)
+        if model != self.model:
+            raise ValueError(f"Model '{model}' is not the configured model for provider '{self.name}'. Configured model: {self.model}")
+
+        return await self._achat_completions(
+            self.base_url or DEFAULT_BASE_URL, self.api_key, {"model": model, "messages": messages, **kwargs}
+        )
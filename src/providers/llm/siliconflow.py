@@ -73,3 +73,28 @@ class SiliconflowProvider(BaseLlmProvider):
         except Exception as e:
             log.error(f"SiliconFlow chat failed: {e}", exc_info=True)
             raise
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        generate 的原生异步实现。
+        """
+        return await self.achat([{"role": "user", "content": prompt}], **kwargs)
+
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        chat 的原生异步实现（httpx.AsyncClient），参数过滤规则与同步版本相同。
+        """
+        model = kwargs.pop('model', self.default_model)
+        if model != self.model:
+            raise ValueError(f"Model '{model}' is not the configured model for provider '{self.name}'. Configured model: {self.model}")
+
+        supported_params = ['temperature', 'max_tokens', 'top_p', 'top_k', 'stop']
+        chat_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
+
+        try:
+            return await self._achat_completions(
+                self.host, self.api_key, {"model": model, "messages": messages, **chat_kwargs}
+            )
+        except Exception as e:
+            log.error(f"SiliconFlow chat failed: {e}", exc_info=True)
+            raise
@@ -12,7 +12,7 @@ class AiSearchProvider(BaseVideoProvider):
     通过AI API搜索视频的提供者。
     """
     def __init__(self, config: dict):
-        super().__init__()
+        super().__init__(config)
         ai_search_config = config.get('search_providers', {}).get('ai_search', {})
         self.api_key = ai_search_config.get('api_key')
         self.api_url = ai_search_config.get('api_url')
@@ -72,6 +72,7 @@ class AiSearchProvider(BaseVideoProvider):
         验证AI API的返回结果，并将其标准化以进行重复数据删除。
         - 使用 'video_id' 和 'video_name' 创建一个唯一的稳定ID。
         - 将此稳定ID覆盖 'id' 字段。
+        - 将 'width' / 'height' / 'fps' 统一为数值，供合成器判断是否需要缩放。
         """
         standardized_videos = []
         seen_ids = set()
@@ -112,6 +113,13 @@ class AiSearchProvider(BaseVideoProvider):
                     log.warning(f"AI search result for '{video_info['id']}' has unexpected duration format: {duration_str}. Skipping.")
                 video_info.pop('duration', None)
 
+            # AI 搜索返回的是本地素材库中的单一片段，没有多码流可选，只需透传其分辨率信息
+            for key, cast in (('width', int), ('height', int), ('fps', float)):
+                try:
+                    video_info[key] = cast(video_info[key]) if video_info.get(key) else None
+                except (ValueError, TypeError):
+                    video_info[key] = None
+
             standardized_videos.append(video_info)
             seen_ids.add(video_info['id'])
 
@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class BaseVideoProvider(ABC):
     """
@@ -7,9 +8,22 @@ class BaseVideoProvider(ABC):
     定义了所有视频源（如 Pexels, Pixabay, 本地文件等）必须遵循的统一接口。
     """
 
-    def __init__(self):
+    # 帧率比较的容差，用于兼容 29.97 / 30 这类 NTSC 帧率
+    FPS_TOLERANCE = 0.5
+
+    # 搜索结果是否可以被 SearchResultCache 缓存。搜索时会产生副作用（如直接下载文件）的提供者应设为 False。
+    cacheable = True
+
+    def __init__(self, config: Optional[dict] = None):
         self.enabled = True
 
+        # 从 video_composition 读取最终成片的分辨率和帧率，用于挑选最合适的素材码流
+        composition_config = (config.get('video_composition', {}) if config else {}) or {}
+        width, height = composition_config.get('resolution', [1920, 1080])
+        self.target_width = int(width)
+        self.target_height = int(height)
+        self.target_fps = float(composition_config.get('fps', 30))
+
     @abstractmethod
     def search(self, keywords: List[str], count: int = 1, min_duration: float = 0) -> List[Dict[str, Any]]:
         """
@@ -24,5 +38,76 @@ class BaseVideoProvider(ABC):
             List[Dict[str, Any]]: 一个包含视频信息的字典列表。
                                   每个字典应包含标准化的键，例如：
                                   {'id': '...', 'download_url': '...', 'source': 'pexels', ...}
+                                  如果提供者知道码流信息，还应包含 'width', 'height', 'fps'。
         """
         pass
+
+    async def asearch(self, keywords: List[str], count: int = 1, min_duration: float = 0) -> List[Dict[str, Any]]:
+        """
+        search 的异步版本。默认在线程中执行同步实现，基于 HTTP API 的提供者可以改写为原生异步请求。
+        """
+        return await asyncio.to_thread(self.search, keywords, count, min_duration)
+
+    def cache_filters(self) -> Dict[str, Any]:
+        """
+        返回影响搜索结果的额外过滤条件，作为搜索结果缓存键的一部分。
+        修改这些条件后，旧的缓存结果自然不会再被命中。
+        缓存的结果中已包含按输出分辨率/帧率选出的码流，因此目标规格也属于过滤条件。
+        子类应在此基础上合并自己的过滤条件。
+        """
+        return {
+            'target_width': self.target_width,
+            'target_height': self.target_height,
+            'target_fps': self.target_fps,
+        }
+
+    def _meets_resolution(self, rendition: Dict[str, Any]) -> bool:
+        """
+        判断一个码流的分辨率是否满足输出要求。
+        合成器使用 force_original_aspect_ratio=decrease 缩放，只要任一边达到目标尺寸就不会被放大。
+        """
+        width = rendition.get('width') or 0
+        height = rendition.get('height') or 0
+        return width >= self.target_width or height >= self.target_height
+
+    def _meets_target(self, rendition: Dict[str, Any]) -> bool:
+        """
+        判断一个码流的分辨率和帧率是否都满足输出要求；帧率未知时视为满足。
+        """
+        if not self._meets_resolution(rendition):
+            return False
+        fps = rendition.get('fps')
+        if fps and fps < self.target_fps - self.FPS_TOLERANCE:
+            return False
+        return True
+
+    def _select_rendition(self, renditions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        从同一视频的多个码流中选出满足目标分辨率和帧率的最小码流。
+        素材本身是 24/25 fps 时没有码流能满足帧率，此时放宽帧率要求，选分辨率达标的最小码流；
+        只有没有任何码流的分辨率达标时，才退回到分辨率最高的码流。
+
+        Args:
+            renditions: 码流列表，每项至少包含 'width' 和 'height'，可选 'fps'。
+
+        Returns:
+            选中的码流字典；列表为空时返回 None。
+        """
+        candidates = [r for r in renditions if r.get('width') and r.get('height')]
+        if not candidates:
+            return None
+
+        def area(r):
+            return r['width'] * r['height']
+
+        def fps_distance(r):
+            # 同分辨率下优先选择帧率最接近目标的码流，避免解码多余的帧
+            return abs(r['fps'] - self.target_fps) if r.get('fps') else 0
+
+        qualified = [r for r in candidates if self._meets_target(r)]
+        if qualified:
+            return min(qualified, key=lambda r: (area(r), fps_distance(r)))
+        large_enough = [r for r in candidates if self._meets_resolution(r)]
+        if large_enough:
+            return min(large_enough, key=lambda r: (area(r), fps_distance(r)))
+        return max(candidates, key=lambda r: (area(r), -fps_distance(r)))
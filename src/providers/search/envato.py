@@ -12,17 +12,159 @@ import re
 import random
 import os
 import time
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog 为可选依赖，缺失时退回到定时检查下载目录
+    Observer = None
+    FileSystemEventHandler = object
 
 from src.logger import log
 from .base import BaseVideoProvider
 
 
+class EnvatoSession:
+    """
+    一个已登录的浏览器会话：独立的 Chrome 用户数据目录（持久化登录状态）和独立的下载暂存目录。
+    """
+
+    def __init__(self, index: int, driver, profile_dir: str, staging_dir: str):
+        self.index = index
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.staging_dir = staging_dir
+
+    def is_alive(self) -> bool:
+        try:
+            _ = self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class EnvatoSessionPool:
+    """
+    进程级的 Envato 浏览器会话池。
+    首次使用时启动并登录 N 个浏览器，之后所有 EnvatoProvider 实例（包括素材替换时新建的 AssetManager）
+    共享这些热会话，每次搜索借出一个会话，用完归还。
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, size: int):
+        self.size = size
+        self._sessions: "queue.Queue[EnvatoSession]" = queue.Queue()
+        self._all_sessions: List[EnvatoSession] = []
+
+    @classmethod
+    def get_or_create(cls, provider: "EnvatoProvider") -> "EnvatoSessionPool | None":
+        """线程安全地获取会话池；首次调用时用传入的 provider 完成浏览器启动和登录。"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                pool = cls(provider.pool_size)
+                for index in range(pool.size):
+                    session = provider._create_session(index)
+                    if session:
+                        pool._add(session)
+                if not pool._all_sessions:
+                    return None
+                log.success(f"Envato 会话池已就绪，共 {len(pool._all_sessions)} 个已登录的浏览器。")
+                atexit.register(pool.shutdown)
+                cls._instance = pool
+            return cls._instance
+
+    def _add(self, session: EnvatoSession):
+        self._all_sessions.append(session)
+        self._sessions.put(session)
+
+    @contextmanager
+    def checkout(self, provider: "EnvatoProvider", timeout: float):
+        """借出一个会话；会话对应的浏览器已崩溃时就地重建。"""
+        session = self._sessions.get(timeout=timeout)
+        try:
+            if not session.is_alive():
+                log.warning(f"Envato 会话 #{session.index} 的浏览器已失效，正在重建...")
+                session.quit()
+                rebuilt = provider._create_session(session.index)
+                if rebuilt is None:
+                    raise RuntimeError(f"Envato 会话 #{session.index} 重建失败。")
+                self._all_sessions[self._all_sessions.index(session)] = rebuilt
+                session = rebuilt
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def shutdown(self):
+        log.info("正在关闭 Envato 会话池中的浏览器...")
+        for session in self._all_sessions:
+            session.quit()
+        self._all_sessions.clear()
+        with EnvatoSessionPool._instance_lock:
+            if EnvatoSessionPool._instance is self:
+                EnvatoSessionPool._instance = None
+
+
+class _DownloadEventHandler(FileSystemEventHandler):
+    def __init__(self, changed: threading.Event):
+        self.changed = changed
+
+    def on_any_event(self, event):
+        self.changed.set()
+
+
+class DownloadWatcher:
+    """
+    通过文件系统通知监听会话下载目录：Chrome 创建、写入或把 .crdownload 重命名为最终文件时立即唤醒，
+    取代固定间隔的 os.listdir 快照轮询。未安装 watchdog 时退化为每秒检查一次。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._changed = threading.Event()
+        self._observer = None
+
+    def __enter__(self):
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_DownloadEventHandler(self._changed), self.directory, recursive=False)
+            self._observer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+
+    def wait(self, timeout: float):
+        """阻塞直到目录发生变化或超时。"""
+        if self._observer is None:
+            time.sleep(min(timeout, 1))
+            return
+        self._changed.wait(timeout)
+        self._changed.clear()
+
+
 class EnvatoProvider(BaseVideoProvider):
     """
     一个用于与 Envato Elements 交互的 Provider 类。
     封装了浏览器初始化、登录、搜索和下载等操作。
     """
 
+    # 搜索时会直接下载文件，结果依赖本地文件状态，不参与搜索结果缓存
+    cacheable = False
+
     # --- 页面元素选择器 (从 config.py 迁移并作为类常量) ---
     login_page_cookie_accept_button_xpath = "//button[contains(text(),'Accept Cookies')]"
     login_username_field_id = "username"
@@ -59,7 +201,7 @@ class EnvatoProvider(BaseVideoProvider):
     ]
 
     def __init__(self, config: dict):
-        super().__init__()
+        super().__init__(config)
         envato_config = config.get('search_providers', {}).get('envato', {})
         paths_config = config.get('paths', {})
 
@@ -72,9 +214,17 @@ class EnvatoProvider(BaseVideoProvider):
         self.target_resolutions = envato_config.get('target_resolutions', ['1080p', '2K'])
         self.enabled = envato_config.get('enabled', False)
 
+        # 会话池大小与借出会话的最长等待时间
+        self.pool_size = max(1, int(envato_config.get('pool_size', 1)))
+        self.checkout_timeout = envato_config.get('checkout_timeout', 1800)
+
         base_download_dir = paths_config.get(
             'local_assets_dir', 'storage/local')
         self.download_dir = os.path.join(base_download_dir, 'envato')
+        # 每个会话各自的下载暂存目录，避免多个浏览器同时下载时互相误认文件
+        self.staging_root = os.path.join(base_download_dir, '.envato_sessions')
+        self._local = threading.local()
+        self.pool = None
 
         if not all([self.chrome_driver_path, self.username, self.password]):
             raise ValueError(
@@ -86,21 +236,47 @@ class EnvatoProvider(BaseVideoProvider):
             self.enabled = False
             return
 
-        self.driver = self._initialize_browser()
-        if not self.driver:
+        self.pool = EnvatoSessionPool.get_or_create(self)
+        if not self.pool:
             self.enabled = False
-            log.error("浏览器初始化失败，Envato provider 已被禁用。")
+            log.error("Envato 会话池初始化失败（浏览器启动或登录失败），provider 已被禁用。")
             return
 
-        if not self.login():
-            self.enabled = False
-            log.error("Envato 登录失败，provider 已被禁用。")
-            return
+    @property
+    def driver(self):
+        """当前线程借出的会话所对应的浏览器。"""
+        session = getattr(self._local, 'session', None)
+        return session.driver if session else None
+
+    @property
+    def staging_dir(self):
+        return self._local.session.staging_dir
+
+    def _create_session(self, index: int) -> "EnvatoSession | None":
+        """启动一个带持久化用户数据目录的浏览器并完成登录。"""
+        # 第一个会话沿用原有的用户数据目录，保留已有的登录状态
+        profile_name = "chrome_profile_envato" if index == 0 else f"chrome_profile_envato_{index}"
+        profile_dir = os.path.join(os.getcwd(), profile_name)
+        staging_dir = os.path.join(self.staging_root, f"session_{index}")
+
+        driver = self._initialize_browser(profile_dir, staging_dir)
+        if not driver:
+            return None
 
-    def _initialize_browser(self):
+        session = EnvatoSession(index, driver, profile_dir, staging_dir)
+        self._local.session = session
+        try:
+            if not self.login():
+                log.error(f"Envato 会话 #{index} 登录失败。")
+                session.quit()
+                return None
+        finally:
+            self._local.session = None
+        return session
+
+    def _initialize_browser(self, user_data_dir: str, download_dir: str):
         log.info("正在初始化浏览器...")
         options = webdriver.ChromeOptions()
-        user_data_dir = os.path.join(os.getcwd(), "chrome_profile_envato")
         options.add_argument(f"--user-data-dir={user_data_dir}")
         log.info(f"使用用户数据目录: {user_data_dir}")
 
@@ -119,16 +295,16 @@ class EnvatoProvider(BaseVideoProvider):
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--blink-settings=imagesEnabled=true")
 
-        if not os.path.exists(self.download_dir):
-            os.makedirs(self.download_dir)
+        os.makedirs(self.download_dir, exist_ok=True)
+        os.makedirs(download_dir, exist_ok=True)
         prefs = {
-            "download.default_directory": os.path.abspath(self.download_dir),
+            "download.default_directory": os.path.abspath(download_dir),
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safeBrowse.enabled": True
         }
         options.add_experimental_option("prefs", prefs)
-        print(f"下载目录已配置为: {self.download_dir}")
+        log.info(f"下载暂存目录已配置为: {download_dir}")
 
         try:
             service = Service(os.path.abspath(self.chrome_driver_path))
@@ -237,12 +413,24 @@ class EnvatoProvider(BaseVideoProvider):
             return []
 
         query = " ".join(keywords)
-        if not self.search_on_envato(query):
+        try:
+            with self.pool.checkout(self, timeout=self.checkout_timeout) as session:
+                self._local.session = session
+                log.info(f"已借出 Envato 会话 #{session.index}。")
+                try:
+                    if not self.search_on_envato(query):
+                        return []
+
+                    downloaded_files = self.download_videos(
+                        num_to_download=count, license_name=self.license_name, target_resolutions=self.target_resolutions)
+                finally:
+                    self._local.session = None
+        except queue.Empty:
+            log.error(f"在 {self.checkout_timeout} 秒内没有空闲的 Envato 会话，跳过本次搜索。")
+            return []
+        except RuntimeError as e:
+            log.error(str(e))
             return []
-
-        downloaded_files = self.download_videos(
-            # num_to_download=count, license_name=self.license_name, target_resolutions=self.target_resolutions)
-            num_to_download=count, license_name=self.license_name, target_resolutions=self.target_resolutions)
 
         standardized_videos = []
         for file_path in downloaded_files:
@@ -293,9 +481,6 @@ class EnvatoProvider(BaseVideoProvider):
             for i, item_card in enumerate(items_to_process):
                 log.info(f"\n尝试下载第 {i+1} 个素材...")
                 try:
-                    files_before_download = set(os.listdir(self.download_dir))
-                    log.debug(f"下载前目录文件快照: {files_before_download}")
-
                     # 尝试重新定位当前素材卡片，以避免 StaleElementReferenceException
                     # 这是处理动态页面的常见做法
                     # 重新查找所有元素，并根据索引获取当前卡片
@@ -311,7 +496,7 @@ class EnvatoProvider(BaseVideoProvider):
                     continue
 
                 actual_downloaded_filename = self._download_single_item(
-                    current_item_card, license_name, target_resolutions, download_complete_timeout, files_before_download)
+                    current_item_card, license_name, target_resolutions, download_complete_timeout)
 
                 if actual_downloaded_filename:
                     # 创建按天组织的子目录
@@ -319,14 +504,14 @@ class EnvatoProvider(BaseVideoProvider):
                     daily_dir = os.path.join(self.download_dir, today_str)
                     os.makedirs(daily_dir, exist_ok=True)
 
-                    # 将下载的文件移动到当天的目录
+                    # 将下载的文件从会话暂存目录移动到当天的目录
                     source_path = os.path.join(
-                        self.download_dir, actual_downloaded_filename)
+                        self.staging_dir, actual_downloaded_filename)
                     destination_path = os.path.join(
                         daily_dir, actual_downloaded_filename)
 
                     try:
-                        os.rename(source_path, destination_path)
+                        os.replace(source_path, destination_path)
                         downloaded_files.append(destination_path)
                         log.success(
                             f"第 {i+1} 个素材下载成功并移动到: {destination_path}")
@@ -349,7 +534,7 @@ class EnvatoProvider(BaseVideoProvider):
             log.error(f"遍历下载素材时发生错误: {e}")
             return downloaded_files
     
-    def _download_single_item(self, item_element, license_name, target_resolutions, timeout, files_before_download):
+    def _download_single_item(self, item_element, license_name, target_resolutions, timeout):
         wait = WebDriverWait(self.driver, self.wait_timeout)
         downloaded_filename_prefix = None  # 初始化为None
 
@@ -404,9 +589,7 @@ class EnvatoProvider(BaseVideoProvider):
             # --- 在点击 License & download 前，检查并删除下载目录中可能存在的旧文件 ---
             # 确保在获取到下载前缀后执行此操作
             self._delete_existing_files(downloaded_filename_prefix)
-            files_before_download = set(os.listdir(self.download_dir))
-            log.debug(
-                f"删除旧文件后，更新的下载前目录文件快照: {files_before_download}")
+            self._clear_staging_dir()
 
 
             if target_resolutions:
@@ -426,7 +609,7 @@ class EnvatoProvider(BaseVideoProvider):
 
             # --- 等待下载完成，并尝试获取实际下载的文件名 ---
             actual_downloaded_filename = self._wait_for_download_and_get_filename(
-                downloaded_filename_prefix, timeout, files_before_download)
+                downloaded_filename_prefix, timeout)
 
             return actual_downloaded_filename
 
@@ -521,10 +704,20 @@ class EnvatoProvider(BaseVideoProvider):
                 else:
                     log.debug(f"跳过目录: {filename}")
 
-    def _wait_for_download_and_get_filename(self, filename_prefix, timeout, files_before_download):
+    def _clear_staging_dir(self):
+        """清理会话暂存目录中上一次失败下载遗留的文件，保证之后出现的文件都属于本次下载。"""
+        for filename in os.listdir(self.staging_dir):
+            file_path = os.path.join(self.staging_dir, filename)
+            if os.path.isfile(file_path):
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    log.warning(f"清理暂存文件 {file_path} 失败: {e}")
+
+    def _wait_for_download_and_get_filename(self, filename_prefix, timeout):
         """
-        等待文件下载完成，并返回最终的文件名。
-        使用 tqdm 库显示下载进度条。
+        等待文件下载完成，并返回最终的文件名（位于会话暂存目录中）。
+        由 DownloadWatcher 的文件系统通知驱动，使用 tqdm 库显示下载进度条。
         """
         start_time = time.time()
         log.info(
@@ -535,94 +728,48 @@ class EnvatoProvider(BaseVideoProvider):
         log.debug(
             f"标准化后的预期文件名部分（用于匹配）: '{normalized_prefix}'")
 
-        found_crdownload_files = []
         pbar = tqdm(total=0, unit='B', unit_scale=True,
                     desc=f"下载 {filename_prefix[:30]}...", leave=False)
-        last_reported_size = 0
-        check_interval = 1
-
-        while time.time() - start_time < timeout:
-            current_files = os.listdir(self.download_dir)
-            new_files_since_start = [
-                f for f in current_files if f not in files_before_download]
-            relevant_new_files = [
-                f for f in new_files_since_start if normalized_prefix in f.lower()
-            ]
-
-            crdownload_file_found = False
-            for f in relevant_new_files:
-                if f.endswith(".crdownload"):
-                    crdownload_file_found = True
-                    if f not in found_crdownload_files:
-                        pbar.set_description(f"下载 '{f}'")
-                        found_crdownload_files.append(f)
-
-                    current_file_path = os.path.join(self.download_dir, f)
-                    try:
-                        current_size_bytes = os.path.getsize(current_file_path)
-                        size_increment = current_size_bytes - last_reported_size
-                        if size_increment > 0:
-                            pbar.update(size_increment)
-                            last_reported_size = current_size_bytes
-                    except OSError:
-                        pass
-
-                    potential_final_name = f[:-len(".crdownload")]
-                    if potential_final_name in current_files:
-                        final_size_bytes = os.path.getsize(
-                            os.path.join(self.download_dir, potential_final_name))
-                        if pbar.total == 0 or final_size_bytes > pbar.n:
-                            pbar.update(final_size_bytes - pbar.n)
-                        pbar.close()
-                        log.success(
-                            f"检测到临时文件 '{f}' 已完成下载，最终文件: '{potential_final_name}'")
-                        return potential_final_name
-                    elif any(final_f for final_f in current_files if final_f.startswith(potential_final_name) and not final_f.endswith(".crdownload")):
-                        for final_f in current_files:
-                            if final_f.startswith(potential_final_name) and not final_f.endswith(".crdownload"):
-                                final_size_bytes = os.path.getsize(
-                                    os.path.join(self.download_dir, final_f))
-                                if pbar.total == 0 or final_size_bytes > pbar.n:
-                                    pbar.update(final_size_bytes - pbar.n)
-                                pbar.close()
-                                log.success(
-                                    f"检测到临时文件 '{f}' 已完成下载，最终文件（含序号）: '{final_f}'")
-                                return final_f
-
-            if not crdownload_file_found:
-                for f in relevant_new_files:
-                    if not f.endswith(".crdownload"):
-                        final_size_bytes = os.path.getsize(
-                            os.path.join(self.download_dir, f))
-                        if pbar.total == 0 or final_size_bytes > pbar.n:
-                            pbar.update(final_size_bytes - pbar.n)
-                        pbar.close()
-                        log.success(f"直接检测到已下载的完整文件: {f}")
-                        return f
-
-                for f in new_files_since_start:
-                    if not f.endswith(".crdownload"):
-                        final_size_bytes = os.path.getsize(
-                            os.path.join(self.download_dir, f))
-                        if pbar.total == 0 or final_size_bytes > pbar.n:
-                            pbar.update(final_size_bytes - pbar.n)
-                        pbar.close()
+
+        def report_size(path):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return
+            if size > pbar.n:
+                pbar.update(size - pbar.n)
+
+        with DownloadWatcher(self.staging_dir) as watcher:
+            while time.time() - start_time < timeout:
+                # 忽略 Chrome 写入的隐藏临时文件
+                current_files = [f for f in os.listdir(self.staging_dir) if not f.startswith('.')]
+                partial_files = [f for f in current_files if f.endswith(".crdownload")]
+                complete_files = [f for f in current_files if not f.endswith(".crdownload")]
+
+                for f in partial_files:
+                    report_size(os.path.join(self.staging_dir, f))
+
+                if complete_files and not partial_files:
+                    matching = [f for f in complete_files if normalized_prefix in f.lower()]
+                    final_name = (matching or complete_files)[0]
+                    report_size(os.path.join(self.staging_dir, final_name))
+                    pbar.close()
+                    if matching:
+                        log.success(f"检测到下载完成的文件: '{final_name}'")
+                    else:
                         log.warning(
-                            f"警告：未找到匹配前缀的临时文件，但检测到新下载文件：{f}。此文件可能不完全匹配预期前缀，但可能是唯一的新下载文件。")
-                        return f
+                            f"警告：未找到匹配前缀的文件，但检测到新下载文件：{final_name}。此文件可能不完全匹配预期前缀，但它是暂存目录中唯一的新下载文件。")
+                    return final_name
 
-            time.sleep(check_interval)
+                watcher.wait(timeout=min(5, max(0.1, timeout - (time.time() - start_time))))
 
         pbar.close()
         log.error(f"在 {timeout} 秒内未检测到文件下载完成。")
         return None
 
     def close(self):
-        if self.driver:
-            log.info("正在关闭浏览器...")
-            self.driver.quit()
-            self.driver = None
-            log.info("浏览器已关闭。")
+        """浏览器由进程级会话池持有并在退出时统一关闭，单个 provider 不再负责关闭浏览器。"""
+        self._local.session = None
 
     def _is_already_downloaded(self, filename_prefix: str) -> bool:
         """
@@ -644,6 +791,3 @@ class EnvatoProvider(BaseVideoProvider):
                     if normalized_prefix in filename.lower():
                         return True
         return False
-
-    def __del__(self):
-        self.close()
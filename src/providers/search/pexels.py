@@ -8,8 +8,15 @@ class PexelsProvider(BaseVideoProvider):
     """
     从 Pexels.com 搜索和下载视频的提供者。
     """
+    # 在这里修改搜索过滤条件，例如 orientation: 'portrait' 或 'square'，size: 'large' 或 'small'
+    # （同时参与搜索缓存的键，修改后不会命中旧条件下的缓存结果）
+    SEARCH_FILTERS = {
+        "orientation": "landscape",
+        "size": "medium",
+    }
+
     def __init__(self, config: dict):
-        super().__init__()
+        super().__init__(config)
         pexels_config = config.get('search_providers', {}).get('pexels', {})
         self.api_key = pexels_config.get('api_key')
         api_host = pexels_config.get('api_host', 'https://api.pexels.com')
@@ -31,8 +38,7 @@ class PexelsProvider(BaseVideoProvider):
         params = {
             "query": query,
             "per_page": count,
-            "orientation": "landscape",  # 在这里修改，例如 'portrait' 或 'square'
-            "size": "medium"             # 在这里修改，例如 'large' 或 'small'
+            **self.SEARCH_FILTERS,
         }
         
         try:
@@ -53,14 +59,39 @@ class PexelsProvider(BaseVideoProvider):
             log.error("用户中断了操作。")
             sys.exit(0)
 
+    def cache_filters(self) -> Dict[str, Any]:
+        return {**super().cache_filters(), **self.SEARCH_FILTERS}
+
+    @staticmethod
+    def _extract_tags(video: Dict) -> List[str]:
+        """Pexels 的 tags 常为空，页面 URL 的 slug（如 /video/man-running-on-beach-123/）同样描述了内容。"""
+        tags = [t for t in video.get('tags', []) if isinstance(t, str)]
+        slug = video.get('url', '').rstrip('/').rsplit('/', 1)[-1]
+        tags.extend(w for w in slug.split('-') if w and not w.isdigit())
+        return tags
+
     def _standardize_results(self, videos: List[Dict]) -> List[Dict[str, Any]]:
-        """将 Pexels API 的返回结果标准化。"""
+        """
+        将 Pexels API 的返回结果标准化。
+        每个视频都有多个码流，选择满足输出分辨率和帧率的最小码流，避免下载 4K 再缩放。
+        """
         import os
         from urllib.parse import urlparse
 
         standardized_videos = []
         for video in videos:
-            video_file = max(video.get('video_files', []), key=lambda x: x.get('width', 0))
+            renditions = [
+                {
+                    'link': f.get('link'),
+                    'width': f.get('width'),
+                    'height': f.get('height'),
+                    'fps': f.get('fps'),
+                    'size': f.get('size'),
+                }
+                for f in video.get('video_files', [])
+                if f.get('link') and f.get('file_type', 'video/mp4') == 'video/mp4'
+            ]
+            video_file = self._select_rendition(renditions)
             if video_file:
                 download_url = video_file['link']
                 try:
@@ -75,6 +106,12 @@ class PexelsProvider(BaseVideoProvider):
                     'video_name': video_name,
                     'download_url': download_url,
                     'source': 'pexels',
-                    'description': f"Video by {video['user']['name']} on Pexels"
+                    'description': f"Video by {video['user']['name']} on Pexels",
+                    'duration': video.get('duration'),
+                    'width': video_file['width'],
+                    'height': video_file['height'],
+                    'fps': video_file.get('fps'),
+                    'file_size': video_file.get('size'),
+                    'tags': self._extract_tags(video),
                 })
         return standardized_videos
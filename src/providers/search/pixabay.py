@@ -5,8 +5,15 @@ from .base import BaseVideoProvider
 from src.logger import log
 
 class PixabayProvider(BaseVideoProvider):
+    # 在这里修改搜索过滤条件（同时参与搜索缓存的键，修改后不会命中旧条件下的缓存结果）
+    SEARCH_FILTERS = {
+        "video_type": "film",
+        "orientation": "horizontal",
+        "safesearch": "true",
+    }
+
     def __init__(self, config: dict):
-        super().__init__()
+        super().__init__(config)
         pixabay_config = config.get('search_providers', {}).get('pixabay', {})
         self.api_key = pixabay_config.get('api_key')
         api_host = pixabay_config.get('api_host', 'https://pixabay.com')
@@ -28,9 +35,7 @@ class PixabayProvider(BaseVideoProvider):
             "key": self.api_key,
             "q": query,
             "per_page": count,
-            "video_type": "film",
-            "orientation": "horizontal",
-            "safesearch": "true"
+            **self.SEARCH_FILTERS,
         }
         
         try:
@@ -51,18 +56,29 @@ class PixabayProvider(BaseVideoProvider):
             log.error("用户中断了操作。")
             sys.exit(0)
 
+    def cache_filters(self) -> Dict[str, Any]:
+        return {**super().cache_filters(), **self.SEARCH_FILTERS}
+
     def _standardize_results(self, videos: List[Dict]) -> List[Dict[str, Any]]:
-        """将 Pixabay API 的返回结果标准化。"""
+        """
+        将 Pixabay API 的返回结果标准化。
+        Pixabay 的 'videos' 是一个按尺寸分级的字典（large/medium/small/tiny），
+        选择满足输出分辨率的最小一级。
+        """
         import os
         from urllib.parse import urlparse
 
         standardized_videos = []
         for video in videos:
-            # Pixabay 的 'videos' 是一个字典，'large' 或 'medium' 通常是最佳选择
             video_files = video.get('videos', {})
-            best_video = video_files.get('large', video_files.get('medium', {}))
+            renditions = [
+                {'url': f['url'], 'width': f.get('width'), 'height': f.get('height'), 'size': f.get('size')}
+                for f in video_files.values()
+                if isinstance(f, dict) and f.get('url')
+            ]
+            best_video = self._select_rendition(renditions)
             
-            if best_video and 'url' in best_video:
+            if best_video:
                 download_url = best_video['url']
                 try:
                     # 从URL中提取文件名作为video_name
@@ -76,6 +92,12 @@ class PixabayProvider(BaseVideoProvider):
                     'video_name': video_name,
                     'download_url': download_url,
                     'source': 'pixabay',
-                    'description': f"Video by {video.get('user', 'Unknown User')} on Pixabay"
+                    'description': f"Video by {video.get('user', 'Unknown User')} on Pixabay",
+                    'duration': video.get('duration'),
+                    'width': best_video['width'],
+                    'height': best_video['height'],
+                    'fps': None, # Pixabay API 不提供帧率信息
+                    'file_size': best_video.get('size'),
+                    'tags': [t.strip() for t in video.get('tags', '').split(',') if t.strip()],
                 })
         return standardized_videos
@@ -87,9 +87,14 @@ class TtsManager:
             log.debug(f"Underlying error: {e}")
             return False
 
-    def synthesize(self, text: str, **kwargs) -> Dict:
+    def synthesize(self, text: str, raise_errors: bool = False, **kwargs) -> Dict:
+        """
+        :param raise_errors: True 时合成失败抛出异常而不是退出进程，供并发合成按块重试。
+        """
         if not self.provider:
             log.error("No TTS provider available to execute the request.")
+            if raise_errors:
+                raise RuntimeError("No TTS provider available to execute the request.")
             sys.exit(1)
 
         try:
@@ -97,9 +102,30 @@ class TtsManager:
             return self.provider.synthesize(text, **kwargs)
         except Exception as e:
             log.error(f"TTS provider '{self.provider.name}' failed: {e}")
+            if raise_errors:
+                raise
             # As per requirement, exit if the synthesis fails
             sys.exit(1)
 
+    async def asynthesize(self, text: str, raise_errors: bool = False, **kwargs) -> Dict:
+        """
+        synthesize 的异步版本，供并发合成在事件循环中调用。
+        """
+        if not self.provider:
+            log.error("No TTS provider available to execute the request.")
+            if raise_errors:
+                raise RuntimeError("No TTS provider available to execute the request.")
+            sys.exit(1)
+
+        try:
+            log.info(f"Attempting to use TTS provider: '{self.provider.name}'")
+            return await self.provider.asynthesize(text, **kwargs)
+        except Exception as e:
+            log.error(f"TTS provider '{self.provider.name}' failed: {e}")
+            if raise_errors:
+                raise
+            sys.exit(1)
+
     @property
     def default(self) -> Optional[BaseTtsProvider]:
         return self.get_provider()
@@ -1,7 +1,16 @@
+import os
 import time
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, Callable, Any
+from typing import Dict, Callable, Any, Optional
 from src.logger import log
+from src import http_client
+from src.core.wav_concat import repair_wav_header
+
+# 这些响应类型视为音频流，直接写入文件；其余（通常是 JSON）按提供者原有的返回方式解析
+STREAM_CONTENT_TYPES = ('audio/', 'application/octet-stream')
+# 服务端用这些状态码拒绝流式参数时，认为其不支持流式返回
+STREAM_UNSUPPORTED_STATUS = {400, 404, 405, 415, 422}
 
 class BaseTtsProvider(ABC):
     """
@@ -16,7 +25,22 @@ class BaseTtsProvider(ABC):
         self.name = name
         self.config = config
         self.max_retries = self.config.get('max_retries', 3)
-        self.retry_delays = self.config.get('retry_delays', [2, 5, 10]) # 秒
+        # 重试等待采用带抖动的指数退避：第 n 次重试前等待 [0, min(backoff_max, backoff_base * 2^n)] 秒
+        self.backoff_base = self.config.get('backoff_base')
+        self.backoff_max = self.config.get('backoff_max')
+        # 请求超时（秒）：timeout 为读取超时，未配置时使用 http_client 的默认值
+        connect_timeout, read_timeout = http_client.default_timeout()
+        self.timeout = (connect_timeout, float(self.config.get('timeout', read_timeout)))
+        self.max_concurrency = max(1, int(self.config.get('max_concurrency', 1))) # 服务端可同时处理的合成请求数
+        # 流式返回：合成响应体即音频，直接写入段文件，省去服务端临时文件和额外的下载请求。
+        # 首次请求时协商，服务端不支持则记录下来，之后的请求直接使用原有的返回方式
+        self.stream_audio = bool(self.config.get('stream_audio', False))
+        self._stream_negotiated: Optional[bool] = None
+
+    @property
+    def streams_audio(self) -> bool:
+        """是否以流式方式请求音频（已配置且未被服务端拒绝）。"""
+        return self.stream_audio and self._stream_negotiated is not False
 
     def _execute_with_retry(self, func: Callable[..., Any], *args, **kwargs) -> Any:
         """
@@ -33,13 +57,71 @@ class BaseTtsProvider(ABC):
             except Exception as e:
                 log.error(f"Provider '{self.name}' operation failed (Attempt {attempt + 1}/{self.max_retries + 1}): {e}")
                 if attempt < self.max_retries:
-                    delay = self.retry_delays[attempt] if attempt < len(self.retry_delays) else self.retry_delays[-1]
-                    log.warning(f"Retrying in {delay} seconds...")
+                    delay = http_client.backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    log.warning(f"Retrying in {delay:.1f} seconds...")
                     time.sleep(delay)
                 else:
                     log.error(f"Max retries reached for provider '{self.name}'. Raising exception.")
                     raise # 所有重试都失败，抛出异常
 
+    async def _aexecute_with_retry(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        _execute_with_retry 的异步版本，func 为协程函数。
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                log.error(f"Provider '{self.name}' operation failed (Attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                if attempt < self.max_retries:
+                    delay = http_client.backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    log.warning(f"Retrying in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
+                else:
+                    log.error(f"Max retries reached for provider '{self.name}'. Raising exception.")
+                    raise
+
+    async def _astream_audio(self, url: str, destination: str, *, trust_env: bool = True,
+                             negotiate: bool = True, **request_kwargs) -> Optional[Dict]:
+        """
+        发送合成请求，响应为音频时把响应体逐块写入 destination 并修正 WAV 文件头。
+
+        :param negotiate: 请求中带有流式专用参数时为 True，首次请求的 4xx 视为服务端拒绝这些参数；
+                          请求与原有方式相同的提供者应传 False，4xx 按普通错误处理。
+        :return: 写入音频时返回 {'status': 'ok', 'path': destination}；服务端返回 JSON 时返回解析后的字典，
+                 由调用方按原有方式处理；服务端拒绝流式参数或返回的不是 WAV 音频时返回 None，
+                 调用方应改用原有方式重新请求。
+        """
+        async with http_client.astream('POST', url, trust_env=trust_env, timeout=self.timeout, **request_kwargs) as response:
+            if negotiate and response.status_code in STREAM_UNSUPPORTED_STATUS and self._stream_negotiated is None:
+                self._stream_negotiated = False
+                log.warning(f"Provider '{self.name}' rejected the streaming request (HTTP {response.status_code}), "
+                            f"falling back to its default response mode.")
+                return None
+            response.raise_for_status()
+            if not response.headers.get('content-type', '').startswith(STREAM_CONTENT_TYPES):
+                await response.aread()
+                if self._stream_negotiated is None:
+                    self._stream_negotiated = False
+                    log.warning(f"Provider '{self.name}' does not stream audio, falling back to its default response mode.")
+                return response.json()
+            with open(destination, 'wb') as f:
+                async for chunk in response.aiter_bytes(1 << 16):
+                    f.write(chunk)
+
+        try:
+            repair_wav_header(destination)
+        except ValueError as e:
+            # 响应体不是 WAV（例如其他编码的音频），重试也无济于事，改用原有方式
+            os.remove(destination)
+            self._stream_negotiated = False
+            log.warning(f"Provider '{self.name}' streamed a non-WAV body ({e}), falling back to its default response mode.")
+            return None
+        if self._stream_negotiated is None:
+            log.info(f"Provider '{self.name}' streams audio directly to disk.")
+        self._stream_negotiated = True
+        return {'status': 'ok', 'path': destination}
+
     @abstractmethod
     def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
         """
@@ -51,5 +133,13 @@ class BaseTtsProvider(ABC):
         """
         pass
 
+    async def asynthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+        """
+        synthesize 的异步版本。默认在线程中执行同步实现，提供者可以改写为基于 httpx.AsyncClient 的原生实现。
+        kwargs 中的 stream_to 为流式写入的目标文件，支持流式返回的提供者据此直接写入音频并返回该路径，其余提供者忽略它。
+        """
+        kwargs.pop('stream_to', None)
+        return await asyncio.to_thread(self.synthesize, text, task_id, **kwargs)
+
     def __repr__(self):
         return f"<{self.__class__.__name__}(name='{self.name}')>"
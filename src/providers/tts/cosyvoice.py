@@ -1,5 +1,5 @@
-import requests
 from .base import BaseTtsProvider
+from src import http_client
 from src.logger import log
 from typing import Dict
 
@@ -13,6 +13,7 @@ class CosyVoiceTtsProvider(BaseTtsProvider):
         self.api_key = self.config.get('api_key')
         self.speed = self.config.get('speed', 0.95) # Provide a default speed
         self.api_path = "/speak_as"  # Hardcoded API path for this provider
+        self.stream_return_type = self.config.get('stream_return_type', 'stream') # 流式返回时请求的 return_type
         
         if not self.endpoint:
             raise ValueError("CosyVoice TTS provider config must contain a 'endpoint'.")
@@ -21,11 +22,8 @@ class CosyVoiceTtsProvider(BaseTtsProvider):
         if 'speakers' not in self.config or not isinstance(self.config['speakers'], dict):
              log.warning("CosyVoice TTS provider config should contain a 'speakers' dictionary.")
 
-    def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
-        """
-        Synthesize speech using the CosyVoice TTS service.
-        The 'task_id' is ignored by this provider but required by the base class.
-        """
+    def _build_request(self, text: str, task_id: str, **kwargs):
+        """校验参数并构造请求，返回 (url, headers, payload)。"""
         is_test = kwargs.get('is_test', False)
         if is_test and not task_id: # In test mode, task_id can be None
             pass
@@ -55,42 +53,81 @@ class CosyVoiceTtsProvider(BaseTtsProvider):
             "return_type": return_type,
             "speed": speed
         }
+        if not is_test:
+            log.info(f"Sending TTS request to {full_api_url} with speaker '{speaker}'")
+        return full_api_url, headers, payload
+
+    def _parse_response(self, data: Dict, is_test: bool) -> Dict:
+        """解析服务返回的 JSON，补全音频 URL。"""
+        # If it's a test call, we just need to know it succeeded.
+        if is_test:
+            return {'status': 'ok'}
+
+        if data.get('status') == 'ok':
+            # Assemble the full URL if the response is a relative path
+            audio_url = data.get('url', '')
+            if not audio_url.startswith(('http://', 'https://')):
+                audio_url = self.endpoint + audio_url
+            data['url'] = audio_url
+            log.info(f"TTS synthesis successful. Full audio URL: {audio_url}")
+            return data
+        else:
+            log.error(f"TTS synthesis failed with status: {data.get('status')}. Reason: {data.get('message')}")
+            raise Exception(f"TTS API returned an error: {data.get('message')}")
+
+    def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+        """
+        Synthesize speech using the CosyVoice TTS service.
+        The 'task_id' is ignored by this provider but required by the base class.
+        """
+        full_api_url, headers, payload = self._build_request(text, task_id, **kwargs)
 
         def _do_request():
             """封装实际的请求逻辑，供重试机制调用。"""
-            if not is_test:
-                log.info(f"Sending TTS request to {full_api_url} with speaker '{speaker}'")
-            
-            # 显式禁用代理，以解决本地网络中 Privoxy 等代理服务器的干扰问题
-            proxies = {
-                "http": None,
-                "https": None,
-            }
-            
-            response = requests.post(full_api_url, headers=headers, json=payload, proxies=proxies)
+            # 显式禁用代理（trust_env=False），以解决本地网络中 Privoxy 等代理服务器的干扰问题
+            response = http_client.post(full_api_url, headers=headers, json=payload, timeout=self.timeout, trust_env=False)
             response.raise_for_status()
             return response.json() # 返回 JSON 响应
 
         try:
             data = self._execute_with_retry(_do_request)
-            
-            # If it's a test call, we just need to know it succeeded.
-            if is_test:
-                return {'status': 'ok'}
+            return self._parse_response(data, kwargs.get('is_test', False))
+        except Exception as e:
+            # _execute_with_retry 已经处理了重试和日志，这里只捕获最终的失败
+            log.error(f"Final attempt for CosyVoice TTS synthesis failed: {e}")
+            raise
 
-            if data.get('status') == 'ok':
-                # Assemble the full URL if the response is a relative path
-                audio_url = data.get('url', '')
-                if not audio_url.startswith(('http://', 'https://')):
-                    audio_url = self.endpoint + audio_url
-                data['url'] = audio_url
-                log.info(f"TTS synthesis successful. Full audio URL: {audio_url}")
-                return data
-            else:
-                log.error(f"TTS synthesis failed with status: {data.get('status')}. Reason: {data.get('message')}")
-                raise Exception(f"TTS API returned an error: {data.get('message')}")
+    async def asynthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+        """
+        synthesize 的原生异步实现（httpx.AsyncClient）。
+        传入 stream_to 且启用了 stream_audio 时，以流式 return_type 请求并把音频直接写入 stream_to；
+        服务端不支持时退回到返回 URL 的方式。
+        """
+        stream_to = kwargs.pop('stream_to', None)
+        if stream_to and self.streams_audio and not kwargs.get('is_test', False):
+            full_api_url, headers, payload = self._build_request(text, task_id, **kwargs)
+            payload['return_type'] = self.stream_return_type
+            headers['accept'] = 'audio/wav, application/json'
+            try:
+                data = await self._aexecute_with_retry(
+                    self._astream_audio, full_api_url, stream_to, trust_env=False, headers=headers, json=payload
+                )
+            except Exception as e:
+                log.error(f"Final attempt for CosyVoice TTS synthesis failed: {e}")
+                raise
+            if data is not None:
+                return data if data.get('path') == stream_to else self._parse_response(data, False)
+
+        full_api_url, headers, payload = self._build_request(text, task_id, **kwargs)
+
+        async def _do_request():
+            response = await http_client.apost(full_api_url, headers=headers, json=payload, timeout=self.timeout, trust_env=False)
+            response.raise_for_status()
+            return response.json()
 
+        try:
+            data = await self._aexecute_with_retry(_do_request)
+            return self._parse_response(data, kwargs.get('is_test', False))
         except Exception as e:
-            # _execute_with_retry 已经处理了重试和日志，这里只捕获最终的失败
             log.error(f"Final attempt for CosyVoice TTS synthesis failed: {e}")
             raise
@@ -1,7 +1,7 @@
-import requests
 import base64
 import os
 from .base import BaseTtsProvider
+from src import http_client
 from src.logger import log
 from typing import Dict
 from src.core.task_manager import TaskManager
@@ -52,8 +52,7 @@ class IndexTtsProvider(BaseTtsProvider):
 
         def _do_request():
             log.info(f"Sending TTS request to {full_api_url} with speaker_id '{speaker_id}'")
-            proxies = {"http": None, "https": None}
-            response = requests.post(full_api_url, headers=headers, json=payload, proxies=proxies)
+            response = http_client.post(full_api_url, headers=headers, json=payload, timeout=self.timeout, trust_env=False)
             response.raise_for_status()
             return response.json()
 
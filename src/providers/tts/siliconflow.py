@@ -1,6 +1,6 @@
-import requests
 import hashlib
 from .base import BaseTtsProvider
+from src import http_client
 from src.logger import log
 from src.core.task_manager import TaskManager
 from typing import Dict
@@ -26,10 +26,8 @@ class SiliconflowTtsProvider(BaseTtsProvider):
         if 'speakers' not in self.config or not isinstance(self.config['speakers'], dict):
             log.warning("SiliconFlow TTS provider config should contain a 'speakers' dictionary.")
 
-    def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
-        """
-        Synthesize speech using the SiliconFlow TTS service.
-        """
+    def _build_request(self, text: str, task_id: str, **kwargs):
+        """校验参数并构造请求，返回 (url, headers, payload)。"""
         is_test = kwargs.get('is_test', False)
         if is_test and not task_id: # In test mode, task_id can be None
             pass
@@ -66,13 +64,22 @@ class SiliconflowTtsProvider(BaseTtsProvider):
             "sample_rate": kwargs.get('sample_rate', self.sample_rate), # 新增
             "stream": kwargs.get('stream', self.stream) # 新增
         }
+        return full_api_url, headers, payload
+
+    def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+        """
+        Synthesize speech using the SiliconFlow TTS service.
+        """
+        is_test = kwargs.get('is_test', False)
+        full_api_url, headers, payload = self._build_request(text, task_id, **kwargs)
+        speaker = payload['voice']
 
         def _do_request():
             """封装实际的请求逻辑，供重试机制调用。"""
             if not is_test:
                 log.info(f"Sending TTS request to SiliconFlow with speaker '{speaker}'")
             
-            response = requests.post(full_api_url, headers=headers, json=payload, timeout=60)
+            response = http_client.post(full_api_url, headers=headers, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return response
 
@@ -103,3 +110,27 @@ class SiliconflowTtsProvider(BaseTtsProvider):
             # _execute_with_retry 已经处理了重试和日志，这里只捕获最终的失败
             log.error(f"Final attempt for SiliconFlow TTS synthesis failed: {e}")
             raise
+
+    async def asynthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+        """
+        传入 stream_to 且启用了 stream_audio 时，把响应中的音频直接流式写入 stream_to，
+        不再经过 tts_audio 中间文件；否则在线程中执行同步实现。
+        """
+        stream_to = kwargs.pop('stream_to', None)
+        if not stream_to or not self.streams_audio or kwargs.get('is_test', False):
+            return await super().asynthesize(text, task_id, **kwargs)
+
+        full_api_url, headers, payload = self._build_request(text, task_id, **kwargs)
+        log.info(f"Sending streaming TTS request to SiliconFlow with speaker '{payload['voice']}'")
+        try:
+            # 流式请求与原有请求完全相同，没有可被服务端拒绝的流式参数，4xx 不作为协商结果
+            data = await self._aexecute_with_retry(
+                self._astream_audio, full_api_url, stream_to, negotiate=False, headers=headers, json=payload
+            )
+        except Exception as e:
+            log.error(f"Final attempt for SiliconFlow TTS synthesis failed: {e}")
+            raise
+        if data is not None and data.get('path') == stream_to:
+            log.info(f"TTS synthesis successful. Audio streamed to: {stream_to}")
+            return data
+        return await super().asynthesize(text, task_id, **kwargs)
@@ -9,18 +9,25 @@ class TTS:
     def __init__(self):
         self.manager = TtsManager(config.data)
 
-    def synthesize(self, text: str, task_id: str, **kwargs) -> Dict:
+    def synthesize(self, text: str, task_id: str, raise_errors: bool = False, **kwargs) -> Dict:
         """
         Synthesize speech using the configured TTS providers with failover.
 
         :param text: The text to synthesize.
         :param task_id: The ID of the current task.
+        :param raise_errors: Raise on failure instead of exiting the process.
         :param kwargs: Additional parameters to pass to the provider, 
                        e.g., speaker="speaker_name".
         :return: A dictionary containing the result from the TTS provider.
         """
         # Pass task_id as a keyword argument to be included in **kwargs
-        return self.manager.synthesize(text, task_id=task_id, **kwargs)
+        return self.manager.synthesize(text, raise_errors=raise_errors, task_id=task_id, **kwargs)
+
+    async def asynthesize(self, text: str, task_id: str, raise_errors: bool = False, **kwargs) -> Dict:
+        """
+        Async variant of synthesize for use inside an event loop.
+        """
+        return await self.manager.asynthesize(text, raise_errors=raise_errors, task_id=task_id, **kwargs)
 
 # 全局单例实例，初始为 None
 _tts_instance = None